@@ -0,0 +1,51 @@
+from django.conf import settings
+
+from .deletion import soft_delete_recipe, soft_delete_user
+from .tasks import enqueue_purge_recipe, enqueue_purge_user
+
+
+class SoftDeleteAdminMixin:
+    """
+    Admin deletes objects the way the API does (SOFT_DELETE): objects
+    are marked deleted and purged in background, the confirmation page
+    lists only the selected objects instead of collecting all their
+    related rows.
+    Subclasses set soft_delete(obj) and enqueue_purge(pk).
+    """
+    soft_delete = None
+    enqueue_purge = None
+
+    def get_deleted_objects(self, objs, request):
+        if not settings.SOFT_DELETE:
+            return super().get_deleted_objects(objs, request)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        return (
+            [str(obj) for obj in objs],
+            {self.opts.verbose_name_plural: len(objs)},
+            perms_needed,
+            []
+        )
+
+    def delete_model(self, request, obj):
+        if not settings.SOFT_DELETE:
+            return super().delete_model(request, obj)
+        self.soft_delete(obj)
+        self.enqueue_purge(obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        if not settings.SOFT_DELETE:
+            return super().delete_queryset(request, queryset)
+        for obj in queryset:
+            self.delete_model(request, obj)
+
+
+class RecipeSoftDeleteAdminMixin(SoftDeleteAdminMixin):
+    soft_delete = staticmethod(soft_delete_recipe)
+    enqueue_purge = staticmethod(enqueue_purge_recipe)
+
+
+class UserSoftDeleteAdminMixin(SoftDeleteAdminMixin):
+    soft_delete = staticmethod(soft_delete_user)
+    enqueue_purge = staticmethod(enqueue_purge_user)
@@ -0,0 +1,252 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .caching import get_cached_ingredients, get_cached_recipe, get_cached_tags
+from .exports import export_response, reuse_export, save_export
+from .fieldsets import get_requested_fields
+from .filters import RecipeFilter
+from .querysets import (get_recipes_for_read, get_recipes_limit,
+                        get_subscriptions_for_read)
+from .serializers import RecipeReadSerializer, SubscriptionSerializer
+from .utils import (PDF_CONTENT_TYPE, get_pdf_executor,
+                    get_shopping_cart_export_name, get_shopping_cart_filename,
+                    get_shopping_cart_ingredients, render_shopping_cart_pdf)
+from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+                    TagViewSet)
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def json_response(data, status=200):
+    """
+    Function returns response rendered the same way DRF renders it.
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(
+        renderer.render(data),
+        status=status,
+        content_type=JSON_CONTENT_TYPE
+    )
+
+
+def error_response(exc):
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = json_response(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = 'Token'
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = str(exc.wait)
+    return response
+
+
+def authenticate(request):
+    """
+    Function authenticates request with DEFAULT_AUTHENTICATION_CLASSES.
+    Returns DRF Request with the authenticated user.
+    """
+    user = AnonymousUser()
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            user = result[0]
+            break
+    drf_request = Request(request, authenticators=())
+    drf_request.user = user
+    return drf_request
+
+
+def get_throttle_classes(viewset, action):
+    """
+    Function returns throttle classes of the viewset action:
+    set by @action(throttle_classes=...) or by the viewset.
+    """
+    handler = getattr(viewset, action)
+    return getattr(handler, 'kwargs', {}).get(
+        'throttle_classes', viewset.throttle_classes
+    )
+
+
+def check_throttles(request, throttle_classes):
+    """
+    Function raises Throttled the same way APIView.check_throttles does.
+    """
+    durations = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            durations.append(throttle.wait())
+    if durations:
+        durations = [duration for duration in durations if duration]
+        raise exceptions.Throttled(max(durations, default=None))
+
+
+def serialize(serializer_class, instance, request, many=False, **kwargs):
+    return serializer_class(
+        instance, many=many, context={'request': request}, **kwargs
+    ).data
+
+
+def filter_queryset(filterset_class, queryset, request):
+    """
+    Function filters queryset the same way DjangoFilterBackend does.
+    """
+    filterset = filterset_class(
+        request.query_params, queryset=queryset, request=request
+    )
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    return filterset.qs
+
+
+async def paginated_response(queryset, request, serializer_class,
+                             **kwargs):
+    """
+    Function paginates queryset with DEFAULT_PAGINATION_CLASS
+    (LimitOffsetPagination) using async ORM and returns response.
+    Keyword arguments are passed to the serializer.
+    """
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    paginator.request = request
+    paginator.limit = paginator.get_limit(request)
+    if paginator.limit is None:
+        objects = [obj async for obj in queryset]
+        return json_response(await sync_to_async(serialize)(
+            serializer_class, objects, request, many=True, **kwargs
+        ))
+    paginator.offset = paginator.get_offset(request)
+    paginator.count = await queryset.acount()
+    objects = []
+    if paginator.count and paginator.offset <= paginator.count:
+        objects = [
+            obj async for obj in
+            queryset[paginator.offset:paginator.offset + paginator.limit]
+        ]
+    data = await sync_to_async(serialize)(
+        serializer_class, objects, request, many=True, **kwargs
+    )
+    return json_response(paginator.get_paginated_response(data).data)
+
+
+def async_read_view(viewset, actions, detail=False):
+    """
+    Decorator for async views of the read endpoints.
+    GET requests are authenticated, throttled with throttles of the
+    viewset action and handled by the async view, other methods
+    are passed to the sync viewset.
+    The view looks like the viewset action for the instrumentation
+    (RequestMetricsMiddleware, NPlusOneMiddleware).
+    """
+    fallback = viewset.as_view(actions, detail=detail)
+    sync_fallback = sync_to_async(fallback)
+    throttle_classes = get_throttle_classes(viewset, actions['get'])
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await sync_fallback(request, *args, **kwargs)
+            try:
+                request = await sync_to_async(authenticate)(request)
+                if throttle_classes:
+                    await sync_to_async(check_throttles)(
+                        request, throttle_classes
+                    )
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+
+        wrapper.csrf_exempt = True
+        wrapper.cls = fallback.cls
+        wrapper.actions = fallback.actions
+        return wrapper
+    return decorator
+
+
+@async_read_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+async def recipe_list(request):
+    fields = get_requested_fields(request, RecipeReadSerializer)
+    queryset = await sync_to_async(filter_queryset)(
+        RecipeFilter, get_recipes_for_read(request.user, fields=fields),
+        request
+    )
+    return await paginated_response(
+        queryset, request, RecipeReadSerializer, fields=fields
+    )
+
+
+@async_read_view(
+    RecipeViewSet,
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+     'delete': 'destroy'},
+    detail=True
+)
+async def recipe_detail(request, pk):
+    fields = get_requested_fields(request, RecipeReadSerializer)
+    recipe = await sync_to_async(get_cached_recipe)(request.user, pk)
+    if recipe is None:
+        raise exceptions.NotFound
+    return json_response(await sync_to_async(serialize)(
+        RecipeReadSerializer, recipe, request, fields=fields
+    ))
+
+
+@async_read_view(TagViewSet, {'get': 'list'})
+async def tag_list(request):
+    return json_response(await sync_to_async(get_cached_tags)())
+
+
+@async_read_view(IngredientViewSet, {'get': 'list'})
+async def ingredient_list(request):
+    return json_response(
+        await sync_to_async(get_cached_ingredients)(request)
+    )
+
+
+@async_read_view(CustomUserViewSet, {'get': 'subscriptions'})
+async def subscriptions(request):
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated
+    fields = get_requested_fields(request, SubscriptionSerializer)
+    return await paginated_response(
+        get_subscriptions_for_read(
+            request.user, fields, get_recipes_limit(request)
+        ),
+        request,
+        SubscriptionSerializer,
+        fields=fields
+    )
+
+
+@async_read_view(RecipeViewSet, {'get': 'download_shopping_cart'})
+async def download_shopping_cart(request):
+    """
+    PDF file is rendered in the pool (PDF_RENDER_EXECUTOR),
+    the event loop only waits for it. The file is delivered
+    the same way as by RecipeViewSet.download_shopping_cart.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        raise exceptions.NotAuthenticated
+    ingredients = [
+        value async for value in get_shopping_cart_ingredients(user)
+    ]
+    name = get_shopping_cart_export_name(ingredients)
+    if not await sync_to_async(reuse_export)(user.pk, name):
+        buffer = await asyncio.get_running_loop().run_in_executor(
+            get_pdf_executor(), render_shopping_cart_pdf, ingredients
+        )
+        await sync_to_async(save_export)(user.pk, name, buffer)
+    return await sync_to_async(export_response)(
+        user.pk, name, get_shopping_cart_filename(user), PDF_CONTENT_TYPE
+    )
@@ -0,0 +1,205 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from foodgram.caches import is_shared_cache
+
+TOKEN_CACHE_KEY = 'auth-token:{}'
+TOKEN_VERSION_CACHE_KEY = 'auth-token-version:{}'
+# Fields of the user cached with the token: authentication and permissions
+# need only them, other fields (password too) are loaded on access.
+# username is cached for async views: deferred fields can't be loaded
+# in the event loop (e.g. the filename of the shopping cart).
+CACHED_USER_FIELDS = (
+    'id', 'username', 'is_active', 'is_staff', 'is_superuser', 'role'
+)
+
+
+class LocalLRUCache:
+    """
+    Small per-process LRU cache with expiration of entries.
+    """
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (None, 0))
+            if expires_at < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0 or self.timeout <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = LocalLRUCache(
+    settings.AUTH_TOKEN_LOCAL_CACHE_SIZE,
+    settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT
+)
+
+
+def get_token_cache_key(key, template=TOKEN_CACHE_KEY):
+    """
+    Function returns cache key for the token.
+    Token itself is not stored in cache keys.
+    """
+    return template.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def get_token_version_key(key):
+    return get_token_cache_key(key, TOKEN_VERSION_CACHE_KEY)
+
+
+def invalidate_token(key):
+    """
+    Function removes the cached token. The token gets a new revocation
+    version in the shared cache, so other processes don't use
+    the token from their LRU.
+    """
+    cache_key = get_token_cache_key(key)
+    local_tokens.delete(cache_key)
+    if is_shared_cache():
+        # The version outlives all entries cached with the old one.
+        cache.set(
+            get_token_version_key(key),
+            uuid.uuid4().hex,
+            settings.AUTH_TOKEN_CACHE_TIMEOUT
+            + settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT
+        )
+    cache.delete(cache_key)
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Function removes cached tokens of the user from both caches.
+    """
+    model = CachedTokenAuthentication().get_model()
+    for key in model.objects.filter(user_id=user_id).values_list(
+        'pk', flat=True
+    ):
+        invalidate_token(key)
+
+
+def pack_token(token):
+    """
+    Function returns what is cached for the token: the key
+    and CACHED_USER_FIELDS of the user.
+    """
+    return (
+        token.key,
+        {field: getattr(token.user, field) for field in CACHED_USER_FIELDS}
+    )
+
+
+def unpack_token(model, cached):
+    """
+    Function returns the token with its user built from cached fields,
+    other fields of the user are deferred.
+    """
+    key, fields = cached
+    user_model = model.user.field.related_model
+    # from_db() takes values in the order of the model fields.
+    values = [
+        fields[field.attname] for field in user_model._meta.concrete_fields
+        if field.attname in fields
+    ]
+    user = user_model.from_db(
+        router.db_for_read(user_model), fields, values
+    )
+    token = model.from_db(
+        router.db_for_read(model), ('key', 'user_id'), (key, user.pk)
+    )
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication which caches token -> user resolution.
+    If Django cache is shared by all processes (see foodgram/caches.py),
+    tokens are cached in it and in the per-process LRU, the revocation
+    version of the token is checked in the shared cache on every request.
+    Otherwise tokens are cached only in the per-process LRU.
+    Only the key and fields of the user needed by authentication and
+    permissions are cached, other fields are loaded on access.
+    Cached tokens are invalidated after commit of logout, user change
+    (password, deactivation) and deletion, see api/signals.py.
+    """
+    def authenticate_credentials(self, key):
+        if is_shared_cache():
+            cached = self.get_shared_cached(key)
+        else:
+            cache_key = get_token_cache_key(key)
+            cached = local_tokens.get(cache_key)
+            if cached is None:
+                cached = pack_token(self.get_token(key))
+                local_tokens.set(cache_key, cached)
+
+        # Every request gets its own instances built from cached fields.
+        token = unpack_token(self.get_model(), cached)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return (token.user, token)
+
+    def get_shared_cached(self, key):
+        """
+        Method returns the cached token if it's cached with the current
+        revocation version of the token. The version is read before
+        the database: the row read before a concurrent revocation
+        is cached with the old version and isn't used.
+        """
+        cache_key = get_token_cache_key(key)
+        version_key = get_token_version_key(key)
+        entry = local_tokens.get(cache_key)
+        if entry is None:
+            values = cache.get_many([cache_key, version_key])
+            entry = values.get(cache_key)
+            version = values.get(version_key)
+        else:
+            version = cache.get(version_key)
+            if entry[0] == version:
+                return entry[1]
+            entry = None
+        if entry is None or entry[0] != version:
+            entry = (version, pack_token(self.get_token(key)))
+            cache.set(cache_key, entry, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        local_tokens.set(cache_key, entry)
+        return entry[1]
+
+    def get_token(self, key):
+        model = self.get_model()
+        try:
+            return model.objects.select_related('user').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
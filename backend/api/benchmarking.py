@@ -0,0 +1,98 @@
+import json
+import math
+import statistics
+import time
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class QueryCounter:
+    """
+    Execute wrapper for connection.execute_wrapper().
+    Counts SQL queries executed inside the wrapper.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(samples, value):
+    """
+    Function returns percentile of the sorted samples
+    (nearest-rank method).
+    """
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(value / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+
+def summarize(samples):
+    """
+    Function returns latency summary of the samples in milliseconds.
+    """
+    samples = sorted(sample * 1000 for sample in samples)
+    summary = {
+        'count': len(samples),
+        'min': samples[0] if samples else 0.0,
+        'max': samples[-1] if samples else 0.0,
+        'mean': statistics.fmean(samples) if samples else 0.0,
+    }
+    for value in PERCENTILES:
+        summary[f'p{value}'] = percentile(samples, value)
+    return {key: round(value, 3) for key, value in summary.items()}
+
+
+def measure(func, iterations, warmup=0):
+    """
+    Function calls func warmup + iterations times.
+    Returns list of durations (seconds) of the measured calls.
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def compare(results, baseline):
+    """
+    Function adds to every scenario of results the difference
+    (in percents) with the same scenario of a baseline run.
+    """
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        latency = previous['latency_ms']
+        result['delta'] = {
+            key: round((value - latency[key]) / latency[key] * 100, 1)
+            for key, value in result['latency_ms'].items()
+            if key != 'count' and latency.get(key)
+        }
+        if 'queries' in result and 'queries' in previous:
+            result['delta']['queries'] = (
+                result['queries'] - previous['queries']
+            )
+    return results
+
+
+def write_report(results, stdout, output=None, baseline=None):
+    """
+    Function prints results as JSON and optionally saves them to a file.
+    If baseline file is given, adds difference with it to every scenario.
+    """
+    if baseline:
+        with open(baseline, encoding='utf-8') as file:
+            compare(results, json.load(file))
+    report = json.dumps(results, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(report)
+    stdout.write(report)
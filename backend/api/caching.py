@@ -0,0 +1,274 @@
+import hashlib
+import math
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+
+from foodgram.caches import is_shared_cache
+from recipes.models import Favorite, Ingredient, ShoppingCart, Tag
+from .filters import IngredientFilter
+from .metrics import CACHE_HITS, CACHE_MISSES, CACHE_STALE
+from .querysets import (get_recipe_flags, get_recipes_for_read,
+                        get_user_recipe_ids, get_users_for_read)
+from .serializers import (CustomUserReadSerializer, IngredientSerializer,
+                          TagSerializer)
+
+CACHE_KEY = 'read-cache:{}:{}'
+INVALIDATED_KEY = 'read-cache:{}:{}:invalidated'
+LOCK_KEY = 'read-cache:{}:{}:lock'
+# Version of the bootstrap data of the user, '' for all users.
+BOOTSTRAP_VERSION_KEY = 'bootstrap-version:{}'
+# Recomputation of an entry holds the lock at most LOCK_TIMEOUT seconds,
+# requests without an entry wait for it polling every LOCK_POLL_INTERVAL.
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def expires_early(expires_at, delta, now):
+    """
+    Probabilistic early expiration (XFetch): the closer the entry is
+    to expiration and the longer it takes to compute, the more likely
+    a request recomputes it early, so keys don't expire in sync.
+    """
+    beta = settings.READ_CACHE_BETA
+    return now - delta * beta * math.log(1 - random.random()) >= expires_at
+
+
+def get_entry(name, key):
+    """
+    Function returns the cache entry and the time the entry
+    or the whole cache was invalidated at (0 if it wasn't).
+    """
+    keys = [
+        CACHE_KEY.format(name, key),
+        INVALIDATED_KEY.format(name, key),
+        INVALIDATED_KEY.format(name, ''),
+    ]
+    values = cache.get_many(keys)
+    invalidated_at = max(values.get(keys[1], 0), values.get(keys[2], 0))
+    return values.get(keys[0]), invalidated_at
+
+
+def wait_for_entry(name, key):
+    """
+    Function waits while another request computes the missing entry.
+    Returns the entry or None if it hasn't appeared within LOCK_TIMEOUT.
+    """
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(CACHE_KEY.format(name, key))
+        if entry is not None:
+            return entry
+        if cache.get(LOCK_KEY.format(name, key)) is None:
+            return None
+    return None
+
+
+def compute_entry(name, key, compute, lock_key):
+    started = time.time()
+    try:
+        value = compute()
+        if value is None:
+            cache.delete(CACHE_KEY.format(name, key))
+            return None
+        timeout = settings.READ_CACHE_TIMEOUT
+        cache.set(
+            CACHE_KEY.format(name, key),
+            (value, started, started + timeout, time.time() - started),
+            timeout + settings.READ_CACHE_STALE_TIMEOUT
+        )
+        return value
+    finally:
+        if lock_key is not None:
+            cache.delete(lock_key)
+
+
+def get_cached(name, key, compute):
+    """
+    Function returns the value of compute() cached for
+    READ_CACHE_TIMEOUT seconds (stale-while-revalidate):
+        - a fresh entry is returned (hit);
+        - an expired or invalidated entry is kept READ_CACHE_STALE_TIMEOUT
+          seconds more: one request recomputes it under a short lock,
+          concurrent ones get the stale value (stale);
+        - without an entry one request computes it (miss), concurrent
+          ones wait for it instead of querying the database too.
+    Entries expire a bit earlier at random (see expires_early).
+    None values are not cached. Hits, misses and stale reads are
+    counted by name (api/metrics.py).
+    """
+    if settings.READ_CACHE_TIMEOUT <= 0:
+        return compute()
+    entry, invalidated_at = get_entry(name, key)
+    lock_key = LOCK_KEY.format(name, key)
+    if entry is not None:
+        value, computed_at, expires_at, delta = entry
+        if computed_at >= invalidated_at and not expires_early(
+            expires_at, delta, time.time()
+        ):
+            CACHE_HITS.inc(name)
+            return value
+        if not cache.add(lock_key, True, LOCK_TIMEOUT):
+            CACHE_STALE.inc(name)
+            return value
+    elif not cache.add(lock_key, True, LOCK_TIMEOUT):
+        entry = wait_for_entry(name, key)
+        if entry is not None:
+            CACHE_HITS.inc(name)
+            return entry[0]
+        lock_key = None
+    CACHE_MISSES.inc(name)
+    return compute_entry(name, key, compute, lock_key)
+
+
+def invalidate_cached(name, key=''):
+    """
+    Function marks the entry (all entries of the name if key isn't
+    given) stale: it's recomputed by the next request and served
+    to concurrent ones meanwhile. An entry computed before the
+    invalidation is stale too.
+    """
+    cache.set(
+        INVALIDATED_KEY.format(name, key), time.time(),
+        settings.READ_CACHE_TIMEOUT + settings.READ_CACHE_STALE_TIMEOUT
+    )
+
+
+def delete_cached(name, key):
+    """
+    Function removes the entry, so it's never served stale
+    (deleted objects).
+    """
+    invalidate_cached(name, key)
+    cache.delete(CACHE_KEY.format(name, key))
+
+
+def get_recipe(pk):
+    """
+    Recipe with prefetched relations as it's read by anonymous users,
+    None if it's not found.
+    """
+    return get_recipes_for_read(AnonymousUser()).filter(pk=pk).first()
+
+
+def get_cached_recipe(user, pk):
+    """
+    Function returns the recipe for RecipeReadSerializer: the cached
+    instance (it's unpickled for every request) with flags of the user,
+    None if the recipe is not found.
+    """
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    recipe = get_cached('recipe', pk, lambda: get_recipe(pk))
+    if recipe is None or not user.is_authenticated:
+        return recipe
+    flags = get_recipe_flags(user, recipe)
+    recipe.is_favorited = flags['is_favorited']
+    recipe.is_in_shopping_cart = flags['is_in_shopping_cart']
+    if recipe.author is not None:
+        recipe.author.is_subscribed = flags['is_subscribed']
+    return recipe
+
+
+def get_cached_tags():
+    return get_cached('tags', '', lambda: TagSerializer(
+        Tag.objects.all(), many=True
+    ).data)
+
+
+def get_cached_ingredients(request):
+    """
+    Function returns ingredients filtered by the request
+    (IngredientFilter), one entry for every value of the filters.
+    """
+    filterset = IngredientFilter(
+        request.query_params, queryset=Ingredient.objects.all(),
+        request=request
+    )
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    key = hashlib.sha256(repr(sorted(
+        filterset.form.cleaned_data.items()
+    )).encode()).hexdigest()
+    return get_cached('ingredients', key, lambda: IngredientSerializer(
+        filterset.qs, many=True
+    ).data)
+
+
+def get_bootstrap_versions(user_id):
+    """
+    Function returns versions of the bootstrap data of the user and of
+    all users. A missing version (new or evicted) gets a new value, so
+    entries computed for previous versions are never read again.
+    """
+    keys = [
+        BOOTSTRAP_VERSION_KEY.format(user_id),
+        BOOTSTRAP_VERSION_KEY.format(''),
+    ]
+    versions = cache.get_many(keys)
+    return tuple(
+        versions.get(key) or cache.get_or_set(key, time.time_ns, None)
+        for key in keys
+    )
+
+
+def invalidate_bootstrap(user_id=None):
+    """
+    Function changes version of the bootstrap data of the user
+    (of all users if user_id isn't given).
+    """
+    cache.set(
+        BOOTSTRAP_VERSION_KEY.format(user_id or ''), time.time_ns(), None
+    )
+
+
+def get_bootstrap(request):
+    """
+    Bootstrap data of the user except tags, one query per part.
+    """
+    user = request.user
+    shopping_cart = get_user_recipe_ids(user, ShoppingCart)
+    return {
+        # Authentication caches only some fields of the user.
+        'user': dict(CustomUserReadSerializer(
+            get_users_for_read(user).get(pk=user.pk),
+            context={'request': request}
+        ).data),
+        'shopping_cart_count': len(shopping_cart),
+        'favorited': get_user_recipe_ids(user, Favorite),
+        'in_shopping_cart': shopping_cart,
+    }
+
+
+def get_cached_bootstrap(request):
+    """
+    Function returns startup data of the frontend for the authenticated
+    user: the user, tags, number of recipes in the shopping cart and ids
+    of favorited and carted recipes. Data of the user is cached under
+    its versions (see invalidate_bootstrap), tags under their own entry.
+    Versions are changed by any process (API workers, the task worker),
+    so data of the user is cached only if the cache is shared by them.
+    """
+    if settings.READ_CACHE_TIMEOUT <= 0 or not is_shared_cache():
+        data = get_bootstrap(request)
+    else:
+        user_id = request.user.pk
+        user_version, version = get_bootstrap_versions(user_id)
+        data = get_cached(
+            'bootstrap', f'{user_id}:{user_version}:{version}',
+            lambda: get_bootstrap(request)
+        )
+    return {
+        'user': data['user'],
+        'tags': get_cached_tags(),
+        'shopping_cart_count': data['shopping_cart_count'],
+        'favorited': data['favorited'],
+        'in_shopping_cart': data['in_shopping_cart'],
+    }
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from foodgram.caches import is_shared_cache
+
+SHARED_CACHE_ERROR_ID = 'api.E001'
+
+
+def get_shared_cache_features():
+    """
+    Function returns enabled settings which keep state in the default
+    cache: with a cache in the memory of the process other workers
+    don't see this state.
+    """
+    features = []
+    if settings.DATABASE_REPLICAS:
+        features.append('DB_REPLICAS')
+    if settings.READ_CACHE_TIMEOUT:
+        features.append('READ_CACHE_TIMEOUT')
+    return features
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Function checks that the default cache is shared by all processes
+    if features keeping state in it are enabled (DEBUG is skipped).
+    """
+    features = get_shared_cache_features()
+    if settings.DEBUG or not features or is_shared_cache():
+        return []
+    return [Error(
+        f'{", ".join(features)} хранят состояние в кэше default, '
+        'а он находится в памяти процесса.',
+        hint='Укажите общий для всех процессов кэш в CACHE_BACKEND и '
+             'CACHE_LOCATION, например Redis.',
+        id=SHARED_CACHE_ERROR_ID,
+    )]
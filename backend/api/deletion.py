@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favorite, Recipe, RecipeIngredientAmount,
+                            RecipeSignature, RecipeSignatureBand, RecipeTrend,
+                            ShoppingCart)
+from recipes.pantry import update_pantry_index
+from recipes.similarity import remove_recipes
+from recipes.tasks import get_indexed_ingredient_ids
+from users.models import CustomUser, Subscription
+
+
+def get_recipe_ingredient_ids(recipe_id):
+    """
+    Function returns ingredients the recipe may have in the pantry
+    index: indexed ingredients may differ if indexing is still pending.
+    """
+    return set(RecipeIngredientAmount.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True)) | set(
+        get_indexed_ingredient_ids(recipe_id)
+    )
+
+
+def soft_delete_recipe(recipe):
+    """
+    Function marks the recipe deleted: it's hidden from queries and
+    removed from trending recipes, the pantry index and the similar
+    recipes index at once, its rows are removed later by purge_recipe.
+    The recipe row is locked first, so pending indexing of the
+    recipe doesn't interleave (see recipes/tasks.py).
+    """
+    with transaction.atomic():
+        recipe.deleted_at = timezone.now()
+        recipe.save(update_fields=('deleted_at',))
+        RecipeTrend.objects.filter(recipe_id=recipe.pk).delete()
+        update_pantry_index(recipe.pk, get_recipe_ingredient_ids(recipe.pk))
+        remove_recipes([recipe.pk])
+
+
+def soft_delete_user(user):
+    """
+    Function marks the user deleted and inactive: the user is hidden
+    from queries and can't log in or use tokens (cached tokens
+    are invalidated on save), rows are removed later by purge_user.
+    """
+    user.deleted_at = timezone.now()
+    user.is_active = False
+    user.save(update_fields=('deleted_at', 'is_active'))
+
+
+def delete_in_batches(queryset, batch_size):
+    """
+    Function deletes rows of the queryset batch_size rows per query,
+    every batch in its own transaction, so locks are short and
+    rows are never loaded into memory all at once.
+    Yields number of deleted rows after every batch.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            model._base_manager.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        yield deleted
+
+
+def update_in_batches(queryset, batch_size, **values):
+    """
+    Function updates rows of the queryset (which must not match
+    updated rows anymore) batch_size rows per query, every batch
+    in its own transaction.
+    Yields number of updated rows after every batch.
+    """
+    model = queryset.model
+    updated = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return
+            model._base_manager.filter(pk__in=ids).update(**values)
+        updated += len(ids)
+        yield updated
+
+
+def get_recipe_dependents(recipe_id):
+    return (
+        Favorite.objects.filter(recipe_id=recipe_id),
+        ShoppingCart.objects.filter(recipe_id=recipe_id),
+        RecipeIngredientAmount.objects.filter(recipe_id=recipe_id),
+        Recipe.tags.through.objects.filter(recipe_id=recipe_id),
+        RecipeSignatureBand.objects.filter(recipe_id=recipe_id),
+    )
+
+
+def get_user_dependents(user_id):
+    return (
+        Favorite.objects.filter(user_id=user_id),
+        ShoppingCart.objects.filter(user_id=user_id),
+        Subscription.objects.filter(user_id=user_id),
+        Subscription.objects.filter(author_id=user_id),
+        Token.objects.filter(user_id=user_id),
+    )
+
+
+def purge_recipe(recipe_id, batch_size=None):
+    """
+    Function removes the deleted recipe: favorites, shopping carts,
+    ingredients, tags and index entries are deleted in batches,
+    the recipe is removed from the pantry index, then the row itself.
+    Does nothing if the recipe isn't marked deleted.
+    Yields (table, number of deleted rows) after every batch.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    if not Recipe.all_objects.filter(
+        pk=recipe_id, deleted_at__isnull=False
+    ).exists():
+        return
+    ingredient_ids = get_recipe_ingredient_ids(recipe_id)
+    for queryset in get_recipe_dependents(recipe_id):
+        table = queryset.model._meta.db_table
+        for deleted in delete_in_batches(queryset, batch_size):
+            yield table, deleted
+    update_pantry_index(recipe_id, ingredient_ids)
+    RecipeSignature.objects.filter(recipe_id=recipe_id).delete()
+    Recipe.all_objects.filter(pk=recipe_id).delete()
+    yield Recipe._meta.db_table, 1
+
+
+def purge_user(user_id, batch_size=None):
+    """
+    Function removes the deleted user: favorites, shopping carts,
+    subscriptions and tokens are deleted in batches, recipes of the
+    user lose their author in batches, then the row itself is deleted.
+    Does nothing if the user isn't marked deleted.
+    Yields (table, number of deleted or updated rows) after every batch.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    if not CustomUser.all_objects.filter(
+        pk=user_id, deleted_at__isnull=False
+    ).exists():
+        return
+    for queryset in get_user_dependents(user_id):
+        table = queryset.model._meta.db_table
+        for deleted in delete_in_batches(queryset, batch_size):
+            yield table, deleted
+    recipes = Recipe.all_objects.filter(author_id=user_id)
+    for updated in update_in_batches(recipes, batch_size, author=None):
+        yield Recipe._meta.db_table, updated
+    CustomUser.all_objects.filter(pk=user_id).delete()
+    yield CustomUser._meta.db_table, 1
+
+
+def purge_deleted(batch_size=None):
+    """
+    Function purges all recipes and users marked deleted, e.g. if
+    their background tasks have failed.
+    Yields (object label, table, number of rows) after every batch.
+    """
+    recipe_ids = Recipe.all_objects.filter(
+        deleted_at__isnull=False
+    ).order_by('pk').values_list('pk', flat=True)
+    for recipe_id in list(recipe_ids):
+        for table, count in purge_recipe(recipe_id, batch_size):
+            yield f'recipe {recipe_id}', table, count
+    user_ids = CustomUser.all_objects.filter(
+        deleted_at__isnull=False
+    ).order_by('pk').values_list('pk', flat=True)
+    for user_id in list(user_ids):
+        for table, count in purge_user(user_id, batch_size):
+            yield f'user {user_id}', table, count
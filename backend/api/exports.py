@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+
+EXPORTS_DIR = 'exports'
+X_ACCEL_DELIVERY = 'x-accel'
+
+
+def get_exports_root():
+    return Path(settings.PROTECTED_ROOT) / EXPORTS_DIR
+
+
+def get_export_path(user_id, name):
+    """
+    Function returns path of the user's export file.
+    Every user has its own directory, names with
+    directories are rejected.
+    """
+    if not name or Path(name).name != name or name.startswith('.'):
+        raise Http404
+    return get_exports_root() / str(user_id) / name
+
+
+def get_export_name(kind, content, extension):
+    """
+    Function returns name of the export file for the content:
+    the same content of the same kind gets the same file.
+    """
+    digest = hashlib.sha256(json.dumps(
+        content, ensure_ascii=False, sort_keys=True, default=str
+    ).encode()).hexdigest()
+    return f'{kind}-{digest[:32]}.{extension}'
+
+
+def is_expired(path, now=None):
+    now = time.time() if now is None else now
+    return path.stat().st_mtime + settings.EXPORT_FILE_TTL < now
+
+
+def reuse_export(user_id, name):
+    """
+    Function checks if the user's export file exists and isn't expired.
+    Reused file gets new modification time, so it lives another TTL.
+    """
+    path = get_export_path(user_id, name)
+    try:
+        if is_expired(path):
+            return False
+        path.touch()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def save_export(user_id, name, buffer):
+    """
+    Function writes BytesIO to the user's export file atomically
+    and removes expired exports of the user.
+    """
+    path = get_export_path(user_id, name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cleanup_exports(path.parent)
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.')
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(buffer.getbuffer())
+    os.replace(temp_path, path)
+    return path
+
+
+def cleanup_exports(directory=None, now=None):
+    """
+    Function removes export files older than EXPORT_FILE_TTL seconds
+    and empty user directories. Returns number of removed files.
+    """
+    now = time.time() if now is None else now
+    directories = [directory] if directory else None
+    if directories is None:
+        root = get_exports_root()
+        if not root.is_dir():
+            return 0
+        directories = [path for path in root.iterdir() if path.is_dir()]
+    removed = 0
+    for user_directory in directories:
+        for path in user_directory.iterdir():
+            try:
+                if path.is_file() and is_expired(path, now):
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if directory is None and not any(user_directory.iterdir()):
+            user_directory.rmdir()
+    return removed
+
+
+def get_content_disposition(filename):
+    try:
+        filename.encode('ascii')
+        escaped = filename.replace('\\', '\\\\').replace('"', r'\"')
+        return f'attachment; filename="{escaped}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def export_response(user_id, name, filename, content_type):
+    """
+    Function returns response with the user's export file.
+    With EXPORT_DELIVERY = 'x-accel' the file is sent by nginx
+    (internal location PROTECTED_URL), the worker is released at once.
+    Otherwise the file is streamed by Django (development).
+    """
+    path = get_export_path(user_id, name)
+    if not path.is_file():
+        raise Http404
+    if settings.EXPORT_DELIVERY == X_ACCEL_DELIVERY:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            f'{settings.PROTECTED_URL}{EXPORTS_DIR}/{user_id}/{quote(name)}'
+        )
+        response['Content-Disposition'] = get_content_disposition(filename)
+        return response
+    return FileResponse(
+        path.open('rb'),
+        as_attachment=True,
+        filename=filename,
+        content_type=content_type
+    )
@@ -0,0 +1,61 @@
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+UNKNOWN_FIELDS_ERROR = 'Неизвестные поля: {}.'
+
+
+def parse_fields(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_requested_fields(request, serializer_class):
+    """
+    Function returns names of the serializer fields requested with
+    ?fields= (fields to render) and ?omit= (fields to drop),
+    in the order of Meta.fields.
+    Returns None if all fields are requested.
+    """
+    fields = parse_fields(request.query_params.get(FIELDS_PARAM, ''))
+    omit = parse_fields(request.query_params.get(OMIT_PARAM, ''))
+    if not fields and not omit:
+        return None
+    available = serializer_class.Meta.fields
+    errors = {}
+    for param, names in ((FIELDS_PARAM, fields), (OMIT_PARAM, omit)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [UNKNOWN_FIELDS_ERROR.format(', '.join(unknown))]
+    if errors:
+        raise ValidationError(errors)
+    return tuple(
+        name for name in available
+        if (not fields or name in fields) and name not in omit
+    )
+
+
+def is_requested(fields, name):
+    """
+    Function checks if the field is rendered,
+    fields is the result of get_requested_fields().
+    """
+    return fields is None or name in fields
+
+
+class SparseFieldsViewMixin:
+    """
+    Class for inheritance.
+    Uses in:
+        CustomUserViewSet, RecipeViewSet.
+    Passes fields requested with ?fields= and ?omit=
+    to the serializer of GET requests.
+    """
+    def get_requested_fields(self, serializer_class=None):
+        if serializer_class is None:
+            serializer_class = self.get_serializer_class()
+        return get_requested_fields(self.request, serializer_class)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
@@ -37,11 +37,9 @@ class RecipeFilter(FilterSet):
         """
         user = self.request.user
         if value == 1:
-            queryset = Recipe.objects.filter(favorite_recipe__user=user)
+            queryset = queryset.filter(favorite_recipe__user=user)
         if value == 0:
-            queryset = Recipe.objects.all().exclude(
-                favorite_recipe__user=user
-            )
+            queryset = queryset.exclude(favorite_recipe__user=user)
         return queryset.order_by('-pk')
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
@@ -53,11 +51,9 @@ class RecipeFilter(FilterSet):
         """
         user = self.request.user
         if value == 1:
-            queryset = Recipe.objects.filter(shopping_cart__user=user)
+            queryset = queryset.filter(shopping_cart__user=user)
         if value == 0:
-            queryset = Recipe.objects.all().exclude(
-                shopping_cart__user=user
-            )
+            queryset = queryset.exclude(shopping_cart__user=user)
         return queryset.order_by('-pk')
 
     class Meta:
@@ -0,0 +1,156 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from api.benchmarking import QueryCounter, measure, summarize, write_report
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+
+
+def throttling_disabled():
+    """
+    Function returns override_settings which disables all throttle
+    scopes: benchmarks repeat the same request.
+    """
+    rates = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': dict.fromkeys(rates),
+    })
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Drives the real API endpoints in-process with the Django test
+    client and reports latency percentiles (ms) and the number of
+    SQL queries per request as JSON. Throttles are disabled.
+    Run generate_data first to get a dataset of realistic size.
+    """
+    help = 'Benchmarks API endpoints and reports latency as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--user', type=int,
+            help='id of the user to authenticate requests with.'
+        )
+        parser.add_argument('--ingredient-prefix', default='мо')
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Run only given scenarios (can be repeated).'
+        )
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        host = 'testserver'
+        if '*' not in settings.ALLOWED_HOSTS:
+            host = settings.ALLOWED_HOSTS[0]
+        self.anonymous = Client(
+            raise_request_exception=False, HTTP_HOST=host
+        )
+        self.client = Client(
+            raise_request_exception=False, HTTP_HOST=host,
+            HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+
+        scenarios = self.get_scenarios(user, options['ingredient_prefix'])
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - set(scenarios)
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {unknown}')
+            scenarios = {
+                name: scenarios[name] for name in options['scenarios']
+            }
+
+        results = {}
+        with throttling_disabled():
+            for name, (client, path) in scenarios.items():
+                results[name] = self.run_scenario(
+                    client, path, options['iterations'], options['warmup']
+                )
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+
+    def get_user(self, user_id):
+        if user_id:
+            return CustomUser.objects.get(pk=user_id)
+        user = CustomUser.objects.annotate(
+            subscriptions_count=Count('sub_user')
+        ).order_by('-subscriptions_count').first()
+        if user is None:
+            raise CommandError(
+                'Пользователи не найдены, выполните generate_data.'
+            )
+        return user
+
+    def get_scenarios(self, user, ingredient_prefix):
+        """
+        Method returns scenarios: name -> (client, path).
+        """
+        tag = Tag.objects.order_by('pk').first()
+        author_id = Recipe.objects.filter(
+            author__isnull=False
+        ).values_list('author_id', flat=True).first()
+        return {
+            'recipes_list': (self.anonymous, '/api/recipes/'),
+            'recipes_list_auth': (self.client, '/api/recipes/'),
+            'recipes_cards': (
+                self.client,
+                '/api/recipes/?fields=id,name,image,cooking_time,'
+                'is_favorited,is_in_shopping_cart'
+            ),
+            'recipes_by_tag': (
+                self.client, f'/api/recipes/?tags={tag and tag.slug}'
+            ),
+            'recipes_by_author': (
+                self.client, f'/api/recipes/?author={author_id}'
+            ),
+            'recipes_favorited': (
+                self.client, '/api/recipes/?is_favorited=1'
+            ),
+            'recipes_in_shopping_cart': (
+                self.client, '/api/recipes/?is_in_shopping_cart=1'
+            ),
+            'subscriptions': (
+                self.client, '/api/users/subscriptions/?recipes_limit=3'
+            ),
+            'download_shopping_cart': (
+                self.client, '/api/recipes/download_shopping_cart/'
+            ),
+            'ingredient_search': (
+                self.anonymous, f'/api/ingredients/?name={ingredient_prefix}'
+            ),
+        }
+
+    def request(self, client, path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path} вернул {response.status_code}')
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def run_scenario(self, client, path, iterations, warmup):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            self.request(client, path)
+        samples = measure(
+            lambda: self.request(client, path), iterations, warmup
+        )
+        return {
+            'path': path,
+            'queries': queries.count,
+            'latency_ms': summarize(samples),
+        }
@@ -0,0 +1,124 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from api.benchmarking import summarize, write_report
+
+POOL_ENGINE = 'foodgram.backends.postgresql_pool'
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+MODES = ('new', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Simulates requests of worker threads against the database
+    and compares three connection modes:
+    new - a connection per request (CONN_MAX_AGE = 0),
+    persistent - connection is kept by the thread (CONN_MAX_AGE > 0),
+    pool - connections are taken from the pool (PostgreSQL only).
+    Reports latency of a request (connect + query + close) as JSON.
+    """
+    help = 'Benchmarks database connection handling modes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests per thread.'
+        )
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--pool-max-overflow', type=int, default=4)
+        parser.add_argument(
+            '--mode', action='append', dest='modes', choices=MODES,
+            help='Run only given modes (can be repeated).'
+        )
+        parser.add_argument('--query', default='SELECT 1')
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        modes = options['modes'] or MODES
+        results = {}
+        for mode in modes:
+            if mode == 'pool' and settings_dict['ENGINE'] not in (
+                POSTGRESQL_ENGINE, POOL_ENGINE
+            ):
+                if options['modes']:
+                    raise CommandError(
+                        'Пул соединений доступен только для PostgreSQL.'
+                    )
+                continue
+            results[mode] = self.run_mode(
+                self.get_settings(mode, settings_dict, options),
+                f'benchmark-{mode}',
+                options['threads'],
+                options['requests'],
+                options['query']
+            )
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+
+    def get_settings(self, mode, settings_dict, options):
+        settings_dict = {**settings_dict, 'CONN_HEALTH_CHECKS': True}
+        settings_dict.pop('POOL', None)
+        if settings_dict['ENGINE'] == POOL_ENGINE:
+            settings_dict['ENGINE'] = POSTGRESQL_ENGINE
+        if mode == 'new':
+            settings_dict['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings_dict['CONN_MAX_AGE'] = None
+        else:
+            settings_dict.update(
+                ENGINE=POOL_ENGINE,
+                CONN_MAX_AGE=0,
+                POOL={
+                    'SIZE': options['pool_size'],
+                    'MAX_OVERFLOW': options['pool_max_overflow'],
+                }
+            )
+        return settings_dict
+
+    def run_mode(self, settings_dict, alias, threads, requests, query):
+        backend = load_backend(settings_dict['ENGINE'])
+
+        def worker(_):
+            # Every thread has its own connection like a worker thread.
+            connection = backend.DatabaseWrapper(settings_dict, alias)
+            samples = []
+            try:
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    # The same calls as on request_started/finished.
+                    connection.close_if_unusable_or_obsolete()
+                    with connection.cursor() as cursor:
+                        cursor.execute(query)
+                        cursor.fetchall()
+                    connection.close_if_unusable_or_obsolete()
+                    samples.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+            return samples
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            samples = [
+                sample for thread_samples in executor.map(
+                    worker, range(threads)
+                ) for sample in thread_samples
+            ]
+        elapsed = time.perf_counter() - start
+        return {
+            'threads': threads,
+            'requests': len(samples),
+            'requests_per_second': round(len(samples) / elapsed, 2),
+            'latency_ms': summarize(samples),
+        }
@@ -0,0 +1,140 @@
+import datetime
+import decimal
+import io
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import measure, summarize, write_report
+from api.parsers import FastJSONParser
+from api.querysets import get_recipes_for_read, get_subscriptions_for_read
+from api.renderers import FastJSONRenderer
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             SubscriptionSerializer)
+from recipes.models import Ingredient
+from users.models import CustomUser
+
+IMPLEMENTATIONS = {
+    'stdlib': (JSONRenderer, JSONParser),
+    'fast': (FastJSONRenderer, FastJSONParser),
+}
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Micro-benchmark of JSON rendering and parsing on real serializer
+    output: ingredients list, pages of recipes and subscriptions.
+    Compares JSONRenderer/JSONParser with FastJSONRenderer/
+    FastJSONParser and checks the rendered bytes are identical.
+    """
+    help = 'Benchmarks JSON renderers and parsers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        results = {}
+        mismatches = []
+        payloads = self.get_payloads(user, options['page_size'])
+        for name, data in payloads.items():
+            expected = JSONRenderer().render(data)
+            for implementation, (renderer_class, parser_class) in (
+                IMPLEMENTATIONS.items()
+            ):
+                renderer = renderer_class()
+                content = renderer.render(data)
+                if content != expected:
+                    mismatches.append(f'{name} ({implementation})')
+                results[f'{name}.render.{implementation}'] = {
+                    'bytes': len(content),
+                    'identical': content == expected,
+                    'latency_ms': summarize(measure(
+                        lambda: renderer.render(data),
+                        options['iterations'], options['warmup']
+                    )),
+                }
+                parser = parser_class()
+                results[f'{name}.parse.{implementation}'] = {
+                    'bytes': len(expected),
+                    'latency_ms': summarize(measure(
+                        lambda: parser.parse(io.BytesIO(expected)),
+                        options['iterations'], options['warmup']
+                    )),
+                }
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+        if mismatches:
+            raise CommandError(
+                f'Вывод отличается от JSONRenderer: {", ".join(mismatches)}'
+            )
+
+    def get_user(self, user_id):
+        if user_id:
+            return CustomUser.objects.get(pk=user_id)
+        user = CustomUser.objects.filter(sub_user__isnull=False).first()
+        if user is None:
+            raise CommandError(
+                'Пользователи не найдены, выполните generate_data.'
+            )
+        return user
+
+    def get_payloads(self, user, page_size):
+        request = Request(
+            APIRequestFactory().get('/api/', {'recipes_limit': 3})
+        )
+        request.user = user
+        context = {'request': request}
+        recipes = RecipeReadSerializer(
+            get_recipes_for_read(user)[:page_size], many=True,
+            context=context
+        ).data
+        subscriptions = SubscriptionSerializer(
+            get_subscriptions_for_read(user)[:page_size], many=True,
+            context=context
+        ).data
+        return {
+            'ingredients': IngredientSerializer(
+                Ingredient.objects.all(), many=True
+            ).data,
+            'recipes_page': self.paginated(recipes),
+            'subscriptions_page': self.paginated(subscriptions),
+            'types': [{
+                'text': 'Борщ — «классика»   "кавычки" \\ \t',
+                'datetime': timezone.now(),
+                'naive_datetime': datetime.datetime(2022, 5, 1, 12, 30),
+                'date': datetime.date(2022, 5, 1),
+                'time': datetime.time(7, 15, 30, 250),
+                'duration': datetime.timedelta(minutes=90),
+                'decimal': decimal.Decimal('12.50'),
+                'small_decimal': decimal.Decimal('0.00001'),
+                'big_decimal': decimal.Decimal('1E+20'),
+                'uuid': uuid.uuid4(),
+                'float': 0.1,
+                'int': 2 ** 70,
+                'empty': None,
+                'flags': (True, False),
+            }],
+        }
+
+    def paginated(self, results):
+        return {
+            'count': len(results),
+            'next': 'http://testserver/api/?limit=6&offset=6',
+            'previous': None,
+            'results': results,
+        }
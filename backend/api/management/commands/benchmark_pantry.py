@@ -0,0 +1,114 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+from api.benchmarking import QueryCounter, measure, summarize, write_report
+from recipes.models import IngredientPosting, RecipeIngredientAmount
+from recipes.pantry import PantryMatch, search_pantry
+
+ORDER_BY = {
+    'coverage': ('-coverage', 'missing', '-recipe_id'),
+    'missing': ('missing', '-matched', '-recipe_id'),
+}
+
+
+def group_by_search(ingredient_ids, ordering, limit):
+    """
+    Function ranks recipes with SQL GROUP BY over ingredients of
+    recipes, the way pantry search would work without posting lists.
+    """
+    totals = RecipeIngredientAmount.objects.filter(
+        recipe_id=OuterRef('recipe_id')
+    ).order_by().values('recipe_id').annotate(total=Count('pk'))
+    queryset = RecipeIngredientAmount.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('recipe_id').annotate(
+        matched=Count('pk'),
+        total=Subquery(totals.values('total')),
+    ).annotate(
+        missing=F('total') - F('matched'),
+        coverage=(
+            Cast('matched', FloatField()) / Cast('total', FloatField())
+        ),
+    ).order_by(*ORDER_BY[ordering])
+    return queryset.count(), [
+        PantryMatch(row['recipe_id'], row['matched'], row['missing'])
+        for row in queryset[:limit]
+    ]
+
+
+def index_search(ingredient_ids, ordering, limit):
+    results = search_pantry(ingredient_ids, ordering)
+    return len(results), results[:limit]
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Compares pantry search over posting lists (recipes/pantry.py)
+    with SQL GROUP BY over ingredients of recipes for random sets
+    of ingredients: checks that both return the same count and
+    the same first page, reports latency and number of queries.
+    """
+    help = 'Measures pantry search against SQL GROUP BY.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ingredients', type=int, default=5)
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument(
+            '--ordering', choices=tuple(ORDER_BY), default='coverage'
+        )
+        parser.add_argument('--sample', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(
+            IngredientPosting.objects.values_list('ingredient_id', flat=True)
+        )
+        if len(ingredient_ids) < options['ingredients']:
+            raise CommandError(
+                'Индекс пуст, выполните rebuild_pantry_index.'
+            )
+        rng = random.Random(options['seed'])
+        sets = [
+            rng.sample(ingredient_ids, options['ingredients'])
+            for _ in range(max(options['sample'], 1))
+        ]
+        ordering, limit = options['ordering'], options['limit']
+
+        mismatches = [
+            pantry for pantry in sets
+            if index_search(pantry, ordering, limit)
+            != group_by_search(pantry, ordering, limit)
+        ]
+        ways = {'index': index_search, 'group_by': group_by_search}
+        results = {}
+        for name, func in ways.items():
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                func(sets[0], ordering, limit)
+            pantries = iter(sets * (options['iterations'] + 1))
+            results[name] = {
+                'ingredients': options['ingredients'],
+                'queries': queries.count,
+                'latency_ms': summarize(measure(
+                    lambda: func(next(pantries), ordering, limit),
+                    options['iterations'], options['warmup']
+                )),
+            }
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+        if mismatches:
+            raise CommandError(
+                f'Результаты отличаются для наборов: {mismatches}'
+            )
@@ -0,0 +1,111 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmarking import QueryCounter, measure, summarize, write_report
+from recipes.models import RecipeIngredientAmount, RecipeSignature
+from recipes.similarity import get_similar_recipes, jaccard
+
+
+def get_all_ingredients():
+    ingredients = {}
+    queryset = RecipeIngredientAmount.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    )
+    for recipe_id, ingredient_id in queryset:
+        ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+    return ingredients
+
+
+def brute_force(recipe_id, limit, ingredients):
+    """
+    Function returns [(recipe id, similarity)] of the most similar
+    recipes by exact Jaccard similarity with every other recipe.
+    """
+    target = ingredients.get(recipe_id, set())
+    scores = [
+        (other_id, jaccard(target, other))
+        for other_id, other in ingredients.items()
+        if other_id != recipe_id
+    ]
+    scores.sort(key=lambda score: (-score[1], score[0]))
+    return [score for score in scores[:limit] if score[1] > 0]
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Compares the similar recipes index (recipes/similarity.py) with
+    brute-force Jaccard similarity over all recipes (ingredients are
+    read from the database on every call, as a request would do).
+    Reports recall@limit of the index and latency of both ways.
+    A recipe found by the index counts as a hit if its similarity is
+    not less than the similarity of the last brute-force result
+    (recipes with equal similarity are interchangeable).
+    """
+    help = 'Measures recall and latency of the similar recipes index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=6)
+        parser.add_argument('--sample', type=int, default=200)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            RecipeSignature.objects.values_list('recipe_id', flat=True)
+        )
+        if not recipe_ids:
+            raise CommandError(
+                'Индекс пуст, выполните rebuild_similar_recipes.'
+            )
+        limit = options['limit']
+        rng = random.Random(options['seed'])
+        sample = rng.sample(
+            recipe_ids, min(options['sample'], len(recipe_ids))
+        )
+        ingredients = get_all_ingredients()
+
+        hits = expected = 0
+        for recipe_id in sample:
+            exact = brute_force(recipe_id, limit, ingredients)
+            if not exact:
+                continue
+            threshold = exact[-1][1]
+            expected += len(exact)
+            hits += sum(
+                1 for _, score in get_similar_recipes(recipe_id, limit)
+                if score >= threshold
+            )
+        recall = round(hits / expected, 4) if expected else 1.0
+
+        ways = {
+            'index': lambda recipe_id: get_similar_recipes(recipe_id, limit),
+            'brute_force': lambda recipe_id: brute_force(
+                recipe_id, limit, get_all_ingredients()
+            ),
+        }
+        results = {}
+        for name, func in ways.items():
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                func(sample[0])
+            recipes = iter(sample * (options['iterations'] + 1))
+            results[name] = {
+                'recipes': len(recipe_ids),
+                'queries': queries.count,
+                'latency_ms': summarize(measure(
+                    lambda: func(next(recipes)),
+                    options['iterations'], options['warmup']
+                )),
+            }
+        results['index']['recall'] = recall
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
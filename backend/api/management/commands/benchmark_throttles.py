@@ -0,0 +1,71 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import measure, summarize, write_report
+from api.throttling import (THROTTLE_CACHE_ALIAS, ExportThrottle,
+                            SearchThrottle, ToggleThrottle)
+from api.views import IngredientViewSet
+
+# Bucket which is never empty during the benchmark.
+BENCHMARK_RATE = '1000000000/day'
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Measures throttle bookkeeping: allow_request() of every scope
+    against the 'throttle' cache (THROTTLE_CACHE_BACKEND), and
+    ingredients search with and without SearchThrottle.
+    Buckets have a huge rate, so every request is allowed.
+    """
+    help = 'Measures latency added by throttles.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--ingredient-prefix', default='мо')
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        results = {}
+        for throttle_class in (SearchThrottle, ToggleThrottle, ExportThrottle):
+            throttle = type(
+                throttle_class.__name__, (throttle_class,),
+                {'rate': BENCHMARK_RATE}
+            )()
+            request = Request(factory.get('/api/'))
+            results[f'{throttle.scope}.allow_request'] = {
+                'cache': caches[THROTTLE_CACHE_ALIAS].__class__.__name__,
+                'latency_ms': summarize(measure(
+                    lambda: throttle.allow_request(request, None),
+                    options['iterations'], options['warmup']
+                )),
+            }
+
+        path = f'/api/ingredients/?name={options["ingredient_prefix"]}'
+        throttled = type(
+            'SearchThrottle', (SearchThrottle,), {'rate': BENCHMARK_RATE}
+        )
+        views = {
+            'ingredients.no_throttle': IngredientViewSet.as_view(
+                {'get': 'list'}, throttle_classes=()
+            ),
+            'ingredients.throttle': IngredientViewSet.as_view(
+                {'get': 'list'}, throttle_classes=(throttled,)
+            ),
+        }
+        for name, view in views.items():
+            results[name] = {'latency_ms': summarize(measure(
+                lambda: view(factory.get(path)).render(),
+                options['requests'], options['warmup']
+            ))}
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
@@ -0,0 +1,83 @@
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.benchmarking import summarize, write_report
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=24',
+    '/api/tags/',
+    '/api/ingredients/?name=мо',
+)
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Loads a running server over HTTP with the given concurrency
+    and reports throughput (requests per second) and latency.
+    Is used to compare deployments, e.g. SERVER_MODE=wsgi and
+    SERVER_MODE=asgi, under the same concurrency.
+    """
+    help = 'Measures throughput of a running server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request (can be repeated).'
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--token', help='Token for authorization.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        results = {}
+        for path in options['paths'] or DEFAULT_PATHS:
+            url = options['url'].rstrip('/') + urllib.parse.quote(
+                path, safe='/?=&'
+            )
+            results[path] = self.load(
+                url, headers, options['concurrency'],
+                options['requests'], options['timeout']
+            )
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+
+    def load(self, url, headers, concurrency, requests, timeout):
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as res:
+                    res.read()
+                    ok = res.status < 400
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            responses = list(executor.map(fetch, range(requests)))
+        elapsed = time.perf_counter() - start
+        return {
+            'concurrency': concurrency,
+            'requests': requests,
+            'errors': sum(1 for _, ok in responses if not ok),
+            'requests_per_second': round(requests / elapsed, 2),
+            'latency_ms': summarize(duration for duration, _ in responses),
+        }
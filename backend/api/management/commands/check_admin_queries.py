@@ -0,0 +1,73 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from api.benchmarking import QueryCounter
+from users.models import CustomUser
+
+MAX_QUERIES = 12
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Opens the first two pages of every admin changelist and checks
+    that the number of SQL queries doesn't depend on the rows shown
+    and doesn't exceed --max-queries.
+    Everything is done in a transaction which is rolled back.
+    """
+    help = 'Checks the number of queries of admin changelists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-queries', type=int, default=MAX_QUERIES)
+
+    def handle(self, *args, **options):
+        errors = []
+        with transaction.atomic():
+            client = Client(raise_request_exception=True)
+            client.force_login(self.get_superuser())
+            for model in admin.site._registry:
+                errors.extend(self.check_changelist(
+                    client, model, options['max_queries']
+                ))
+            transaction.set_rollback(True)
+        if errors:
+            raise CommandError('\n'.join(errors))
+
+    def get_superuser(self):
+        user = CustomUser.objects.filter(is_superuser=True).first()
+        if user is None:
+            user = CustomUser.objects.create_superuser(
+                username='admin-queries-check',
+                email='admin-queries-check@foodgram.test',
+                password=None
+            )
+        return user
+
+    def check_changelist(self, client, model, max_queries):
+        url = reverse(
+            f'admin:{model._meta.app_label}_{model._meta.model_name}'
+            '_changelist'
+        )
+        counts = []
+        for page in (1, 2):
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                response = client.get(url, {PAGE_VAR: page})
+            if response.status_code != 200:
+                return [f'{url}?{PAGE_VAR}={page}: {response.status_code}']
+            rows = len(response.context_data['cl'].result_list)
+            counts.append(queries.count)
+            self.stdout.write(
+                f'{url}?{PAGE_VAR}={page}: {queries.count} queries, '
+                f'{rows} rows'
+            )
+        errors = []
+        if len(set(counts)) > 1:
+            errors.append(f'{url}: число запросов зависит от строк {counts}')
+        if max(counts) > max_queries:
+            errors.append(f'{url}: {max(counts)} > {max_queries} запросов')
+        return errors
@@ -0,0 +1,181 @@
+import random
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import measure, summarize, write_report
+from api.querysets import (get_recipes_for_read, get_subscriptions_for_read,
+                           get_users_for_read)
+from api.serializers import (CustomUserReadSerializer, RecipeReadSerializer,
+                             ShortRecipeSerializer, SubscriptionSerializer)
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+def get_recipes(user, fields, aggregate):
+    return get_recipes_for_read(user, fields=fields, aggregate=aggregate)
+
+
+def get_short_recipes(user, fields, aggregate):
+    return Recipe.objects.all()
+
+
+def get_users(user, fields, aggregate):
+    return get_users_for_read(user, fields=fields)
+
+
+def get_subscriptions(user, fields, aggregate):
+    return get_subscriptions_for_read(user, fields)
+
+
+# Serializers with the fast path: serializer, queryset, if fields
+# can be chosen (?fields=), if the reader has to be authenticated.
+CASES = {
+    'recipes': (RecipeReadSerializer, get_recipes, True, False),
+    'short_recipes': (ShortRecipeSerializer, get_short_recipes, False, False),
+    'users': (CustomUserReadSerializer, get_users, True, False),
+    'subscriptions': (SubscriptionSerializer, get_subscriptions, True, True),
+}
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Checks that read serializers of list endpoints render the same
+    JSON with the compiled fast path (FAST_SERIALIZERS) as with DRF
+    fields. Cases are random (--seed): serializer, reader (anonymous
+    or any user), sparse fields, page, recipes_limit and, on
+    PostgreSQL, JSON aggregation of tags and ingredients.
+    Reports serialization latency of a page for both paths.
+    """
+    help = 'Checks parity of the fast path of read serializers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        subscriber = CustomUser.objects.filter(
+            sub_user__isnull=False
+        ).first()
+        if subscriber is None:
+            raise CommandError(
+                'Подписки не найдены, выполните generate_data.'
+            )
+        self.user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+        self.aggregates = [False]
+        if connection.vendor == 'postgresql':
+            self.aggregates.append(True)
+        self.counts = {
+            name: get_queryset(subscriber, None, False).count()
+            for name, (_, get_queryset, _, _) in CASES.items()
+        }
+        generator = random.Random(options['seed'])
+        mismatches = []
+        for number in range(options['samples']):
+            case = self.get_case(generator, subscriber, options['page_size'])
+            objects = self.fetch(case)
+            rendered = {}
+            for fast in (True, False):
+                with override_settings(FAST_SERIALIZERS=fast):
+                    rendered[fast] = self.render(case, objects)
+            if rendered[True] != rendered[False]:
+                mismatches.append(f'{number}: {self.describe(case)}')
+
+        results = {}
+        for name in CASES:
+            case = self.get_case(
+                generator, subscriber, options['page_size'], name
+            )
+            case.update(fields=None, offset=0, reader=subscriber)
+            objects = self.fetch(case)
+            for fast in (True, False):
+                mode = 'fast' if fast else 'drf'
+                with override_settings(FAST_SERIALIZERS=fast):
+                    latencies = measure(
+                        lambda: self.render(case, objects),
+                        options['iterations'], options['warmup']
+                    )
+                results[f'{name}_{mode}'] = {
+                    'page_size': len(objects),
+                    'latency_ms': summarize(latencies),
+                }
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+        if mismatches:
+            raise CommandError(
+                'Вывод отличается в примерах: ' + '; '.join(mismatches[:20])
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Вывод совпадает в {options["samples"]} примерах.'
+        ))
+
+    def get_case(self, generator, subscriber, page_size, name=None):
+        name = name or generator.choice(list(CASES))
+        serializer_class, _, sparse, authenticated = CASES[name]
+        if authenticated:
+            reader = subscriber
+        elif generator.random() < 0.3:
+            reader = AnonymousUser()
+        else:
+            reader = CustomUser.objects.get(
+                pk=generator.choice(self.user_ids)
+            )
+        fields = None
+        if sparse and generator.random() < 0.5:
+            available = serializer_class.Meta.fields
+            chosen = set(generator.sample(
+                available, generator.randint(1, len(available))
+            ))
+            fields = tuple(field for field in available if field in chosen)
+        params = {}
+        if generator.random() < 0.5:
+            params['recipes_limit'] = generator.randint(0, 5)
+        return {
+            'name': name,
+            'reader': reader,
+            'fields': fields,
+            'aggregate': generator.choice(self.aggregates),
+            'offset': generator.randint(0, max(self.counts[name] - 1, 0)),
+            'page_size': page_size,
+            'params': params,
+        }
+
+    def describe(self, case):
+        return ', '.join(
+            f'{key}={value}' for key, value in case.items()
+            if key != 'page_size'
+        )
+
+    def fetch(self, case):
+        _, get_queryset, _, _ = CASES[case['name']]
+        queryset = get_queryset(
+            case['reader'], case['fields'], case['aggregate']
+        )
+        return list(
+            queryset[case['offset']:case['offset'] + case['page_size']]
+        )
+
+    def render(self, case, objects):
+        serializer_class = CASES[case['name']][0]
+        request = Request(APIRequestFactory().get('/api/', case['params']))
+        request.user = case['reader']
+        kwargs = {}
+        if case['fields'] is not None:
+            kwargs['fields'] = case['fields']
+        return JSONRenderer().render(serializer_class(
+            objects, many=True, context={'request': request}, **kwargs
+        ).data)
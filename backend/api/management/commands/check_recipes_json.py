@@ -0,0 +1,90 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.benchmarking import QueryCounter, measure, summarize, write_report
+from api.querysets import get_recipes_for_read
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+from users.models import CustomUser
+
+MODES = {'orm': False, 'json': True}
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Checks that recipes with tags and ingredients aggregated into JSON
+    by PostgreSQL are rendered exactly as with prefetched model
+    instances, for every recipe, anonymous and authenticated user.
+    Reports latency and number of queries of a page for both paths.
+    """
+    help = 'Checks parity of the JSON aggregation read path of recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Проверка доступна только для PostgreSQL.')
+        user = self.get_user(options['user'])
+        page_size = options['page_size']
+        mismatches = []
+        for reader in (AnonymousUser(), user):
+            for offset in range(0, Recipe.objects.count(), page_size):
+                rendered = {
+                    mode: self.render(reader, aggregate, offset, page_size)
+                    for mode, aggregate in MODES.items()
+                }
+                if rendered['orm'] != rendered['json']:
+                    mismatches.append(f'{reader}: {offset}')
+
+        results = {}
+        for mode, aggregate in MODES.items():
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                self.render(user, aggregate, 0, page_size)
+            results[mode] = {
+                'page_size': page_size,
+                'queries': queries.count,
+                'latency_ms': summarize(measure(
+                    lambda: self.render(user, aggregate, 0, page_size),
+                    options['iterations'], options['warmup']
+                )),
+            }
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+        if mismatches:
+            raise CommandError(
+                f'Вывод отличается на страницах: {", ".join(mismatches)}'
+            )
+
+    def get_user(self, user_id):
+        if user_id:
+            return CustomUser.objects.get(pk=user_id)
+        user = CustomUser.objects.filter(favorite_recipe__isnull=False).first()
+        if user is None:
+            raise CommandError(
+                'Пользователи не найдены, выполните generate_data.'
+            )
+        return user
+
+    def render(self, user, aggregate, offset, page_size):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipes = get_recipes_for_read(user, aggregate=aggregate)
+        return JSONRenderer().render(RecipeReadSerializer(
+            recipes[offset:offset + page_size], many=True,
+            context={'request': request}
+        ).data)
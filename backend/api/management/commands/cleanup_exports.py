@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.exports import cleanup_exports
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Removes generated files (exports) older than EXPORT_FILE_TTL.
+    Should be run periodically, e.g. by cron.
+    """
+    help = 'Removes expired export files.'
+
+    def handle(self, *args, **options):
+        removed = cleanup_exports()
+        self.stdout.write(f'Удалено файлов: {removed}')
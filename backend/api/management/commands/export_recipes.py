@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ndjson import EXPORT_CHUNK_SIZE, export_recipes
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Exports recipes with tags and ingredients as NDJSON
+    (one recipe per line) to the file or to stdout.
+    Recipes are read chunk by chunk, so memory stays flat.
+    The output can be loaded with import_recipes.
+    """
+    help = 'Exports recipes as NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Save NDJSON to file.')
+        parser.add_argument('--author', help='Export recipes of the email.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.all()
+        if options['author']:
+            author = CustomUser.objects.filter(email=options['author']).first()
+            if author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден.'
+                )
+            queryset = queryset.filter(author=author)
+        lines = export_recipes(queryset, options['chunk_size'])
+        if not options['output']:
+            sys.stdout.buffer.writelines(lines)
+            return
+        exported = 0
+        with open(options['output'], 'wb') as file:
+            for line in lines:
+                file.write(line)
+                exported += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Экспортировано рецептов: {exported}'
+        ))
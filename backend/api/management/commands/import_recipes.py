@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.ndjson import IMPORT_BATCH_SIZE, RecipeImportError, import_recipes
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Imports recipes from NDJSON (as given by export_recipes) from
+    the file or from stdin ('-'). Lines are read and saved in batches,
+    one transaction per batch, so memory stays flat. Ingredients are
+    found by name and measurement unit, they and tags have to exist.
+    Recipes get the author with email of the line or the author
+    given by --author. Images are base64 data or paths of images
+    of the author's recipes.
+    """
+    help = 'Imports recipes from NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file or '-' for stdin.")
+        parser.add_argument(
+            '--author', help='Email of the author of all recipes.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = CustomUser.objects.filter(email=options['author']).first()
+            if author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден.'
+                )
+        try:
+            if options['path'] == '-':
+                imported = import_recipes(
+                    sys.stdin.buffer, author, options['batch_size']
+                )
+            else:
+                with open(options['path'], 'rb') as file:
+                    imported = import_recipes(
+                        file, author, options['batch_size']
+                    )
+        except RecipeImportError as error:
+            raise CommandError(
+                f'{error}. Импортировано рецептов: {error.imported}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {imported}'
+        ))
@@ -0,0 +1,194 @@
+import json
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import summarize, write_report
+
+IMPORT_TIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$'
+)
+
+# Runs in a new interpreter: boots the WSGI application the way
+# a gunicorn worker does and serves the first request.
+STARTUP_SCRIPT = '''
+import io, json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+booted = time.perf_counter()
+from django.conf import settings
+host = next((
+    host for host in settings.ALLOWED_HOSTS
+    if host != '*' and not host.startswith('.')
+), 'localhost')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host,
+    'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+    'wsgi.errors': sys.stderr,
+}
+statuses = []
+response = application(environ, lambda status, headers: statuses.append(
+    int(status.split()[0])
+))
+b''.join(response)
+response.close()
+finished = time.perf_counter()
+print(json.dumps({
+    'boot': booted - start,
+    'first_request': finished - start,
+    'status': statuses[0],
+    'modules': sorted(sys.modules),
+}))
+'''
+
+
+def parse_import_times(output):
+    """
+    Function returns {module: (self, cumulative)} in seconds
+    and total import time from -X importtime output.
+    """
+    modules = {}
+    total = 0
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        own, cumulative, indent, name = match.groups()
+        modules[name] = (int(own) / 10 ** 6, int(cumulative) / 10 ** 6)
+        if not indent:
+            total += int(cumulative) / 10 ** 6
+    return modules, total
+
+
+def get_package_times(modules):
+    """
+    Function returns {top-level package: import time in ms}
+    summed from own import times of its modules.
+    """
+    packages = {}
+    for name, (own, _) in modules.items():
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + own
+    return packages
+
+
+def top(times, limit):
+    return {
+        name: round(value * 1000, 3)
+        for name, value in sorted(
+            times.items(), key=lambda item: -item[1]
+        )[:limit]
+    }
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Profiles startup of the Django process: starts a new interpreter
+    with -X importtime which boots the WSGI application (as a gunicorn
+    worker does) and serves the first request. Reports boot time,
+    time to the first response, total import time and the slowest
+    modules and packages (median run by total import time).
+    Fails if a threshold is exceeded or a module which has to be
+    imported lazily (--forbid, reportlab and drf_base64 by default)
+    was imported before the first response, so it can be run in CI.
+    """
+    help = 'Measures import time and time to the first request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tags/')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument(
+            '--max-first-request-ms', type=float,
+            help='Fail if median time to the first response is greater.'
+        )
+        parser.add_argument(
+            '--max-import-ms', type=float,
+            help='Fail if median total import time is greater.'
+        )
+        parser.add_argument(
+            '--forbid', nargs='*', default=['reportlab', 'drf_base64'],
+            help='Modules which must not be imported at startup.'
+        )
+        parser.add_argument('--output', help='Save JSON report to file.')
+        parser.add_argument(
+            '--baseline', help='JSON report of a previous run to compare.'
+        )
+
+    def run_once(self, path):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT, path],
+            capture_output=True, text=True
+        )
+        if process.returncode:
+            raise CommandError(process.stderr[-2000:])
+        result = json.loads(process.stdout.splitlines()[-1])
+        result['imports'], result['import_total'] = parse_import_times(
+            process.stderr
+        )
+        return result
+
+    def handle(self, *args, **options):
+        runs = [
+            self.run_once(options['path'])
+            for _ in range(max(options['runs'], 1))
+        ]
+        median = sorted(runs, key=lambda run: run['import_total'])[
+            len(runs) // 2
+        ]
+        results = {
+            'boot': {'latency_ms': summarize(
+                [run['boot'] for run in runs]
+            )},
+            'first_request': {
+                'path': options['path'],
+                'status': median['status'],
+                'latency_ms': summarize(
+                    [run['first_request'] for run in runs]
+                ),
+            },
+            'imports': {
+                'modules_count': len(median['imports']),
+                'latency_ms': summarize(
+                    [run['import_total'] for run in runs]
+                ),
+                'slowest_modules': top(
+                    {
+                        name: cumulative
+                        for name, (_, cumulative) in median['imports'].items()
+                    },
+                    options['top']
+                ),
+                'slowest_packages': top(
+                    get_package_times(median['imports']), options['top']
+                ),
+            },
+        }
+        write_report(
+            results, self.stdout, options['output'], options['baseline']
+        )
+
+        errors = []
+        loaded = set(median['modules'])
+        for module in options['forbid']:
+            if module in loaded:
+                errors.append(f'{module} импортируется при старте.')
+        checks = (
+            ('first_request', 'max_first_request_ms'),
+            ('imports', 'max_import_ms'),
+        )
+        for name, option in checks:
+            value = results[name]['latency_ms']['p50']
+            if options[option] is not None and value > options[option]:
+                errors.append(
+                    f'{name}: {value} мс больше порога {options[option]} мс.'
+                )
+        if median['status'] >= 500:
+            errors.append(f'Первый запрос вернул {median["status"]}.')
+        if errors:
+            raise CommandError(' '.join(errors))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.deletion import purge_deleted
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Purges all recipes and users marked deleted (api/deletion.py),
+    related rows are deleted in batches. Deleted objects are purged
+    by background tasks, the command is for those whose tasks have
+    failed or were deleted.
+    """
+    help = 'Purges deleted recipes and users in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        purged = set()
+        for label, table, count in purge_deleted(options['batch_size']):
+            self.stdout.write(f'{label}: {table}, обработано строк: {count}')
+            purged.add(label)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено объектов: {len(purged)}'
+        ))
@@ -0,0 +1,167 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """
+    Prometheus-like histogram with labels.
+    Keeps bucket counters, sum and count per labels value.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets, label='route'):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, label_value, value):
+        with self._lock:
+            counts, total = self._values.get(
+                label_value, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[label_value] = (counts, total + value)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                label_value: (list(counts), total)
+                for label_value, (counts, total) in self._values.items()
+            }
+
+    def render(self):
+        lines = []
+        for label_value, (counts, total) in sorted(self.snapshot().items()):
+            labels = f'{self.label}="{escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            cumulative += counts[-1]
+            lines.append(
+                f'{self.name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+            )
+            lines.append(f'{self.name}_sum{{{labels}}} {total}')
+            lines.append(f'{self.name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    """
+    Prometheus-like counter with labels.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, description, label='name'):
+        self.name = name
+        self.description = description
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = defaultdict(int)
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] += amount
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        return [
+            f'{self.name}{{{self.label}="{escape(label_value)}"}} {value}'
+            for label_value, value in sorted(self.snapshot().items())
+        ]
+
+
+class Registry:
+    """
+    In-process registry of metrics.
+    Every worker process keeps its own values.
+    """
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self):
+        """
+        Method returns metrics in Prometheus text format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'foodgram_request_duration_seconds',
+    'Total time of the request processing.',
+    DURATION_BUCKETS
+))
+DB_DURATION = registry.register(Histogram(
+    'foodgram_db_duration_seconds',
+    'Time of SQL queries executed during the request.',
+    DURATION_BUCKETS
+))
+APP_DURATION = registry.register(Histogram(
+    'foodgram_app_duration_seconds',
+    'Time of the view spent outside SQL queries plus response rendering '
+    '(permissions, filtering, serialization and other Python code).',
+    DURATION_BUCKETS
+))
+DB_QUERIES = registry.register(Histogram(
+    'foodgram_db_queries',
+    'Number of SQL queries executed during the request.',
+    QUERIES_BUCKETS
+))
+CACHE_HITS = registry.register(Counter(
+    'foodgram_read_cache_hits_total',
+    'Reads served by fresh entries of the read cache.',
+    label='cache'
+))
+CACHE_MISSES = registry.register(Counter(
+    'foodgram_read_cache_misses_total',
+    'Reads which computed entries of the read cache.',
+    label='cache'
+))
+CACHE_STALE = registry.register(Counter(
+    'foodgram_read_cache_stale_total',
+    'Reads served by stale entries while another request recomputes them.',
+    label='cache'
+))
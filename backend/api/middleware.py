@@ -0,0 +1,291 @@
+import hashlib
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.compression import BROTLI, compress, negotiate_encoding
+from foodgram.routers import get_routing, start_routing, stop_routing
+
+from .metrics import APP_DURATION, DB_DURATION, DB_QUERIES, REQUEST_DURATION
+
+UNRESOLVED_ROUTE = 'unresolved'
+PRIMARY_PIN_KEY = 'db-primary-pin:{}'
+COMPRESSED_PATH_PREFIX = '/api/'
+COMPRESSIBLE_CONTENT_TYPES = (
+    'application/json', 'text/', 'application/javascript',
+)
+
+
+def get_route_name(view_func, request):
+    """
+    Function returns name of the route the request is handled by.
+    For DRF viewsets it's '<ViewSet>.<action>', e.g. RecipeViewSet.list.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None)
+    if view_class is not None and actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{view_class.__name__}.{action}'
+    if view_class is not None:
+        return view_class.__name__
+    match = request.resolver_match
+    if match is not None and match.view_name:
+        return match.view_name
+    return getattr(view_func, '__name__', UNRESOLVED_ROUTE)
+
+
+def install_execute_wrapper(stack, wrapper):
+    """
+    Function installs execute wrapper on every database connection
+    of the current thread until the stack is closed.
+    """
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+class ExecuteWrapperMiddleware:
+    """
+    Base middleware which wraps SQL queries of the request.
+    Works both under WSGI and ASGI: in async mode wrappers are
+    installed in the thread that runs sync_to_async code
+    (ORM calls, sync views) of the request.
+    Subclasses implement get_wrapper() and process_response().
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        wrapper = self.get_wrapper(request)
+        with ExitStack() as stack:
+            install_execute_wrapper(stack, wrapper)
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        wrapper = self.get_wrapper(request)
+        stack = ExitStack()
+        await sync_to_async(install_execute_wrapper)(stack, wrapper)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.process_response(request, response)
+
+    def get_wrapper(self, request):
+        raise NotImplementedError
+
+    def process_response(self, request, response):
+        return response
+
+
+class RequestMetrics:
+    """
+    Timings of a single request.
+    Is used as execute wrapper for every database connection.
+    """
+    def __init__(self):
+        self.route = UNRESOLVED_ROUTE
+        self.started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.app_time = None
+        self.view_started = None
+        self.view_db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def view_finished(self):
+        """
+        Method returns time of the view spent outside SQL queries.
+        """
+        elapsed = time.perf_counter() - self.view_started
+        return elapsed - (self.db_time - self.view_db_time)
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"',
+            f'app;dur={(self.app_time or 0) * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+
+
+class RequestMetricsMiddleware(ExecuteWrapperMiddleware):
+    """
+    Middleware collects number of SQL queries, DB time,
+    application time (the view and rendering outside SQL queries)
+    and total time of every request.
+    Adds them to Server-Timing header and aggregates into
+    per-route histograms which are served by MetricsView.
+    Should be placed at the top of MIDDLEWARE.
+    """
+    def get_wrapper(self, request):
+        metrics = RequestMetrics()
+        metrics.started = time.perf_counter()
+        request.request_metrics = metrics
+        return metrics
+
+    def process_response(self, request, response):
+        metrics = request.request_metrics
+        if metrics.app_time is None and metrics.view_started:
+            metrics.app_time = metrics.view_finished()
+        total = time.perf_counter() - metrics.started
+
+        response['Server-Timing'] = metrics.server_timing(total)
+        REQUEST_DURATION.observe(metrics.route, total)
+        DB_DURATION.observe(metrics.route, metrics.db_time)
+        DB_QUERIES.observe(metrics.route, metrics.queries)
+        APP_DURATION.observe(
+            metrics.route, metrics.app_time or 0
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = request.request_metrics
+        metrics.route = get_route_name(view_func, request)
+        metrics.view_started = time.perf_counter()
+        metrics.view_db_time = metrics.db_time
+
+    def process_template_response(self, request, response):
+        """
+        DRF responses are rendered after the view has returned:
+        rendering time is added to application time.
+        """
+        metrics = request.request_metrics
+        if metrics.view_started is None:
+            return response
+        metrics.app_time = metrics.view_finished()
+        render_started = time.perf_counter()
+
+        def rendered(response):
+            metrics.app_time += time.perf_counter() - render_started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class PrimaryReplicaMiddleware:
+    """
+    Middleware sets database routing of the request for
+    PrimaryReplicaRouter: safe requests read from replicas,
+    other requests use the primary only.
+    A client (identified by Authorization header) which has written
+    reads from the primary for DB_REPLICA_PIN_SECONDS after that,
+    so it sees its own favorites, shopping cart and subscriptions.
+    Pins are kept in the default cache, which must be shared
+    by all workers (api/checks.py).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pin_key = self.get_pin_key(request)
+        token = start_routing(self.use_replica(
+            request, pin_key and cache.get(pin_key)
+        ))
+        try:
+            response = self.get_response(request)
+            if pin_key and get_routing().wrote:
+                cache.set(pin_key, True, settings.DB_REPLICA_PIN_SECONDS)
+        finally:
+            stop_routing(token)
+        return response
+
+    async def __acall__(self, request):
+        pin_key = self.get_pin_key(request)
+        token = start_routing(self.use_replica(
+            request, pin_key and await cache.aget(pin_key)
+        ))
+        try:
+            response = await self.get_response(request)
+            if pin_key and get_routing().wrote:
+                await cache.aset(
+                    pin_key, True, settings.DB_REPLICA_PIN_SECONDS
+                )
+        finally:
+            stop_routing(token)
+        return response
+
+    def get_pin_key(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return PRIMARY_PIN_KEY.format(
+            hashlib.sha256(authorization.encode()).hexdigest()
+        )
+
+    def use_replica(self, request, pinned):
+        return request.method in SAFE_METHODS and not pinned
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Middleware compresses JSON and text responses of the API with
+    brotli or gzip (whatever the client accepts, brotli is preferred)
+    if the body is at least API_COMPRESSION_MIN_SIZE bytes.
+    Levels are set by API_GZIP_LEVEL and API_BROTLI_QUALITY.
+    Streaming responses (files) and pages outside /api/ (admin pages
+    with CSRF tokens, BREACH) are not compressed.
+    """
+    def process_response(self, request, response):
+        if not request.path.startswith(COMPRESSED_PATH_PREFIX):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.API_COMPRESSION_MIN_SIZE
+            or not response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_CONTENT_TYPES
+            )
+        ):
+            return response
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        level = settings.API_GZIP_LEVEL
+        if encoding == BROTLI:
+            level = settings.API_BROTLI_QUALITY
+        compressed = compress(response.content, encoding, level)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Compressed body differs from the original one.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
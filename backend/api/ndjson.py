@@ -0,0 +1,316 @@
+import json
+import tempfile
+from itertools import islice
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
+
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount, Tag
+from recipes.pantry import add_to_pantry_index
+from recipes.similarity import index_recipes
+from users.models import CustomUser
+from .exports import get_content_disposition
+from .renderers import FastJSONRenderer, orjson
+from .serializers import RecipeImportSerializer
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+EXPORT_CHUNK_SIZE = 500
+IMPORT_BATCH_SIZE = 500
+LINE_PARSE_ERROR = 'Строка не является JSON объектом.'
+AUTHOR_NOT_FOUND_ERROR = 'Пользователь с таким email не найден.'
+AUTHOR_REQUIRED_ERROR = 'Укажите email автора рецепта.'
+TAG_NOT_FOUND_ERROR = 'Тэги не найдены: {slugs}.'
+INGREDIENT_NOT_FOUND_ERROR = 'Ингредиенты не найдены: {names}.'
+IMAGE_NOT_FOUND_ERROR = (
+    'Картинка должна быть в base64 или быть картинкой рецепта автора.'
+)
+
+
+class RecipeImportError(Exception):
+    """
+    Error of the import: line is the number of the invalid line,
+    errors are serializer errors of it.
+    """
+    def __init__(self, line, errors, imported=0):
+        super().__init__(f'Строка {line}: {errors}')
+        self.line = line
+        self.errors = errors
+        self.imported = imported
+
+
+def get_chunk_relations(recipe_ids):
+    """
+    Function returns tags {recipe id: [slug]} and ingredients
+    {recipe id: [ingredient]} of the chunk of recipes, two queries.
+    """
+    tags = {}
+    recipe_tags = Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('pk').values_list('recipe_id', 'tag__slug')
+    for recipe_id, slug in recipe_tags:
+        tags.setdefault(recipe_id, []).append(slug)
+    ingredients = {}
+    amounts = RecipeIngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('pk').values_list(
+        'recipe_id', 'ingredient__name', 'ingredient__measurement_unit',
+        'amount'
+    )
+    for recipe_id, name, measurement_unit, amount in amounts:
+        ingredients.setdefault(recipe_id, []).append({
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return tags, ingredients
+
+
+def export_recipes(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Function yields recipes of the queryset as NDJSON lines (bytes):
+    tags are given by slugs, author by email and ingredients by name
+    and measurement_unit, so lines can be imported to another database.
+    Recipes are read with a server-side cursor chunk_size at a time,
+    tags and ingredients are fetched for every chunk, so memory
+    doesn't grow with the number of recipes. Rows are read as tuples:
+    model instances would make the export several times slower.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'name', 'text', 'cooking_time', 'image', 'author__email'
+    ).iterator(chunk_size=chunk_size)
+    renderer = FastJSONRenderer()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        tags, ingredients = get_chunk_relations([row[0] for row in chunk])
+        for recipe_id, name, text, cooking_time, image, author in chunk:
+            yield renderer.render({
+                'name': name,
+                'text': text,
+                'cooking_time': cooking_time,
+                'image': image,
+                'author': author,
+                'tags': tags.get(recipe_id, []),
+                'ingredients': ingredients.get(recipe_id, []),
+            }) + b'\n'
+
+
+def ndjson_response(request, lines, filename):
+    """
+    Function returns response which streams NDJSON lines.
+    Django 4.1 ASGI handler iterates streaming responses inside the
+    event loop where queries aren't allowed, so under ASGI lines are
+    written to a temporary file first and the file is streamed.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        file = tempfile.TemporaryFile()
+        file.writelines(lines)
+        file.seek(0)
+        response = FileResponse(file, content_type=NDJSON_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(
+            lines, content_type=NDJSON_CONTENT_TYPE
+        )
+    response['Content-Disposition'] = get_content_disposition(filename)
+    return response
+
+
+def parse_line(line):
+    try:
+        data = orjson.loads(line) if orjson else json.loads(line)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_lines(lines):
+    """
+    Function returns [(line number, validated data)] of the numbered
+    lines, raises RecipeImportError at the first invalid line.
+    """
+    recipes = []
+    for number, line in lines:
+        data = parse_line(line)
+        if data is None:
+            raise RecipeImportError(number, {'non_field_errors': [
+                LINE_PARSE_ERROR
+            ]})
+        serializer = RecipeImportSerializer(data=data)
+        if not serializer.is_valid():
+            raise RecipeImportError(number, serializer.errors)
+        recipes.append((number, serializer.validated_data))
+    return recipes
+
+
+def get_authors(recipes, author):
+    """
+    Function returns {line number: author} of the batch.
+    The given author owns all recipes, otherwise authors are
+    found by email of the lines.
+    """
+    if author is not None:
+        return {number: author for number, _ in recipes}
+    emails = {data.get('author') for _, data in recipes} - {None}
+    users = {
+        user.email: user
+        for user in CustomUser.objects.filter(email__in=emails)
+    }
+    authors = {}
+    for number, data in recipes:
+        if not data.get('author'):
+            raise RecipeImportError(number, {'author': [
+                AUTHOR_REQUIRED_ERROR
+            ]})
+        if data['author'] not in users:
+            raise RecipeImportError(number, {'author': [
+                AUTHOR_NOT_FOUND_ERROR
+            ]})
+        authors[number] = users[data['author']]
+    return authors
+
+
+def get_tags(recipes):
+    slugs = {slug for _, data in recipes for slug in data['tags']}
+    tags = dict(
+        Tag.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+    )
+    for number, data in recipes:
+        missing = [slug for slug in data['tags'] if slug not in tags]
+        if missing:
+            raise RecipeImportError(number, {'tags': [
+                TAG_NOT_FOUND_ERROR.format(slugs=', '.join(missing))
+            ]})
+    return tags
+
+
+def get_ingredients(recipes):
+    """
+    Function returns {(name, measurement_unit): id} of ingredients
+    of the batch. Ingredients have to exist, they are found by
+    name and measurement_unit.
+    """
+    keys = {
+        (ingredient['name'], ingredient['measurement_unit'])
+        for _, data in recipes for ingredient in data['ingredients']
+    }
+    ingredients = {
+        (name, measurement_unit): pk
+        for name, measurement_unit, pk in Ingredient.objects.filter(
+            name__in={name for name, _ in keys}
+        ).values_list('name', 'measurement_unit', 'pk')
+    }
+    for number, data in recipes:
+        missing = [
+            f'{ingredient["name"]} ({ingredient["measurement_unit"]})'
+            for ingredient in data['ingredients']
+            if (ingredient['name'], ingredient['measurement_unit'])
+            not in ingredients
+        ]
+        if missing:
+            raise RecipeImportError(number, {'ingredients': [
+                INGREDIENT_NOT_FOUND_ERROR.format(names=', '.join(missing))
+            ]})
+    return ingredients
+
+
+def check_images(recipes, authors):
+    """
+    Function checks that images given by path are images of recipes
+    of the author of the line, so a line can't point a recipe
+    to files of other users or to other files of the storage.
+    """
+    paths = {
+        data['image'] for _, data in recipes
+        if isinstance(data['image'], str)
+    }
+    if not paths:
+        return
+    images = set(Recipe.objects.filter(
+        image__in=paths,
+        author__in={author.pk for author in authors.values()}
+    ).values_list('author_id', 'image'))
+    for number, data in recipes:
+        if (
+            isinstance(data['image'], str)
+            and (authors[number].pk, data['image']) not in images
+        ):
+            raise RecipeImportError(number, {'image': [
+                IMAGE_NOT_FOUND_ERROR
+            ]})
+
+
+def save_batch(recipes, author):
+    """
+    Function inserts the batch of validated recipes in one
+    transaction and adds them to the search indexes.
+    """
+    authors = get_authors(recipes, author)
+    check_images(recipes, authors)
+    tags = get_tags(recipes)
+    ingredients = get_ingredients(recipes)
+    recipe_tag = Recipe.tags.through
+    with transaction.atomic():
+        objects = Recipe.objects.bulk_create([
+            Recipe(
+                author=authors[number],
+                name=data['name'],
+                text=data['text'],
+                cooking_time=data['cooking_time'],
+                image=data['image'],
+            )
+            for number, data in recipes
+        ])
+        amounts = []
+        relations = []
+        recipe_ingredients = {}
+        for recipe, (_, data) in zip(objects, recipes):
+            ingredient_ids = recipe_ingredients[recipe.pk] = set()
+            for ingredient in data['ingredients']:
+                ingredient_id = ingredients[
+                    ingredient['name'], ingredient['measurement_unit']
+                ]
+                ingredient_ids.add(ingredient_id)
+                amounts.append(RecipeIngredientAmount(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=ingredient['amount']
+                ))
+            relations.extend(
+                recipe_tag(recipe_id=recipe.pk, tag_id=tags[slug])
+                for slug in set(data['tags'])
+            )
+        RecipeIngredientAmount.objects.bulk_create(amounts)
+        recipe_tag.objects.bulk_create(relations)
+        index_recipes(list(recipe_ingredients))
+        add_to_pantry_index(recipe_ingredients)
+    return len(objects)
+
+
+def import_recipes(lines, author=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Function imports recipes from NDJSON lines (bytes or str),
+    batch_size recipes per transaction, so memory doesn't grow with
+    the number of lines. Blank lines are skipped. Recipes get the given
+    author or the user with email of the line; publication date is
+    the date of the import. Raises RecipeImportError at the first
+    invalid line: previous batches stay imported.
+    Returns number of imported recipes.
+    """
+    numbered = (
+        (number, line) for number, line in enumerate(lines, 1)
+        if line.strip()
+    )
+    imported = 0
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            return imported
+        try:
+            imported += save_batch(validate_lines(batch), author)
+        except RecipeImportError as error:
+            error.imported = imported
+            raise
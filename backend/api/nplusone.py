@@ -0,0 +1,156 @@
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import ExecuteWrapperMiddleware
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 8
+# Frames of the ORM, request handling and instrumentation
+# are not interesting in the reported call site.
+IGNORED_FRAMES = (
+    '/django/db/', '/django/core/handlers/', '/django/utils/deprecation.py',
+    '/api/middleware.py', '/api/nplusone.py',
+)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+SPACES_RE = re.compile(r'\s+')
+
+state = {
+    'enabled': bool(settings.DEBUG),
+    'raise': False,
+}
+
+
+class NPlusOneError(Exception):
+    """Raised when the same query is repeated too many times."""
+
+
+def fingerprint(sql):
+    """
+    Function returns normalized SQL: literals, numbers and
+    IN lists are replaced, so that queries which differ only
+    by parameters have the same fingerprint.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACES_RE.sub(' ', sql).strip()
+
+
+def get_call_site():
+    """
+    Function returns the last frames of the code (project and
+    libraries like DRF serializers) which have executed the query.
+    """
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if not any(
+            ignored in frame.filename.replace(os.sep, '/')
+            for ignored in IGNORED_FRAMES
+        )
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def nplusone_detection(enabled=True, threshold=None):
+    """
+    Decorator switches the detector for a view, a viewset
+    or a single viewset action and can override the threshold.
+    Usage:
+        @nplusone_detection(enabled=False)
+        def download_shopping_cart(self, request): ...
+    """
+    def decorator(view):
+        view.nplusone = {'enabled': enabled, 'threshold': threshold}
+        return view
+    return decorator
+
+
+def get_view_options(view_func, request):
+    options = {}
+    view_class = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower())
+    for target in (
+        view_class,
+        view_func,
+        action and getattr(view_class, action, None),
+    ):
+        options.update({
+            key: value
+            for key, value in getattr(target, 'nplusone', {}).items()
+            if value is not None
+        })
+    return options
+
+
+class QueryTracker:
+    """
+    Execute wrapper which counts queries by fingerprint.
+    Remembers the call site of the query which has exceeded the threshold.
+    """
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.enabled = True
+        self.counts = Counter()
+        self.call_sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.enabled:
+            key = fingerprint(sql)
+            self.counts[key] += 1
+            if (self.counts[key] == self.threshold + 1
+                    and key not in self.call_sites):
+                self.call_sites[key] = get_call_site()
+        return execute(sql, params, many, context)
+
+    def report(self):
+        return [
+            f'Запрос выполнен {self.counts[key]} раз(а): {key}\n{call_site}'
+            for key, call_site in self.call_sites.items()
+        ]
+
+
+class NPlusOneMiddleware(ExecuteWrapperMiddleware):
+    """
+    Middleware detects N+1 queries: the same query shape
+    repeated more than NPLUSONE_THRESHOLD times during one request.
+    Logs a warning in DEBUG mode and raises NPlusOneError
+    when running tests with NPlusOneTestRunner.
+    """
+    def __init__(self, get_response):
+        if not state['enabled']:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def get_wrapper(self, request):
+        tracker = QueryTracker(settings.NPLUSONE_THRESHOLD)
+        request.nplusone_tracker = tracker
+        return tracker
+
+    def process_response(self, request, response):
+        problems = request.nplusone_tracker.report()
+        if problems:
+            message = f'N+1 запросы в {request.path}:\n' + '\n'.join(
+                problems
+            )
+            if state['raise']:
+                raise NPlusOneError(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        tracker = request.nplusone_tracker
+        options = get_view_options(view_func, request)
+        tracker.enabled = options.get('enabled', True)
+        if options.get('threshold') is not None:
+            tracker.threshold = options['threshold']
@@ -17,6 +17,19 @@ class IsAdminOrReadOnly(BasePermission):
         )
 
 
+class IsAdmin(BasePermission):
+    """
+    Permission for admin, superuser.
+    Admin and superuser have permissions for reading/writing.
+    Other users have no permissions.
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_superuser
+            or request.user.role == USER_ROLE_ADMIN
+        )
+
+
 class IsOwnerAdminOrReadOnly(BasePermission):
     """
     Permission for admin, superuser, owner.
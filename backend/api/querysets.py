@@ -0,0 +1,235 @@
+from django.conf import settings
+from django.contrib.postgres.aggregates import JSONBAgg
+from django.db import connections
+from django.db.models import (BooleanField, Count, Exists, JSONField, OuterRef,
+                              Prefetch, Q, Subquery, Value)
+from django.db.models.functions import Coalesce, JSONObject
+
+from recipes.models import (Favorite, Recipe, RecipeIngredientAmount,
+                            ShoppingCart, Tag)
+from users.models import CustomUser, Subscription
+from .fieldsets import is_requested
+
+AUTHOR_RECIPES_ORDERING = ('-pub_date', '-pk')
+RECIPES_LIMIT_PARAM = 'recipes_limit'
+RECIPE_FLAGS = {
+    'is_favorited': Favorite,
+    'is_in_shopping_cart': ShoppingCart,
+}
+
+
+def annotate_is_subscribed(queryset, user):
+    """
+    Function annotates users with 'is_subscribed' flag:
+    whether the request user is a subscriber of a user.
+    Is used by IsSubscribedMethod instead of a query per user.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user=user, author=OuterRef('pk'))
+    ))
+
+
+def annotate_recipe_flags(queryset, user, flags=tuple(RECIPE_FLAGS)):
+    """
+    Function annotates recipes with 'is_favorited' and
+    'is_in_shopping_cart' flags (or only given ones) of the request user.
+    """
+    if not user.is_authenticated:
+        return queryset.annotate(**{
+            flag: Value(False, output_field=BooleanField())
+            for flag in flags
+        })
+    return queryset.annotate(**{
+        flag: Exists(
+            RECIPE_FLAGS[flag].objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )
+        )
+        for flag in flags
+    })
+
+
+def get_recipe_flags(user, recipe):
+    """
+    Function returns flags of the recipe for the authenticated user:
+    'is_favorited', 'is_in_shopping_cart' and 'is_subscribed'
+    (to the author of the recipe), one query.
+    """
+    flags = annotate_recipe_flags(
+        Recipe.objects.filter(pk=recipe.pk), user
+    ).annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user=user, author=OuterRef('author'))
+    )).values(*RECIPE_FLAGS, 'is_subscribed').first()
+    return flags or dict.fromkeys((*RECIPE_FLAGS, 'is_subscribed'), False)
+
+
+def get_user_recipe_ids(user, model):
+    """
+    Function returns ids of recipes the user has added to
+    favorites or shopping cart (model), deleted recipes are skipped.
+    """
+    return list(model.objects.filter(
+        user=user, recipe__deleted_at__isnull=True
+    ).order_by('recipe_id').values_list('recipe_id', flat=True))
+
+
+def json_array(queryset, group_by, ordering, **fields):
+    """
+    Function returns subquery which aggregates rows of the queryset
+    into JSONB array of objects with given fields, '[]' if no rows.
+    """
+    return Coalesce(
+        Subquery(
+            queryset.order_by().values(group_by).annotate(
+                rows=JSONBAgg(JSONObject(**fields), ordering=ordering)
+            ).values('rows')
+        ),
+        Value([], output_field=JSONField()),
+        output_field=JSONField()
+    )
+
+
+def annotate_recipe_json(queryset, fields=None):
+    """
+    Function annotates recipes with 'tags_json' and 'ingredients_json':
+    tags and ingredients of a recipe aggregated into JSONB arrays
+    inside the main query (PostgreSQL only).
+    RecipeReadSerializer renders them without model instances.
+    """
+    annotations = {}
+    if is_requested(fields, 'tags'):
+        annotations['tags_json'] = json_array(
+            Recipe.tags.through.objects.filter(recipe=OuterRef('pk')),
+            'recipe',
+            'tag_id',
+            id='tag_id',
+            name='tag__name',
+            color='tag__color',
+            slug='tag__slug'
+        )
+    if is_requested(fields, 'ingredients'):
+        annotations['ingredients_json'] = json_array(
+            RecipeIngredientAmount.objects.filter(recipe=OuterRef('pk')),
+            'recipe',
+            'pk',
+            id='ingredient_id',
+            name='ingredient__name',
+            measurement_unit='ingredient__measurement_unit',
+            amount='amount'
+        )
+    return queryset.annotate(**annotations)
+
+
+def use_json_aggregation(queryset):
+    return (
+        settings.RECIPES_JSON_AGGREGATION
+        and connections[queryset.db].vendor == 'postgresql'
+    )
+
+
+def get_recipes_for_read(user, queryset=None, fields=None, aggregate=None):
+    """
+    Function returns recipes with everything RecipeReadSerializer
+    needs: flags, author with 'is_subscribed', tags and ingredients.
+    The number of queries doesn't depend on the number of recipes.
+    If fields are given (see api/fieldsets.py), relations, flags
+    and text of recipes which are not rendered are not fetched.
+    On PostgreSQL tags and ingredients are aggregated into JSON
+    in the main query (aggregate=None - RECIPES_JSON_AGGREGATION),
+    on other databases they are prefetched.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    if aggregate is None:
+        aggregate = use_json_aggregation(queryset)
+    queryset = annotate_recipe_flags(queryset, user, [
+        flag for flag in RECIPE_FLAGS if is_requested(fields, flag)
+    ])
+    if not is_requested(fields, 'text'):
+        queryset = queryset.defer('text')
+    lookups = []
+    if is_requested(fields, 'author'):
+        lookups.append(Prefetch(
+            'author',
+            queryset=annotate_is_subscribed(CustomUser.objects.all(), user)
+        ))
+    if aggregate:
+        return annotate_recipe_json(queryset, fields).prefetch_related(
+            *lookups
+        )
+    if is_requested(fields, 'tags'):
+        lookups.append(
+            Prefetch('tags', queryset=Tag.objects.order_by('pk'))
+        )
+    if is_requested(fields, 'ingredients'):
+        lookups.append(Prefetch(
+            'recipe',
+            queryset=RecipeIngredientAmount.objects.select_related(
+                'ingredient'
+            ).order_by('pk')
+        ))
+    return queryset.prefetch_related(*lookups)
+
+
+def get_users_for_read(user, queryset=None, fields=None):
+    """
+    Function returns users with 'is_subscribed' flag
+    for CustomUserReadSerializer if the flag is rendered.
+    """
+    if queryset is None:
+        queryset = CustomUser.objects.all()
+    if is_requested(fields, 'is_subscribed'):
+        return annotate_is_subscribed(queryset, user)
+    return queryset
+
+
+def get_recipes_limit(request):
+    """
+    Function returns ?recipes_limit= of the request as a number,
+    None if it isn't given or isn't a number.
+    """
+    recipes_limit = request.GET.get(RECIPES_LIMIT_PARAM, '')
+    return int(recipes_limit) if recipes_limit.isdigit() else None
+
+
+def get_author_recipes(recipes_limit=None):
+    """
+    Function returns recipes for the prefetch of authors' recipes,
+    recipes_limit latest recipes of each author if it's given.
+    The limit is applied by the database: a recipe is fetched if it's
+    among the latest recipes of its author (correlated subquery
+    with LIMIT on the author index).
+    """
+    queryset = Recipe.objects.defer('text').order_by(*AUTHOR_RECIPES_ORDERING)
+    if recipes_limit is None:
+        return queryset
+    return queryset.filter(pk__in=Subquery(
+        Recipe.objects.filter(author=OuterRef('author')).order_by(
+            *AUTHOR_RECIPES_ORDERING
+        ).values('pk')[:recipes_limit]
+    ))
+
+
+def get_subscriptions_for_read(user, fields=None, recipes_limit=None):
+    """
+    Function returns authors the user is subscribed to
+    with their recipes (recipes_limit latest ones if it's given)
+    and number of recipes for SubscriptionSerializer.
+    Recipes and their number are fetched only if they are rendered.
+    """
+    queryset = CustomUser.objects.filter(sub_author__user=user).annotate(
+        is_subscribed=Value(True, output_field=BooleanField())
+    ).order_by('username')
+    if is_requested(fields, 'recipes_count'):
+        queryset = queryset.annotate(recipes_count=Count(
+            'recipe', filter=Q(recipe__deleted_at__isnull=True)
+        ))
+    if is_requested(fields, 'recipes'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'recipe', queryset=get_author_recipes(recipes_limit)
+        ))
+    return queryset
@@ -0,0 +1,59 @@
+import decimal
+import math
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer which renders compact JSON with orjson.
+    Output is the same as of JSONRenderer: UTF-8 without escaping
+    of Cyrillic, dates and decimals converted by the DRF encoder,
+    \\u2028 and \\u2029 escaped. The only difference is notation
+    of floats below 1e-4 and from 1e16 (e.g. 1e16 instead of 1e+16),
+    the API has no such fields.
+    Falls back to JSONRenderer without orjson, for pretty printed,
+    ASCII-only or non-strict output and for data orjson can't encode
+    the same way (e.g. decimals in exponent notation).
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data, default=self.default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def default(self, obj):
+        value = self.encoder_class().default(obj)
+        if isinstance(obj, decimal.Decimal) and (
+            not math.isfinite(value) or 'e' in repr(value)
+        ):
+            raise TypeError('Decimal is rendered differently by stdlib.')
+        return value
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .checks import SHARED_CACHE_ERROR_ID
+from .nplusone import state
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Test runner which turns N+1 detection into errors.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        state.update({'enabled': True, 'raise': True})
+
+    def teardown_test_environment(self, **kwargs):
+        state.update({'enabled': bool(settings.DEBUG), 'raise': False})
+        super().teardown_test_environment(**kwargs)
+
+    def run_checks(self, databases):
+        """
+        Tests run in one process, the default cache doesn't have
+        to be shared (DEBUG is always False in tests).
+        """
+        with override_settings(SILENCED_SYSTEM_CHECKS=[
+            *settings.SILENCED_SYSTEM_CHECKS, SHARED_CACHE_ERROR_ID
+        ]):
+            super().run_checks(databases)
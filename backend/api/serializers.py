@@ -1,12 +1,22 @@
+from operator import attrgetter
+
+from django.conf import settings
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
-from django.db.models import Count
+from django.db.models import Count, Manager
 from django.shortcuts import get_object_or_404
-from drf_base64.fields import Base64ImageField
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 from recipes.models import Ingredient, Recipe, RecipeIngredientAmount, Tag
+from recipes.pantry import ORDERINGS
+from recipes.tasks import enqueue_index_recipe
 from users.models import CustomUser
+from .querysets import get_recipes_limit
+
+EMAIL_EXISTS_ERROR = 'Пользователь с такой электронной почтой уже существует.'
+USERNAME_EXISTS_ERROR = 'Пользователь с таким username уже существует.'
 
 
 class IsSubscribedMethod:
@@ -21,16 +31,165 @@ class IsSubscribedMethod:
     def get_is_subscribed(self, obj):
         """
         Method checks if user is a subscriber of an author.
+        Uses 'is_subscribed' annotation if the queryset has it.
         """
         user = self.context['request'].user
         if user.is_authenticated:
             if isinstance(obj, CustomUser):
+                is_subscribed = getattr(obj, 'is_subscribed', None)
+                if is_subscribed is not None:
+                    return is_subscribed
                 return user.sub_user.filter(author=obj).exists()
             return True
         return False
 
 
-class CustomUserReadSerializer(serializers.ModelSerializer,
+class SparseFieldsMixin:
+    """
+    Class for inheritance.
+    Uses in:
+        CustomUserReadSerializer, RecipeReadSerializer,
+        SubscriptionSerializer.
+    Serializer takes optional argument 'fields': names of the fields
+    to render, other fields are dropped (see api/fieldsets.py).
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def get_base64_image_field(**kwargs):
+    """
+    Function returns Base64ImageField for images sent by clients.
+    drf_base64 is imported on the first write, not at startup
+    (see profile_startup command): read serializers render images
+    with ImageField, the representation is the same.
+    """
+    from drf_base64.fields import Base64ImageField
+    return Base64ImageField(**kwargs)
+
+
+# Fields whose representation is the attribute itself
+# for values loaded from the database.
+PLAIN_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.ReadOnlyField
+)
+
+
+def get_plain_attribute(instance, attrs):
+    """
+    Function returns the attribute by the source of the field,
+    None if any object in the path is None (as Field.get_attribute).
+    """
+    for attr in attrs:
+        if instance is None:
+            return None
+        instance = getattr(instance, attr)
+    return instance
+
+
+def compile_many(field):
+    render_child = compile_representation(field.child)
+
+    def render(instance):
+        data = field.get_attribute(instance)
+        if isinstance(data, AggregatedRows):
+            return field.to_representation(data)
+        if isinstance(data, Manager):
+            data = data.all()
+        return [render_child(item) for item in data]
+    return render
+
+
+def compile_nested(field):
+    render_nested = compile_representation(field)
+
+    def render(instance):
+        value = field.get_attribute(instance)
+        return None if value is None else render_nested(value)
+    return render
+
+
+def compile_plain(field):
+    attrs = tuple(field.source_attrs)
+    getter = attrgetter('.'.join(attrs))
+    if len(attrs) == 1:
+        return getter
+
+    def render(instance):
+        try:
+            return getter(instance)
+        except AttributeError:
+            return get_plain_attribute(instance, attrs)
+    return render
+
+
+def compile_field(field):
+    """
+    Function returns function which renders the field of an instance
+    the way the serializer does, without the field machinery where
+    the representation is known: plain attributes, method fields,
+    nested serializers. Other fields are rendered by the field itself.
+    """
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+    if isinstance(field, serializers.ListSerializer):
+        return compile_many(field)
+    if isinstance(field, serializers.BaseSerializer):
+        return compile_nested(field)
+    if type(field) in PLAIN_FIELDS:
+        return compile_plain(field)
+
+    def render(instance):
+        value = field.get_attribute(instance)
+        return None if value is None else field.to_representation(value)
+    return render
+
+
+def compile_representation(serializer):
+    """
+    Function returns function which builds the dict of an instance
+    for readable fields of the serializer (sparse fields included).
+    """
+    renderers = tuple(
+        (field.field_name, compile_field(field))
+        for field in serializer._readable_fields
+    )
+
+    def render(instance):
+        return {
+            name: render_field(instance) for name, render_field in renderers
+        }
+    return render
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """
+    List serializer for read serializers of list endpoints.
+    Fields of the child serializer are compiled once per list
+    (see compile_representation), every item is rendered to a plain
+    dict by the compiled functions: output is the same as of the child
+    serializer, which stays the source of truth (FAST_SERIALIZERS,
+    parity is checked by api/tests/test_fast_serializers.py and
+    check_fast_serializers command).
+    """
+    @cached_property
+    def render_item(self):
+        return compile_representation(self.child)
+
+    def to_representation(self, data):
+        if not settings.FAST_SERIALIZERS:
+            return super().to_representation(data)
+        if isinstance(data, Manager):
+            data = data.all()
+        render = self.render_item
+        return [render(item) for item in data]
+
+
+class CustomUserReadSerializer(SparseFieldsMixin,
+                               serializers.ModelSerializer,
                                IsSubscribedMethod):
     """
     Read Serializer for CustomUserViewset.
@@ -49,6 +208,7 @@ class CustomUserReadSerializer(serializers.ModelSerializer,
             'email', 'id', 'username', 'first_name',
             'last_name', 'is_subscribed'
         )
+        list_serializer_class = FastListSerializer
 
 
 class CustomUserWriteSerializer(serializers.ModelSerializer):
@@ -57,6 +217,7 @@ class CustomUserWriteSerializer(serializers.ModelSerializer):
     Uses model: CustomUser.
     Serializes/deserializes fileds of a model:
     email, id, username, first_name, last_name, password.
+    Email and username of deleted users stay taken until they are purged.
     """
     class Meta:
         model = CustomUser
@@ -64,6 +225,14 @@ class CustomUserWriteSerializer(serializers.ModelSerializer):
             'email', 'id', 'username', 'first_name',
             'last_name', 'password'
         )
+        extra_kwargs = {
+            'email': {'validators': [UniqueValidator(
+                CustomUser.all_objects.all(), message=EMAIL_EXISTS_ERROR
+            )]},
+            'username': {'validators': [UniqueValidator(
+                CustomUser.all_objects.all(), message=USERNAME_EXISTS_ERROR
+            )]},
+        }
 
 
 class CustomUserSetPasswordSerializer(serializers.Serializer):
@@ -102,6 +271,31 @@ class CustomUserSetPasswordSerializer(serializers.Serializer):
         return validate_data
 
 
+class AggregatedRows(list):
+    """
+    Rows of a nested field aggregated by the database.
+    """
+
+
+class AggregatedListSerializer(serializers.ListSerializer):
+    """
+    List serializer for nested fields of RecipeReadSerializer.
+    If the recipe has '<field_name>_json' annotation (JSONB array,
+    see api/querysets.py), renders it without model instances.
+    """
+    def get_attribute(self, instance):
+        rows = getattr(instance, f'{self.field_name}_json', None)
+        if rows is not None:
+            return AggregatedRows(rows)
+        return super().get_attribute(instance)
+
+    def to_representation(self, data):
+        if isinstance(data, AggregatedRows):
+            names = list(self.child.fields)
+            return [{name: row[name] for name in names} for row in data]
+        return super().to_representation(data)
+
+
 class TagSerializer(serializers.ModelSerializer):
     """
     Serializer for TagViewset.
@@ -112,6 +306,7 @@ class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
+        list_serializer_class = AggregatedListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -144,6 +339,7 @@ class RecipeIngredientAmountSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'name', 'measurement_unit', 'amount'
         )
+        list_serializer_class = AggregatedListSerializer
 
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
@@ -168,7 +364,7 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Read Serializer for RecipeViewset.
     Uses model: Recipe.
@@ -187,7 +383,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientAmountSerializer(
         many=True, source='recipe'
     )
-    image = Base64ImageField()
+    image = serializers.ImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -197,11 +393,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
             'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
         )
+        list_serializer_class = FastListSerializer
 
     def get_is_favorited(self, obj):
         """
         Method checks if user has recipe in favorite list.
+        Uses 'is_favorited' annotation if the queryset has it.
         """
+        is_favorited = getattr(obj, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
         user = self.context['request'].user
         if user.is_authenticated:
             return user.favorite_recipe.filter(recipe=obj).exists()
@@ -210,7 +411,11 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         """
         Method checks if user has recipe in shopping cart.
+        Uses 'is_in_shopping_cart' annotation if the queryset has it.
         """
+        is_in_shopping_cart = getattr(obj, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         user = self.context['request'].user
         if user.is_authenticated:
             return user.shopping_cart.filter(recipe=obj).exists()
@@ -232,10 +437,6 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     ingredients = IngredientAmountSerializer(
         many=True
     )
-    image = Base64ImageField(
-        max_length=None,
-        use_url=True
-    )
 
     class Meta:
         model = Recipe
@@ -245,6 +446,14 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'author')
 
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['image'] = get_base64_image_field(
+            max_length=None,
+            use_url=True
+        )
+        return fields
+
     def validate(self, data):
         recipe_name, recipe_text = data['name'], data['text']
         ingredient_amount = data['ingredients']
@@ -309,6 +518,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 amount=amount
             )
         recipe.tags.set(tags)
+        enqueue_index_recipe(recipe.pk)
         return recipe
 
     def update(self, instance, validated_data):
@@ -337,6 +547,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             instance.tags.clear()
             instance.tags.set(tags)
 
+        enqueue_index_recipe(instance.pk)
         return instance
 
     def to_representation(self, instance):
@@ -357,14 +568,87 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
     Serializes/deserializes fileds of Recipe model:
     id, name, image, cooking_time.
     """
-    image = Base64ImageField()
+    image = serializers.ImageField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+        list_serializer_class = FastListSerializer
+
+
+class PantryRecipeSerializer(ShortRecipeSerializer):
+    """
+    Serializes a recipe found by pantry search.
+    Uses in RecipeViewSet.pantry.
+    Serializes fileds of ShortRecipeSerializer
+    + number of matched and missing ingredients.
+    """
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(ShortRecipeSerializer.Meta):
+        fields = ShortRecipeSerializer.Meta.fields + ('matched', 'missing')
+
+
+class PantrySearchSerializer(serializers.Serializer):
+    """
+    Serializer for query parameters of RecipeViewSet.pantry:
+    ingredients (ids separated by commas), ordering, max_missing.
+    """
+    ingredients = serializers.CharField()
+    ordering = serializers.ChoiceField(
+        choices=ORDERINGS, default=ORDERINGS[0]
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_ingredients(self, value):
+        try:
+            ingredient_ids = {int(pk) for pk in value.split(',') if pk}
+        except ValueError:
+            raise serializers.ValidationError(
+                'Укажите id ингредиентов через запятую.'
+            )
+        if not 1 <= len(ingredient_ids) <= settings.PANTRY_MAX_INGREDIENTS:
+            raise serializers.ValidationError(
+                'Укажите от 1 до '
+                f'{settings.PANTRY_MAX_INGREDIENTS} ингредиентов.'
+            )
+        unknown = ingredient_ids - set(Ingredient.objects.filter(
+            pk__in=ingredient_ids
+        ).values_list('pk', flat=True))
+        if unknown:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {sorted(unknown)}.'
+            )
+        return ingredient_ids
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Serializer for query parameters of RecipeViewSet.batch:
+    ids of recipes separated by commas, in the requested order
+    without repeats.
+    """
+    ids = serializers.CharField()
+
+    def validate_ids(self, value):
+        try:
+            recipe_ids = list(dict.fromkeys(
+                int(pk) for pk in value.split(',') if pk
+            ))
+        except ValueError:
+            raise serializers.ValidationError(
+                'Укажите id рецептов через запятую.'
+            )
+        if not 1 <= len(recipe_ids) <= settings.RECIPES_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Укажите от 1 до {settings.RECIPES_BATCH_MAX_SIZE} рецептов.'
+            )
+        return recipe_ids
 
 
-class SubscriptionSerializer(serializers.ModelSerializer,
+class SubscriptionSerializer(SparseFieldsMixin,
+                             serializers.ModelSerializer,
                              IsSubscribedMethod):
     """
     Serializer for Subscription.
@@ -385,28 +669,93 @@ class SubscriptionSerializer(serializers.ModelSerializer,
         fields = (
             'email', 'id', 'username', 'first_name', 'last_name',
             'is_subscribed', 'recipes', 'recipes_count')
+        list_serializer_class = FastListSerializer
+
+    @cached_property
+    def recipes_serializer(self):
+        """
+        Serializer of recipes is built once for all authors of the list.
+        """
+        return ShortRecipeSerializer(many=True, context=self.context)
 
     def get_recipes(self, obj):
         """
         Method returns list of the author's recipes.
-        Provides the recipe limitation to return.
+        Provides the recipe limitation to return
+        (already applied by get_subscriptions_for_read for lists).
         """
-        request = self.context['request']
-        recipe_limit = request.GET.get('recipes_limit')
-        if recipe_limit:
-            recipes = obj.recipe.all()[:int(recipe_limit)]
-        else:
-            recipes = obj.recipe.all()
-        serializer = ShortRecipeSerializer(
-            recipes, many=True, context={'request': request}
-        )
-        return serializer.data
+        recipes = obj.recipe.all()
+        recipe_limit = get_recipes_limit(self.context['request'])
+        if recipe_limit is not None:
+            recipes = recipes[:recipe_limit]
+        return self.recipes_serializer.to_representation(recipes)
 
     def get_recipes_count(self, obj):
         """
         Method returns the number of the author's recipes.
+        Uses 'recipes_count' annotation if the queryset has it.
         """
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is not None:
+            return recipes_count
         results = Recipe.objects.filter(author=obj).aggregate(
             count_recipes=Count('name')
         )
         return results['count_recipes']
+
+
+class IngredientImportSerializer(serializers.Serializer):
+    """
+    Serializer of an ingredient of an imported recipe (api/ndjson.py).
+    Ingredient is resolved by name and measurement_unit.
+    """
+    name = serializers.CharField(max_length=200)
+    measurement_unit = serializers.CharField(max_length=200)
+    amount = serializers.IntegerField(min_value=1, max_value=32767)
+
+
+class ImportImageField(serializers.ImageField):
+    """
+    Image of an imported recipe: base64 data (as for
+    RecipeWriteSerializer) is decoded into a new file, other strings
+    are paths of images in the storage (as given by the export)
+    which are checked by api/ndjson.py.
+    """
+    @cached_property
+    def base64_field(self):
+        return get_base64_image_field()
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and not data.startswith('data:'):
+            return data
+        try:
+            return self.base64_field.to_internal_value(data)
+        except ValueError:
+            self.fail('invalid_image')
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """
+    Serializer of a line of NDJSON import of recipes (api/ndjson.py).
+    Tags are given by slugs, author by email.
+    """
+    name = serializers.CharField(max_length=200)
+    text = serializers.CharField()
+    cooking_time = serializers.IntegerField(min_value=1, max_value=32767)
+    image = ImportImageField()
+    author = serializers.EmailField(required=False, allow_null=True)
+    tags = serializers.ListField(
+        child=serializers.SlugField(), allow_empty=False
+    )
+    ingredients = IngredientImportSerializer(many=True, allow_empty=False)
+
+    def validate_ingredients(self, value):
+        keys = {
+            (ingredient['name'], ingredient['measurement_unit'])
+            for ingredient in value
+        }
+        if len(keys) != len(value):
+            raise serializers.ValidationError(
+                'Рецепт не может иметь двух одиноковых ингредиентов.'
+            )
+        return value
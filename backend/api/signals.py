@@ -0,0 +1,68 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from .authentication import invalidate_token, invalidate_user_tokens
+from .caching import delete_cached, invalidate_bootstrap, invalidate_cached
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """
+    Cached token is removed after commit of logout
+    (api/auth/token/logout/), so it isn't cached again
+    by a concurrent request.
+    """
+    transaction.on_commit(partial(invalidate_token, instance.key))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, **kwargs):
+    """
+    Cached tokens of the user are removed after commit of every change
+    of the user: password change, deactivation, profile update.
+    Bootstrap data of the user is stale after commit.
+    """
+    transaction.on_commit(partial(invalidate_user_tokens, instance.pk))
+    transaction.on_commit(partial(invalidate_bootstrap, instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """
+    Cached recipe is served stale after commit of the change until
+    it's recomputed, soft deleted recipe is removed from cache
+    and from bootstrap data of all users.
+    """
+    if created:
+        return
+    if instance.deleted_at is not None:
+        transaction.on_commit(partial(delete_cached, 'recipe', instance.pk))
+        transaction.on_commit(invalidate_bootstrap)
+        return
+    transaction.on_commit(partial(invalidate_cached, 'recipe', instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(delete_cached, 'recipe', instance.pk))
+    transaction.on_commit(invalidate_bootstrap)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def tag_or_ingredient_changed(sender, instance, **kwargs):
+    """
+    Tags and ingredients are rendered inside recipes too,
+    cached lists and recipes become stale.
+    """
+    name = 'tags' if sender is Tag else 'ingredients'
+    transaction.on_commit(partial(invalidate_cached, name))
+    transaction.on_commit(partial(invalidate_cached, 'recipe'))
@@ -0,0 +1,78 @@
+import logging
+
+from recipes.tasks import enqueue_update_trending
+from tasks.queue import enqueue, task
+from users.models import CustomUser
+from .deletion import purge_recipe, purge_user
+from .utils import export_shopping_cart, get_shopping_cart_ingredients
+
+logger = logging.getLogger(__name__)
+
+# Changes of the shopping cart made within the delay are rendered once.
+SHOPPING_CART_RENDER_DELAY = 5
+
+
+@task()
+def render_shopping_cart(user_id):
+    """
+    Task saves PDF of the user's shopping cart to the exports after
+    the cart has changed, so download_shopping_cart finds it ready.
+    """
+    user = CustomUser.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    export_shopping_cart(user, list(get_shopping_cart_ingredients(user)))
+
+
+def enqueue_render_shopping_cart(user_id):
+    enqueue(
+        render_shopping_cart,
+        dedup_key=f'render-shopping-cart:{user_id}',
+        delay=SHOPPING_CART_RENDER_DELAY,
+        user_id=user_id
+    )
+
+
+def enqueue_favorite_changed(user_id):
+    """
+    Function schedules tasks after the user's favorites have changed:
+    new favorites are added to trending scores.
+    """
+    enqueue_update_trending()
+
+
+def log_purge_progress(label, progress):
+    for table, count in progress:
+        logger.info('Purging %s: %s rows of %s.', label, count, table)
+
+
+@task()
+def purge_deleted_recipe(recipe_id):
+    """
+    Task removes rows of the deleted recipe in batches.
+    An interrupted purge is continued by the next attempt.
+    """
+    log_purge_progress(f'recipe {recipe_id}', purge_recipe(recipe_id))
+
+
+@task()
+def purge_deleted_user(user_id):
+    """
+    Task removes rows of the deleted user in batches.
+    An interrupted purge is continued by the next attempt.
+    """
+    log_purge_progress(f'user {user_id}', purge_user(user_id))
+
+
+def enqueue_purge_recipe(recipe_id):
+    enqueue(
+        purge_deleted_recipe, dedup_key=f'purge-recipe:{recipe_id}',
+        recipe_id=recipe_id
+    )
+
+
+def enqueue_purge_user(user_id):
+    enqueue(
+        purge_deleted_user, dedup_key=f'purge-user:{user_id}',
+        user_id=user_id
+    )
@@ -0,0 +1,28 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from recipes.models import Ingredient
+
+DATA_OPTIONS = {
+    'users': 12,
+    'recipes': 60,
+    'favorites': 120,
+    'carts': 40,
+    'subscriptions': 30,
+}
+
+
+def generate_data(**options):
+    """
+    Function fills the test database with a small seeded dataset
+    (see generate_data command), options override DATA_OPTIONS.
+    """
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(1, 31)
+    )
+    call_command(
+        'generate_data', skip_indexes=True, stdout=StringIO(),
+        **{**DATA_OPTIONS, **options}
+    )
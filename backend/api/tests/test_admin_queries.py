@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.management.commands.check_admin_queries import MAX_QUERIES
+from recipes.trending import update_trending
+from users.models import CustomUser
+from .data import generate_data
+
+ROWS_PER_PAGE = 5
+
+
+class AdminChangelistQueriesTests(TestCase):
+    """
+    Admin changelists execute the same number of queries for one
+    and for several rows on a page (see check_admin_queries command).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        generate_data()
+        update_trending()
+        cls.superuser = CustomUser.objects.create_superuser(
+            username='admin', email='admin@foodgram.test', password=None
+        )
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+
+    def get_changelist(self, model, rows):
+        url = reverse(
+            f'admin:{model._meta.app_label}_{model._meta.model_name}'
+            '_changelist'
+        )
+        with mock.patch.object(
+            admin.site._registry[model], 'list_per_page', rows
+        ):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_changelist_queries(self):
+        for model in admin.site._registry:
+            with self.subTest(model=model._meta.label):
+                with CaptureQueriesContext(connection) as queries:
+                    self.get_changelist(model, 1)
+                self.assertLessEqual(len(queries), MAX_QUERIES)
+                with self.assertNumQueries(len(queries)):
+                    self.get_changelist(model, ROWS_PER_PAGE)
@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api import async_views
+from api.authentication import local_tokens
+from recipes.models import ShoppingCart
+from .data import generate_data
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/'
+
+
+class AsyncDownloadShoppingCartTests(TestCase):
+    """
+    Async download_shopping_cart (ASYNC_READ_VIEWS) is served
+    for the user authenticated with the cached token,
+    fields of the user are read in the event loop.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        generate_data()
+        cls.user = ShoppingCart.objects.select_related(
+            'user'
+        ).first().user
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        protected_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, protected_root)
+        settings = override_settings(
+            PROTECTED_ROOT=protected_root, EXPORT_DELIVERY='django'
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        local_tokens.clear()
+        self.factory = AsyncRequestFactory()
+
+    async def download(self):
+        request = self.factory.get(
+            DOWNLOAD_URL, authorization=f'Token {self.token.key}'
+        )
+        response = await async_views.download_shopping_cart(request)
+        content = b''.join(response)
+        response.close()
+        return response, content
+
+    async def test_download(self):
+        # The first request resolves the token in the database,
+        # the second one gets it from the cache.
+        for _ in range(2):
+            response, content = await self.download()
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertIn(self.user.username, response['Content-Disposition'])
+            self.assertTrue(content.startswith(b'%PDF'))
+
+    async def test_anonymous(self):
+        response = await async_views.download_shopping_cart(
+            self.factory.get(DOWNLOAD_URL)
+        )
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from api.authentication import (CachedTokenAuthentication, invalidate_token,
+                                local_tokens)
+from users.models import CustomUser
+
+FILE_BASED_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Cached tokens are invalidated after commit, the per-process LRU
+    doesn't serve tokens revoked by other processes.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='user', email='user@foodgram.test', password=None
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': FILE_BASED_CACHE, 'LOCATION': location
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+        local_tokens.clear()
+        self.addCleanup(local_tokens.clear)
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )[0]
+
+    def deactivate(self):
+        # Change of the row without signals: only the cache is stale.
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+    def test_revoked_in_other_process(self):
+        self.authenticate()
+        self.deactivate()
+        # Other process doesn't clear the LRU of this process.
+        with mock.patch.object(local_tokens, 'delete'):
+            invalidate_token(self.token.key)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_cached_with_revoked_version(self):
+        get_token = CachedTokenAuthentication.get_token
+
+        def get_token_revoked(authentication, key):
+            # The row is read before the concurrent revocation.
+            token = get_token(authentication, key)
+            invalidate_token(key)
+            return token
+
+        with mock.patch.object(
+            CachedTokenAuthentication, 'get_token', get_token_revoked
+        ):
+            self.authenticate()
+        self.deactivate()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_invalidated_after_commit(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+        self.authenticate()
+        for callback in callbacks:
+            callback()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.deletion import delete_in_batches, purge_recipe, soft_delete_recipe
+from recipes.models import Favorite, Recipe
+from recipes.pantry import rebuild_pantry_index, search_pantry
+from recipes.similarity import get_similar_recipes, rebuild_index
+from .data import generate_data
+
+
+class SoftDeleteRecipeTests(TestCase):
+    """
+    Soft deleted recipe is removed from the pantry and similar recipes
+    indexes at once, rows are purged in batches, one transaction
+    per batch.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        generate_data()
+        for _ in rebuild_index():
+            pass
+        for _ in rebuild_pantry_index():
+            pass
+
+    def get_similar_recipe(self):
+        for recipe in Recipe.objects.order_by('pk'):
+            similar = get_similar_recipes(recipe.pk, 10)
+            if similar:
+                return recipe, Recipe.objects.get(pk=similar[0][0])
+        self.fail('No similar recipes in the dataset.')
+
+    def test_removed_from_indexes(self):
+        recipe, deleted = self.get_similar_recipe()
+        ingredient_ids = list(
+            deleted.ingredients.values_list('pk', flat=True)
+        )
+        self.assertIn(deleted.pk, search_pantry(ingredient_ids).matched)
+        soft_delete_recipe(deleted)
+        self.assertNotIn(deleted.pk, search_pantry(ingredient_ids).matched)
+        self.assertNotIn(
+            deleted.pk,
+            [pk for pk, _ in get_similar_recipes(recipe.pk, 100)]
+        )
+        self.assertEqual(get_similar_recipes(deleted.pk, 10), [])
+        list(purge_recipe(deleted.pk))
+        self.assertFalse(Recipe.all_objects.filter(pk=deleted.pk).exists())
+
+    def test_transaction_per_batch(self):
+        queryset = Favorite.objects.order_by('pk')
+        count = queryset.count()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(
+                list(delete_in_batches(queryset, 50))[-1], count
+            )
+        batches = -(-count // 50)
+        savepoints = [
+            query for query in queries
+            if query['sql'].startswith('SAVEPOINT')
+        ]
+        # One more transaction finds no rows left.
+        self.assertEqual(len(savepoints), batches + 1)
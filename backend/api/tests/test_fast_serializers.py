@@ -0,0 +1,124 @@
+import random
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.querysets import (get_recipes_for_read, get_subscriptions_for_read,
+                           get_users_for_read)
+from api.serializers import (CustomUserReadSerializer, RecipeReadSerializer,
+                             ShortRecipeSerializer, SubscriptionSerializer)
+from recipes.models import Recipe
+from users.models import CustomUser
+from .data import generate_data
+
+AGGREGATES = (False, True) if connection.vendor == 'postgresql' else (False,)
+# Every seed generates its own dataset, readers and sets of fields.
+SEEDS = range(25)
+CASES_PER_SEED = 4
+
+
+def get_random_fields(rng, serializer_class):
+    """
+    Function returns None (all fields) or a random subset of
+    the fields of the serializer in random order.
+    """
+    fields = serializer_class.Meta.fields
+    if rng.random() < 0.25:
+        return None
+    return tuple(rng.sample(fields, rng.randint(1, len(fields))))
+
+
+class FastSerializersTests(TestCase):
+    """
+    Read serializers of list endpoints render the same JSON with
+    the compiled fast path (FAST_SERIALIZERS) as with DRF fields
+    (see check_fast_serializers command) for random datasets,
+    readers and sets of fields.
+    """
+    def render(self, serializer_class, objects, reader, fields, params):
+        request = Request(APIRequestFactory().get('/api/', params))
+        request.user = reader
+        kwargs = {} if fields is None else {'fields': fields}
+        return JSONRenderer().render(serializer_class(
+            objects, many=True, context={'request': request}, **kwargs
+        ).data)
+
+    def assert_same_output(self, serializer_class, objects, reader,
+                           fields=None, params=None):
+        rendered = {}
+        for fast in (True, False):
+            with override_settings(FAST_SERIALIZERS=fast):
+                rendered[fast] = self.render(
+                    serializer_class, objects, reader, fields, params or {}
+                )
+        self.assertEqual(rendered[True], rendered[False])
+
+    def generate_data(self, rng, seed):
+        users = rng.randint(1, 10)
+        generate_data(
+            seed=seed,
+            users=users,
+            recipes=rng.randint(0, 40),
+            favorites=rng.randint(0, 80),
+            carts=rng.randint(0, 40),
+            subscriptions=rng.randint(0, users * 3),
+            min_ingredients=rng.randint(0, 3),
+            max_ingredients=rng.randint(3, 10),
+        )
+
+    def get_random_reader(self, rng, users):
+        return rng.choice(users + [AnonymousUser()])
+
+    def test_random_datasets(self):
+        for seed in SEEDS:
+            with self.subTest(seed=seed), transaction.atomic():
+                rng = random.Random(seed)
+                self.generate_data(rng, seed)
+                users = list(CustomUser.objects.order_by('pk'))
+                for _ in range(CASES_PER_SEED):
+                    self.check_recipes(rng, users)
+                    self.check_users(rng, users)
+                    self.check_subscriptions(rng, users)
+                self.assert_same_output(
+                    ShortRecipeSerializer, list(Recipe.objects.all()),
+                    self.get_random_reader(rng, users)
+                )
+                transaction.set_rollback(True)
+
+    def check_recipes(self, rng, users):
+        reader = self.get_random_reader(rng, users)
+        fields = get_random_fields(rng, RecipeReadSerializer)
+        aggregate = rng.choice(AGGREGATES)
+        recipes = list(get_recipes_for_read(
+            reader, fields=fields, aggregate=aggregate
+        ))
+        self.assert_same_output(RecipeReadSerializer, recipes, reader, fields)
+
+    def check_users(self, rng, users):
+        reader = self.get_random_reader(rng, users)
+        fields = get_random_fields(rng, CustomUserReadSerializer)
+        self.assert_same_output(
+            CustomUserReadSerializer,
+            list(get_users_for_read(reader, fields=fields)),
+            reader, fields
+        )
+
+    def check_subscriptions(self, rng, users):
+        subscriber = rng.choice(users)
+        fields = get_random_fields(rng, SubscriptionSerializer)
+        recipes_limit = rng.choice((None, 0, 1, 2, 5))
+        params = {}
+        if recipes_limit is not None:
+            params['recipes_limit'] = recipes_limit
+        self.assert_same_output(
+            SubscriptionSerializer,
+            list(get_subscriptions_for_read(
+                subscriber, fields, recipes_limit
+            )),
+            subscriber, fields, params
+        )
@@ -0,0 +1,61 @@
+from unittest import skipUnless
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.querysets import get_recipes_for_read
+from api.serializers import RecipeReadSerializer
+from users.models import CustomUser
+from .data import generate_data
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'JSON aggregation of recipes is available only on PostgreSQL.'
+)
+class RecipesJSONAggregationTests(TestCase):
+    """
+    Recipes with tags and ingredients aggregated into JSON by PostgreSQL
+    are rendered exactly as with prefetched model instances
+    (see check_recipes_json command).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        generate_data()
+        cls.user = CustomUser.objects.filter(
+            favorite_recipe__isnull=False, recipe__isnull=False
+        ).first()
+
+    def render(self, user, aggregate, fields=None):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        recipes = get_recipes_for_read(
+            user, fields=fields, aggregate=aggregate
+        ).order_by('-pub_date', '-pk')
+        return JSONRenderer().render(RecipeReadSerializer(
+            recipes, many=True, context={'request': request}, fields=fields
+        ).data)
+
+    def test_same_output(self):
+        for user in (AnonymousUser(), self.user):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    self.render(user, aggregate=True),
+                    self.render(user, aggregate=False)
+                )
+
+    def test_same_output_of_requested_fields(self):
+        for fields in (('id', 'tags'), ('id', 'ingredients', 'author')):
+            with self.subTest(fields=fields):
+                self.assertEqual(
+                    self.render(self.user, aggregate=True, fields=fields),
+                    self.render(self.user, aggregate=False, fields=fields)
+                )
+
+    def test_aggregated_queries(self):
+        with self.assertNumQueries(2):
+            self.render(self.user, aggregate=True)
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.throttling import THROTTLE_CACHE_ALIAS, TokenBucketThrottle
+
+
+class BurstThrottle(TokenBucketThrottle):
+    scope = 'test'
+    rate = '10/min'
+
+
+class TokenBucketThrottleTests(SimpleTestCase):
+    """
+    The bucket key lives until the bucket is full again,
+    so it isn't reset to a full bucket earlier.
+    """
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        caches[THROTTLE_CACHE_ALIAS].clear()
+        self.addCleanup(caches[THROTTLE_CACHE_ALIAS].clear)
+        self.request = Request(APIRequestFactory().get('/api/'))
+        self.request.user = AnonymousUser()
+
+    def allowed(self, at, requests):
+        self.now = 1000.0 + at
+        allowed = 0
+        for _ in range(requests):
+            throttle = BurstThrottle()
+            throttle.timer = lambda: self.now
+            allowed += throttle.allow_request(self.request, None)
+        return allowed
+
+    def test_burst(self):
+        self.assertEqual(self.allowed(0, 11), 10)
+
+    def test_key_outlives_first_period(self):
+        # One token refills every 6 seconds.
+        self.assertEqual(self.allowed(0, 1), 1)
+        self.assertEqual(self.allowed(5, 9), 9)
+        self.assertEqual(self.allowed(30, 5), 5)
+        # The bucket is full at 90 s: at 61 s it has 5 tokens.
+        self.assertEqual(self.allowed(61, 10), 5)
+        self.assertEqual(self.allowed(120, 11), 10)
@@ -0,0 +1,96 @@
+import math
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle (GCRA) keyed by the user or, for anonymous
+    requests, by the client IP. Rate 'N/period' of the scope
+    (DEFAULT_THROTTLE_RATES) is a bucket of N tokens which refills
+    at N tokens per period; rate None disables the scope.
+    The bucket is a single integer in the 'throttle' cache: the time
+    (ms) when it becomes full again. An allowed request is one atomic
+    incr and touch, a throttled request is rolled back with decr.
+    The key expires when the bucket is full again, throttled
+    requests prolong it.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[THROTTLE_CACHE_ALIAS]
+        self.wait_seconds = None
+
+    def get_rate(self):
+        # Rates are read for every request to follow override_settings
+        # (benchmark_api disables them).
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        period = self.duration * 1000
+        interval = max(period // self.num_requests, 1)
+        now = int(self.timer() * 1000)
+        try:
+            full_at = self.cache.incr(key, interval)
+        except ValueError:
+            full_at = None
+        if full_at is None or full_at - interval < now:
+            # The bucket was full: racing requests may each take
+            # a token from a full bucket, which is harmless.
+            self.cache.set(key, now + interval, self.duration)
+            return True
+        if full_at - now <= period:
+            # incr keeps the expiry of the key, it's moved to the time
+            # the bucket is full: an expired key is a full bucket.
+            self.cache.touch(key, math.ceil((full_at - now) / 1000))
+            return True
+        try:
+            self.cache.decr(key, interval)
+        except ValueError:
+            pass
+        self.cache.touch(key, self.duration)
+        self.wait_seconds = (full_at - now - period) / 1000
+        return False
+
+    def wait(self):
+        if self.wait_seconds is None:
+            return None
+        return math.ceil(self.wait_seconds)
+
+
+class SearchThrottle(TokenBucketThrottle):
+    """
+    Throttle of search endpoints: ingredients, pantry, similar recipes.
+    """
+    scope = 'search'
+
+
+class ToggleThrottle(TokenBucketThrottle):
+    """
+    Throttle of favorites, shopping cart and subscriptions toggles.
+    """
+    scope = 'toggles'
+
+
+class ExportThrottle(TokenBucketThrottle):
+    """
+    Throttle of exports and imports: shopping cart PDF, NDJSON
+    export and import of recipes.
+    """
+    scope = 'exports'
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from .views import (BootstrapView, CustomUserViewSet, IngredientViewSet,
+                    MetricsView, RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 
@@ -14,6 +15,25 @@ router_v1.register('users', CustomUserViewSet, basename='users')
 
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
     path('', include(router_v1.urls)),
     re_path(r'auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views
+
+    # Hot read endpoints are served by async views under ASGI,
+    # other methods of these endpoints are passed to the viewsets.
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list),
+        path('recipes/<int:pk>/', async_views.recipe_detail),
+        path(
+            'recipes/download_shopping_cart/',
+            async_views.download_shopping_cart
+        ),
+        path('tags/', async_views.tag_list),
+        path('ingredients/', async_views.ingredient_list),
+        path('users/subscriptions/', async_views.subscriptions),
+    ] + urlpatterns
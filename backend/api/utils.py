@@ -1,27 +1,54 @@
 import io
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
+from django.conf import settings
 from django.db.models import Sum
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 
+from foodgram.settings import SHOPPING_CART_FILENAME
 from recipes.models import RecipeIngredientAmount
+from .exports import get_export_name, reuse_export, save_export
 
 CART_TITLE = 'СПИСОК ПОКУПОК'
 EMPTY_CART_TITLE = 'Список покупок пуст'
 FONTS_DIR = Path('./static/fonts/DejaVuSerif.ttf').resolve()
+PDF_CONTENT_TYPE = 'application/pdf'
 
 
-def create_pdf_shopping_cart(user):
+def get_shopping_cart_filename(user):
+    return f'{user.username}\'s-{SHOPPING_CART_FILENAME}'
+
+
+def get_shopping_cart_ingredients(user):
+    """
+    Function returns all ingredients with it's name, amount (unique)
+    and measurement_unit which are in user's shopping cart.
+    Ingredients are ordered by name, so the same shopping cart
+    gets the same export file name.
+    """
+    return RecipeIngredientAmount.objects.filter(
+        recipe__shopping_cart__user=user,
+        recipe__deleted_at__isnull=True
+    ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
+        total_amount=Sum('amount')
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def render_shopping_cart_pdf(ingredients_list):
     """
-    Function returns FileResponse (PDF File for downloading).
-    If recipe/recipes have been added to shopping cart
-    PDF would be filled with unique ingredients with its
-    amounts and mesurement units.
+    Function returns BytesIO with PDF file.
+    If ingredients_list isn't empty PDF would be filled with
+    unique ingredients with its amounts and mesurement units.
     Otherwise it will be written 'Shopping cart is empty'.
+    Doesn't touch the database: can be run in a thread or process pool.
+    reportlab is imported on the first call, not at worker boot.
     """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
     buffer = io.BytesIO()
     pdf_page = canvas.Canvas(buffer, pagesize=letter)
 
@@ -32,14 +59,6 @@ def create_pdf_shopping_cart(user):
     # Set x and y positions for the text on the page
     x_value, y_value = 20, 635
 
-    # Get all ingredients with it's name, amount (unique), measurement_unit
-    # Which are in request user's shopping cart
-    ingredients_list = RecipeIngredientAmount.objects.filter(
-        recipe__shopping_cart__user=user
-    ).values('ingredient__name', 'ingredient__measurement_unit').annotate(
-        total_amount=Sum('amount')
-    )
-
     if ingredients_list:
         pdf_page.drawCentredString(315, 700, CART_TITLE)
 
@@ -61,3 +80,35 @@ def create_pdf_shopping_cart(user):
     pdf_page.save()
     buffer.seek(0)
     return buffer
+
+
+def get_shopping_cart_export_name(ingredients_list):
+    return get_export_name('shopping-cart', ingredients_list, 'pdf')
+
+
+def export_shopping_cart(user, ingredients_list):
+    """
+    Function saves PDF file of the shopping cart to the user's exports
+    and returns its name. PDF is rendered again only if the shopping
+    cart has changed or the previous file has expired.
+    """
+    name = get_shopping_cart_export_name(ingredients_list)
+    if not reuse_export(user.pk, name):
+        save_export(
+            user.pk, name, render_shopping_cart_pdf(ingredients_list)
+        )
+    return name
+
+
+@lru_cache(maxsize=None)
+def get_pdf_executor():
+    """
+    Function returns pool for rendering PDF files outside the event loop.
+    PDF_RENDER_EXECUTOR setting: 'thread' or 'process'.
+    """
+    if settings.PDF_RENDER_EXECUTOR == 'process':
+        return ProcessPoolExecutor(max_workers=settings.PDF_RENDER_WORKERS)
+    return ThreadPoolExecutor(
+        max_workers=settings.PDF_RENDER_WORKERS,
+        thread_name_prefix='pdf-render'
+    )
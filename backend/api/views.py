@@ -1,25 +1,50 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
-from django.http import FileResponse
+from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from foodgram.settings import SHOPPING_CART_FILENAME
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeTrend,
+                            ShoppingCart, Tag)
+from recipes.pantry import search_pantry
+from recipes.similarity import get_similar_recipes
+from recipes.tasks import get_indexed_ingredient_ids, remove_recipe_from_pantry
+from tasks.queue import enqueue
 from users.models import CustomUser, Subscription
+from .caching import (get_cached_bootstrap, get_cached_ingredients,
+                      get_cached_recipe, get_cached_tags, invalidate_bootstrap)
+from .deletion import soft_delete_recipe, soft_delete_user
+from .exports import export_response
+from .fieldsets import SparseFieldsViewMixin
 from .filters import IngredientFilter, RecipeFilter
-from .permissions import IsAdminOrReadOnly, IsOwnerAdminOrReadOnly
+from .metrics import registry
+from .ndjson import (RecipeImportError, export_recipes, import_recipes,
+                     ndjson_response)
+from .permissions import IsAdmin, IsAdminOrReadOnly, IsOwnerAdminOrReadOnly
+from .querysets import (get_recipes_for_read, get_recipes_limit,
+                        get_subscriptions_for_read, get_users_for_read)
 from .serializers import (CustomUserReadSerializer,
                           CustomUserSetPasswordSerializer,
                           CustomUserWriteSerializer, IngredientSerializer,
-                          RecipeReadSerializer, RecipeWriteSerializer,
-                          ShortRecipeSerializer, SubscriptionSerializer,
-                          TagSerializer)
-from .utils import create_pdf_shopping_cart
+                          PantryRecipeSerializer, PantrySearchSerializer,
+                          RecipeBatchSerializer, RecipeReadSerializer,
+                          RecipeWriteSerializer, ShortRecipeSerializer,
+                          SubscriptionSerializer, TagSerializer)
+from .tasks import (enqueue_favorite_changed, enqueue_purge_recipe,
+                    enqueue_purge_user, enqueue_render_shopping_cart)
+from .throttling import ExportThrottle, SearchThrottle, ToggleThrottle
+from .utils import (PDF_CONTENT_TYPE, export_shopping_cart,
+                    get_shopping_cart_filename, get_shopping_cart_ingredients)
 
 CART_DELETION_ERROR = 'Рецепт уже удален из списка покупок.'
 DELETION_ERROR = 'Рецепт уже удален из списка.'
@@ -27,6 +52,26 @@ DOUBLE_ADD_ERROR = 'Рецепт нельзя добавить дважды.'
 DELETE_SUB_ERROR = 'Подписка уже удалена либо не была ранее создана.'
 DOUBLE_FOLLOWING_ERROR = 'Нельзя дважды подписаться на одного юзера.'
 SELF_FOLLOWING_ERROR = 'Пользователь не может подписаться сам на себя.'
+SIMILAR_LIMIT_ERROR = (
+    f'Укажите число от 1 до {settings.SIMILAR_RECIPES_MAX_LIMIT}.'
+)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_similar_limit(request):
+    """
+    Function returns ?limit= of the similar recipes endpoint.
+    """
+    limit = request.query_params.get('limit')
+    if limit is None:
+        return settings.SIMILAR_RECIPES_LIMIT
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError({'limit': SIMILAR_LIMIT_ERROR})
+    if not 1 <= limit <= settings.SIMILAR_RECIPES_MAX_LIMIT:
+        raise ValidationError({'limit': SIMILAR_LIMIT_ERROR})
+    return limit
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -34,28 +79,37 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     The viewset for Tag model.
     Allowed request methods: GET.
     Permissions: All users.
+    The list is cached (stale-while-revalidate), see api/caching.py.
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(get_cached_tags())
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """
     The viewset for Ingredient model.
     Allowed request methods: GET.
     Permissions: All users.
+    Lists are cached for every value of the filter, see api/caching.py.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (IsAdminOrReadOnly,)
+    throttle_classes = (SearchThrottle,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return Response(get_cached_ingredients(request))
 
-class CustomUserViewSet(UserViewSet):
+
+class CustomUserViewSet(SparseFieldsViewMixin, UserViewSet):
     """
     The viewset for model CustomUser.
     The viewset inherits from UserViewSet for Djoser library.
@@ -67,12 +121,33 @@ class CustomUserViewSet(UserViewSet):
             api/users/, api/users/set_password/,
             api/auth/token/login/, api/auth/token/logout/
     Permissions are set in Djoser library.
+    GET endpoints take ?fields= and ?omit= to render only some fields.
+    Deleted users are hidden at once and purged in background
+    (SOFT_DELETE), see api/deletion.py.
     """
     queryset = CustomUser.objects.all()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            return get_users_for_read(
+                self.request.user, queryset, self.get_requested_fields()
+            )
+        return queryset
+
+    def get_instance(self):
+        """
+        The current user (api/users/me/) is read from the database:
+        authentication caches only some fields of the user.
+        """
+        return self.get_queryset().get(pk=self.request.user.pk)
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return CustomUserReadSerializer
+        if self.request.method == 'DELETE':
+            # Djoser's serializer which checks current_password.
+            return super().get_serializer_class()
         return CustomUserWriteSerializer
 
     def perform_create(self, serializer):
@@ -80,6 +155,13 @@ class CustomUserViewSet(UserViewSet):
             password = make_password(self.request.data['password'])
             serializer.save(password=password)
 
+    def perform_destroy(self, instance):
+        if not settings.SOFT_DELETE:
+            instance.delete()
+            return
+        soft_delete_user(instance)
+        enqueue_purge_user(instance.pk)
+
     @action(
         detail=False,
         methods=['post'],
@@ -116,10 +198,13 @@ class CustomUserViewSet(UserViewSet):
         Permissions: Authenticated user.
         """
         user = self.request.user
-        queryset = user.sub_user.all()
+        fields = self.get_requested_fields(SubscriptionSerializer)
+        queryset = get_subscriptions_for_read(
+            user, fields, get_recipes_limit(request)
+        )
         page = self.paginate_queryset(queryset)
         serializer = SubscriptionSerializer(
-            page, many=True, context={'request': request}
+            page, many=True, context={'request': request}, fields=fields
         )
         return self.get_paginated_response(serializer.data)
 
@@ -127,6 +212,7 @@ class CustomUserViewSet(UserViewSet):
         detail=True,
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),
         url_name='subscribe'
     )
     def subscribe(self, request, id):
@@ -166,7 +252,7 @@ class CustomUserViewSet(UserViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     The viewset for Recipe model.
     Allowed request methods: GET, POST, PATCH, DELETE.
@@ -179,12 +265,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
         - by tags' slug;
         - by in_favorited (1 or 0);
         - by in_shopping_cart (1 or 0);
+    Sparse fieldsets:
+        - ?fields=id,name,image to render only given fields;
+        - ?omit=text,ingredients to drop given fields.
+    Deleted recipes are hidden at once and purged in background
+    (SOFT_DELETE), see api/deletion.py.
+    A recipe is read from cache (stale-while-revalidate) with flags
+    of the user, see api/caching.py.
     """
     queryset = Recipe.objects.all()
     permission_classes = (IsOwnerAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return get_recipes_for_read(
+                self.request.user, fields=self.get_requested_fields()
+            )
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeReadSerializer
@@ -193,14 +293,43 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        recipe = get_cached_recipe(request.user, kwargs['pk'])
+        if recipe is None:
+            raise NotFound
+        serializer = self.get_serializer(recipe)
+        return Response(serializer.data)
+
     def perform_update(self, serializer):
-        serializer.save(author=self.request.user)
+        # Cached recipe is invalidated after commit of all changes.
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
+
+    def perform_destroy(self, instance):
+        if settings.SOFT_DELETE:
+            soft_delete_recipe(instance)
+            enqueue_purge_recipe(instance.pk)
+            return
+        recipe_id = instance.pk
+        # Indexed ingredients may differ if indexing is still pending.
+        ingredients = set(
+            instance.ingredients.values_list('pk', flat=True)
+        ) | set(get_indexed_ingredient_ids(recipe_id))
+        instance.delete()
+        enqueue(
+            remove_recipe_from_pantry,
+            recipe_id=recipe_id,
+            ingredient_ids=sorted(ingredients)
+        )
 
-    def favorite_or_shopping_cart(self, model, pk, request):
+    def favorite_or_shopping_cart(self, model, pk, request, on_change=None):
         """
         Method which creates/deletes object depends on model
         has been given to it.
         Works with models: Favorite, ShoppingCart.
+        on_change(user_id) is called after the object is created
+        or deleted, e.g. to enqueue background tasks.
+        Bootstrap data of the user is stale after the change.
         """
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -216,6 +345,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 context={'request': request}
             )
             model.objects.create(user=user, recipe=recipe)
+            transaction.on_commit(partial(invalidate_bootstrap, user.pk))
+            if on_change is not None:
+                on_change(user.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == 'DELETE':
@@ -225,33 +357,219 @@ class RecipeViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             queryset.delete()
+            transaction.on_commit(partial(invalidate_bootstrap, user.pk))
+            if on_change is not None:
+                on_change(user.pk)
             return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(ExportThrottle,),
         url_name='download_recipe'
     )
     def download_shopping_cart(self, request):
         """
         Additional method for the endpoint: api/recipes/download_shopping_cart.
         Returns PDF file for downloading with Ingredients.
+        The file is saved to the user's exports and sent
+        by nginx (X-Accel-Redirect) or by Django, see api/exports.py.
+        Allowed request methods: GET.
+        Permissions: Authenticated user.
+        """
+        user = request.user
+        name = export_shopping_cart(
+            user, list(get_shopping_cart_ingredients(user))
+        )
+        return export_response(
+            user.pk, name, get_shopping_cart_filename(user), PDF_CONTENT_TYPE
+        )
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ExportThrottle,),
+        url_name='export'
+    )
+    def export(self, request):
+        """
+        Additional method for the endpoint: api/recipes/export/.
+        Streams the user's recipes with tags and ingredients
+        as NDJSON (one recipe per line), see api/ndjson.py.
         Allowed request methods: GET.
         Permissions: Authenticated user.
         """
         user = request.user
-        buffer = create_pdf_shopping_cart(user)
-        filename = f'{user.username}\'s-{SHOPPING_CART_FILENAME}'
-        return FileResponse(
-            buffer,
-            as_attachment=True,
-            filename=filename
+        return ndjson_response(
+            request,
+            export_recipes(Recipe.objects.filter(author=user)),
+            f'recipes-{user.username}.ndjson'
         )
 
+    @action(
+        detail=False,
+        methods=('post',),
+        url_path='import',
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ExportThrottle,),
+        url_name='import'
+    )
+    def import_recipes(self, request):
+        """
+        Additional method for the endpoint: api/recipes/import/.
+        Imports NDJSON lines of the request body (as given by
+        api/recipes/export/) as recipes of the user. The body is read
+        line by line and saved in batches, see api/ndjson.py.
+        Returns number of imported recipes or the first invalid line
+        with its errors (previous batches stay imported).
+        Allowed request methods: POST.
+        Permissions: Authenticated user.
+        """
+        stream = request.stream
+        lines = iter(stream.readline, b'') if stream is not None else ()
+        try:
+            imported = import_recipes(lines, author=request.user)
+        except RecipeImportError as error:
+            return Response(
+                {
+                    'line': error.line,
+                    'errors': error.errors,
+                    'imported': error.imported,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'imported': imported}, status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, url_name='batch')
+    def batch(self, request):
+        """
+        Additional method for the endpoint:
+            api/recipes/batch/?ids=<id>,<id>
+        Returns up to RECIPES_BATCH_MAX_SIZE recipes in the requested
+        order and ids of recipes which are not found (missing).
+        The number of queries doesn't depend on the number of recipes,
+        sparse fieldsets (?fields=, ?omit=) are supported.
+        Allowed request methods: GET.
+        Permissions: All users.
+        """
+        params = RecipeBatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe_ids = params.validated_data['ids']
+        recipes = {
+            recipe.pk: recipe
+            for recipe in self.get_queryset().filter(pk__in=recipe_ids)
+        }
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], many=True
+        )
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in recipe_ids if pk not in recipes],
+        })
+
+    @action(
+        detail=False,
+        throttle_classes=(SearchThrottle,),
+        url_name='pantry'
+    )
+    def pantry(self, request):
+        """
+        Additional method for the endpoint:
+            api/recipes/pantry/?ingredients=<id>,<id>
+                &ordering=coverage|missing&max_missing=<number>
+        Returns recipes with the given ingredients ranked by share of
+        the recipe ingredients the user has (coverage) or by number of
+        missing ingredients (missing), paginated.
+        Uses posting lists of recipes/pantry.py, not ingredients table.
+        Allowed request methods: GET.
+        Permissions: All users.
+        """
+        params = PantrySearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        page = self.paginate_queryset(search_pantry(
+            params.validated_data['ingredients'],
+            params.validated_data['ordering'],
+            params.validated_data.get('max_missing')
+        ))
+        recipes = Recipe.objects.in_bulk(
+            [match.recipe_id for match in page]
+        )
+        found = []
+        for match in page:
+            recipe = recipes.get(match.recipe_id)
+            if recipe is not None:
+                recipe.matched = match.matched
+                recipe.missing = match.missing
+                found.append(recipe)
+        serializer = PantryRecipeSerializer(
+            found, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, url_name='trending')
+    def trending(self, request):
+        """
+        Additional method for the endpoint:
+            api/recipes/trending/
+        Returns recipes with recent favorites and shopping carts,
+        the highest trending score first, paginated. The page is read
+        from recipe_trend table which is updated periodically by
+        update_trending command (recipes/trending.py), then recipes
+        of the page are fetched.
+        Allowed request methods: GET.
+        Permissions: All users.
+        """
+        page = self.paginate_queryset(RecipeTrend.objects.order_by(
+            '-score', 'recipe_id'
+        ).values_list('recipe_id', flat=True))
+        recipes = {
+            recipe.pk: recipe for recipe in get_recipes_for_read(
+                request.user,
+                queryset=Recipe.objects.filter(pk__in=page),
+                fields=self.get_requested_fields()
+            )
+        }
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in page if pk in recipes], many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=True,
+        throttle_classes=(SearchThrottle,),
+        url_name='similar'
+    )
+    def similar(self, request, pk):
+        """
+        Additional method for the endpoint:
+            api/recipes/<recipe_id>/similar/?limit=<number>
+        Returns up to limit (SIMILAR_RECIPES_LIMIT by default)
+        recipes with the most similar ingredients,
+        the most similar first. Uses recipes/similarity.py index.
+        Allowed request methods: GET.
+        Permissions: All users.
+        """
+        recipe = get_object_or_404(Recipe.objects.only('pk'), pk=pk)
+        limit = get_similar_limit(request)
+        scores = get_similar_recipes(recipe.pk, limit)
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _ in scores]
+        )
+        serializer = ShortRecipeSerializer(
+            [recipes[recipe_id] for recipe_id, _ in scores
+             if recipe_id in recipes],
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),
         url_name='favorite'
     )
     def favorite(self, request, pk):
@@ -263,13 +581,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         model = Favorite
         return self.favorite_or_shopping_cart(
-            model, pk, request
+            model, pk, request, on_change=enqueue_favorite_changed
         )
 
     @action(
         detail=True,
         methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),
         url_name='shopping_cart'
     )
     def shopping_cart(self, request, pk):
@@ -281,5 +600,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         model = ShoppingCart
         return self.favorite_or_shopping_cart(
-            model, pk, request
+            model, pk, request, on_change=enqueue_render_shopping_cart
         )
+
+
+class MetricsView(APIView):
+    """
+    The view for the endpoint: api/metrics/.
+    Returns per-route request metrics of the current
+    worker process in Prometheus text format.
+    Allowed request methods: GET.
+    Permissions: Admin, superuser.
+    """
+    permission_classes = (IsAdmin,)
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(), content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+
+class BootstrapView(APIView):
+    """
+    The view for the endpoint: api/bootstrap/.
+    Returns data the frontend requests on load in one response:
+    the current user, all tags, number of recipes in the shopping
+    cart and ids of favorited and carted recipes.
+    Allowed request methods: GET.
+    Permissions: Authenticated users.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(get_cached_bootstrap(request))
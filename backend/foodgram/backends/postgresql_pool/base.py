@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+DEFAULT_POOL_OPTIONS = {
+    'SIZE': 10,
+    'MAX_OVERFLOW': 10,
+    'TIMEOUT': 30,
+    'RECYCLE': 3600,
+}
+
+# Connection is lost, a command is still running or the transaction
+# has failed: such connections are not returned to the pool.
+BROKEN_STATUSES = (
+    extensions.TRANSACTION_STATUS_UNKNOWN,
+    extensions.TRANSACTION_STATUS_ACTIVE,
+    extensions.TRANSACTION_STATUS_INERROR,
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(base.Database.OperationalError):
+    """Raised when no connection is released during POOL['TIMEOUT']."""
+
+
+class ConnectionPool:
+    """
+    Per-process pool of psycopg2 connections.
+    Keeps up to SIZE idle connections, allows up to
+    SIZE + MAX_OVERFLOW connections at once and waits
+    TIMEOUT seconds for a free one. Connections older than
+    RECYCLE seconds are reopened. An idle connection is checked
+    with SELECT 1 before it's handed out, connections left
+    in a failed transaction are closed on release.
+    """
+    def __init__(self, size, max_overflow, timeout, recycle):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self._created_at = {}
+
+    def acquire(self, connect):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(
+                f'Нет свободных соединений с БД за {self.timeout} с.'
+            )
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = connect()
+                    self._created_at[id(connection)] = time.monotonic()
+                    return connection
+                if self.is_usable(connection) and self.is_alive(connection):
+                    return connection
+                self.discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        try:
+            if not self.is_usable(connection):
+                self.discard(connection)
+                return
+            status = connection.get_transaction_status()
+            if status in BROKEN_STATUSES:
+                self.discard(connection)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            try:
+                self._idle.put_nowait(connection)
+            except queue.Full:
+                # Overflow connection is closed on release.
+                self.discard(connection)
+        except base.Database.Error:
+            self.discard(connection)
+        finally:
+            self._slots.release()
+
+    def is_usable(self, connection):
+        created_at = self._created_at.get(id(connection), 0)
+        return (
+            not connection.closed
+            and time.monotonic() - created_at < self.recycle
+        )
+
+    def is_alive(self, connection):
+        """
+        Method checks that the server (or pgbouncer) hasn't closed
+        the connection while it was idle, one round trip.
+        """
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if (
+                connection.get_transaction_status()
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def discard(self, connection):
+        self._created_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except base.Database.Error:
+            pass
+
+
+def get_pool(alias, settings_dict):
+    with _pools_lock:
+        if alias not in _pools:
+            options = {
+                **DEFAULT_POOL_OPTIONS, **settings_dict.get('POOL', {})
+            }
+            _pools[alias] = ConnectionPool(
+                size=options['SIZE'],
+                max_overflow=options['MAX_OVERFLOW'],
+                timeout=options['TIMEOUT'],
+                recycle=options['RECYCLE'],
+            )
+        return _pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend which takes connections from ConnectionPool
+    instead of opening a new one and returns them on close.
+    Is used with CONN_MAX_AGE = 0: connection is returned to the pool
+    at the end of every request.
+    Pool options are set in DATABASES[alias]['POOL'].
+    """
+    def get_new_connection(self, conn_params):
+        return get_pool(self.alias, self.settings_dict).acquire(
+            lambda: base.DatabaseWrapper.get_new_connection(
+                self, conn_params
+            )
+        )
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                get_pool(self.alias, self.settings_dict).release(
+                    self.connection
+                )
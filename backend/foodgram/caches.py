@@ -0,0 +1,16 @@
+from django.conf import settings
+
+# Backends which keep entries in the memory of the process: entries and
+# their invalidation are not seen by other gunicorn workers and the
+# task worker.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def is_shared_cache(alias='default'):
+    """
+    Function checks if the cache is shared by all processes
+    (e.g. Redis or Memcached).
+    """
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
@@ -0,0 +1,62 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP = 'gzip'
+BROTLI = 'br'
+
+
+def get_encodings():
+    """
+    Function returns supported encodings in order of preference.
+    Brotli is available only with the brotli package installed.
+    """
+    if brotli is None:
+        return (GZIP,)
+    return (BROTLI, GZIP)
+
+
+def compress(content, encoding, level):
+    """
+    Function compresses bytes with gzip (level 1-9)
+    or brotli (quality 0-11).
+    """
+    if encoding == BROTLI:
+        return brotli.compress(content, quality=level)
+    # mtime=0 makes output the same for the same content.
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+def parse_accept_encoding(header):
+    """
+    Function returns encodings accepted by the client
+    (Accept-Encoding header) with q-value above zero.
+    """
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if encoding and quality > 0:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def negotiate_encoding(header):
+    """
+    Function returns the preferred supported encoding
+    accepted by the client or None.
+    """
+    accepted = parse_accept_encoding(header)
+    for encoding in get_encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+    return None
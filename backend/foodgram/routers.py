@@ -0,0 +1,76 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    """
+    Routing state of the current request.
+    Reads go to replicas only while 'use_replica' is set,
+    the first write switches the rest of the request to the primary.
+    """
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def start_routing(use_replica):
+    return _routing.set(RoutingState(use_replica))
+
+
+def get_routing():
+    return _routing.get()
+
+
+def stop_routing(token):
+    _routing.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Context manager which sends all reads inside it to the primary.
+    """
+    token = start_routing(use_replica=False)
+    try:
+        yield
+    finally:
+        stop_routing(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Router which sends reads of safe requests to a random replica
+    (DATABASE_REPLICAS) and everything else to the primary.
+    Reads outside requests (management commands), inside transactions
+    and after a write of the same request go to the primary.
+    Request state is set by api.middleware.PrimaryReplicaMiddleware.
+    """
+    def db_for_read(self, model, **hints):
+        state = get_routing()
+        if (
+            not settings.DATABASE_REPLICAS
+            or state is None
+            or not state.use_replica
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = get_routing()
+        if state is not None:
+            state.use_replica = False
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
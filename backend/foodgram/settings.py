@@ -38,10 +38,15 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
     'colorfield',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.nplusone.NPlusOneMiddleware',
+    'api.middleware.PrimaryReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +76,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+# Async views for the hot read endpoints, enabled by foodgram/asgi.py.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+
 if DEBUG:
     DATABASES = {
         'default': {
@@ -91,6 +101,84 @@ else:
             'PORT': os.getenv('DB_PORT', default='5432')
         }
     }
+    # Pool of connections inside every worker process.
+    # Keep GUNICORN_WORKERS * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)
+    # below max_connections of PostgreSQL.
+    if os.getenv('DB_POOL', default='False') == 'True':
+        DATABASES['default']['ENGINE'] = (
+            'foodgram.backends.postgresql_pool'
+        )
+        DATABASES['default']['POOL'] = {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=5)),
+            'MAX_OVERFLOW': int(
+                os.getenv('DB_POOL_MAX_OVERFLOW', default=5)
+            ),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+            'RECYCLE': int(os.getenv('DB_POOL_RECYCLE', default=3600)),
+        }
+
+# Read replicas: hosts of PostgreSQL replicas or, with DEBUG,
+# names of SQLite files. Aliases are replica_1, replica_2, ...
+# Safe requests read from replicas, see foodgram/routers.py.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', default='').split(',')), 1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DEBUG:
+        DATABASES[alias]['NAME'] = BASE_DIR / replica.strip()
+    else:
+        DATABASES[alias]['HOST'] = replica.strip()
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.routers.PrimaryReplicaRouter']
+
+# Clients which have written stick to the primary for this many seconds
+# so they don't read stale data from lagging replicas.
+DB_REPLICA_PIN_SECONDS = int(
+    os.getenv('DB_REPLICA_PIN_SECONDS', default=5)
+)
+
+# Connections are reused between requests for CONN_MAX_AGE seconds
+# and checked before reuse. With the pool connections are returned
+# to it at the end of every request instead.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = 0 if 'POOL' in database else int(
+        os.getenv('DB_CONN_MAX_AGE', default=60)
+    )
+    database['CONN_HEALTH_CHECKS'] = os.getenv(
+        'DB_CONN_HEALTH_CHECKS', default='True'
+    ) == 'True'
+
+
+# The default cache keeps cached tokens, the read cache and replica pins,
+# in production it has to be shared by all processes (gunicorn workers
+# and the task worker), e.g. Redis. Local memory is per process.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    },
+    # Token buckets of api/throttling.py: the backend has to have
+    # atomic incr (local memory, Redis, Memcached), in production
+    # it's shared by all workers.
+    'throttle': {
+        'BACKEND': os.getenv(
+            'THROTTLE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv(
+            'THROTTLE_CACHE_LOCATION', default='foodgram-throttle'
+        ),
+    },
+}
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -113,24 +201,60 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS':
         'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
+    # Token buckets per user (per IP for anonymous users), see
+    # api/throttling.py. An empty rate disables the scope.
+    'DEFAULT_THROTTLE_RATES': {
+        scope: os.getenv(f'THROTTLE_{scope.upper()}_RATE', default=rate) or None
+        for scope, rate in (
+            ('search', '120/min'),
+            ('toggles', '60/min'),
+            ('exports', '10/min'),
+        )
+    },
+    # Client IP is taken from X-Forwarded-For set by nginx.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
 STATIC_URL = 'static/'
 
 STATIC_ROOT = BASE_DIR.joinpath('static')
 
+# collectstatic writes .gz and .br siblings for nginx gzip_static
+# and brotli_static.
+STATICFILES_STORAGE = 'foodgram.storage.CompressedStaticFilesStorage'
+
 MEDIA_URL = 'media/'
 
 MEDIA_ROOT = BASE_DIR.joinpath('media')
 
+# Generated files (shopping cart PDF) are saved to PROTECTED_ROOT
+# for EXPORT_FILE_TTL seconds. With EXPORT_DELIVERY = 'x-accel' they are
+# sent by nginx from the internal location PROTECTED_URL,
+# with 'django' (development) they are streamed by Django.
+PROTECTED_ROOT = Path(
+    os.getenv('PROTECTED_ROOT', default=BASE_DIR.joinpath('protected'))
+)
+PROTECTED_URL = '/protected/'
+EXPORT_DELIVERY = os.getenv('EXPORT_DELIVERY', default='django')
+EXPORT_FILE_TTL = int(os.getenv('EXPORT_FILE_TTL', default=3600))
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.CustomUserReadSerializer',
@@ -159,3 +283,112 @@ MAX_LEN_REPR = 30
 EMPTY_VALUE_ADMIN_PANEL = '-empty-'
 
 SHOPPING_CART_FILENAME = 'user-shopping-cart.pdf'
+
+# Responses smaller than API_COMPRESSION_MIN_SIZE bytes are not compressed.
+API_COMPRESSION_MIN_SIZE = int(
+    os.getenv('API_COMPRESSION_MIN_SIZE', default=1024)
+)
+API_GZIP_LEVEL = int(os.getenv('API_GZIP_LEVEL', default=6))
+API_BROTLI_QUALITY = int(os.getenv('API_BROTLI_QUALITY', default=5))
+
+# Tags and ingredients of recipes are aggregated into JSON
+# in the main query on PostgreSQL instead of prefetching.
+RECIPES_JSON_AGGREGATION = os.getenv(
+    'RECIPES_JSON_AGGREGATION', default='True'
+) == 'True'
+
+# Similar recipes index (recipes/similarity.py): MinHash signature of
+# BANDS * ROWS hashes split into LSH bands. Changing BANDS or ROWS
+# requires rebuild_similar_recipes. Up to CANDIDATES recipes sharing
+# a band are ranked by exact Jaccard similarity.
+SIMILAR_RECIPES_BANDS = int(os.getenv('SIMILAR_RECIPES_BANDS', default=64))
+SIMILAR_RECIPES_ROWS = int(os.getenv('SIMILAR_RECIPES_ROWS', default=1))
+SIMILAR_RECIPES_CANDIDATES = int(
+    os.getenv('SIMILAR_RECIPES_CANDIDATES', default=200)
+)
+SIMILAR_RECIPES_LIMIT = 6
+SIMILAR_RECIPES_MAX_LIMIT = 50
+
+# Pantry search (recipes/pantry.py) takes at most PANTRY_MAX_INGREDIENTS.
+PANTRY_MAX_INGREDIENTS = 50
+
+# Batch fetch of recipes (api/recipes/batch/) takes at most
+# RECIPES_BATCH_MAX_SIZE ids.
+RECIPES_BATCH_MAX_SIZE = 100
+
+# Trending recipes (recipes/trending.py): favorites and shopping carts add
+# TRENDING_*_WEIGHT to the score of a recipe, which halves every
+# TRENDING_HALF_LIFE_HOURS. Events of the last TRENDING_EVENTS_LAG seconds
+# are left for the next run, so rows of transactions in progress are not
+# skipped. Recipes with lower score than TRENDING_MIN_SCORE are removed.
+TRENDING_HALF_LIFE_HOURS = float(
+    os.getenv('TRENDING_HALF_LIFE_HOURS', default=48)
+)
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+TRENDING_EVENTS_LAG = 60
+TRENDING_MIN_SCORE = 0.01
+
+# Pool for rendering PDF in async views: 'thread' or 'process'.
+PDF_RENDER_EXECUTOR = os.getenv('PDF_RENDER_EXECUTOR', default='thread')
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', default=2))
+
+# Same query shape repeated more times during a request is reported as N+1.
+NPLUSONE_THRESHOLD = int(os.getenv('NPLUSONE_THRESHOLD', default=5))
+
+TEST_RUNNER = 'api.runner.NPlusOneTestRunner'
+
+# Token -> user resolution is cached in CACHES for AUTH_TOKEN_CACHE_TIMEOUT
+# (only if the default cache is shared by all processes, see
+# foodgram/caches.py) and in a per-process LRU for
+# AUTH_TOKEN_LOCAL_CACHE_TIMEOUT seconds.
+# LRU entries are used only with the current revocation version of the
+# token from the shared cache, set the timeout to 0 to disable the LRU.
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=300)
+)
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_TIMEOUT', default=5)
+)
+AUTH_TOKEN_LOCAL_CACHE_SIZE = int(
+    os.getenv('AUTH_TOKEN_LOCAL_CACHE_SIZE', default=1024)
+)
+
+# Background tasks (tasks/queue.py) are stored in the database and run by
+# run_tasks workers with TASK_QUEUE_CONCURRENCY threads which poll every
+# TASK_QUEUE_POLL_INTERVAL seconds. A failed task is retried up to
+# TASK_QUEUE_MAX_ATTEMPTS times after TASK_QUEUE_RETRY_BACKOFF seconds
+# doubled on every attempt. A running task whose worker has died is taken
+# again after TASK_QUEUE_LEASE seconds. With TASK_QUEUE_EAGER tasks are
+# run in the process after commit (development without a worker).
+TASK_QUEUE_EAGER = os.getenv('TASK_QUEUE_EAGER', default='False') == 'True'
+TASK_QUEUE_CONCURRENCY = int(os.getenv('TASK_QUEUE_CONCURRENCY', default=2))
+TASK_QUEUE_POLL_INTERVAL = float(
+    os.getenv('TASK_QUEUE_POLL_INTERVAL', default=1)
+)
+TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv('TASK_QUEUE_MAX_ATTEMPTS', default=5))
+TASK_QUEUE_RETRY_BACKOFF = int(
+    os.getenv('TASK_QUEUE_RETRY_BACKOFF', default=10)
+)
+TASK_QUEUE_MAX_BACKOFF = 3600
+TASK_QUEUE_LEASE = 600
+
+# Deleted recipes and users are hidden at once (SOFT_DELETE) and their
+# rows are removed by a background task PURGE_BATCH_SIZE rows per query,
+# see api/deletion.py. Without SOFT_DELETE objects are deleted in request.
+SOFT_DELETE = os.getenv('SOFT_DELETE', default='True') == 'True'
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', default=1000))
+
+# Read serializers of list endpoints render items with functions compiled
+# from their fields instead of DRF field machinery (api/serializers.py).
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS', default='True') == 'True'
+
+# Read cache of recipes, tags and ingredients (api/caching.py): entries are
+# fresh READ_CACHE_TIMEOUT seconds, then served stale READ_CACHE_STALE_TIMEOUT
+# seconds more while one request recomputes them. READ_CACHE_BETA scales
+# probabilistic early expiration. READ_CACHE_TIMEOUT=0 disables the cache.
+READ_CACHE_TIMEOUT = int(os.getenv('READ_CACHE_TIMEOUT', default=60))
+READ_CACHE_STALE_TIMEOUT = int(
+    os.getenv('READ_CACHE_STALE_TIMEOUT', default=300)
+)
+READ_CACHE_BETA = float(os.getenv('READ_CACHE_BETA', default=1.0))
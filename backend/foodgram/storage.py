@@ -0,0 +1,48 @@
+import os
+
+from django.contrib.staticfiles.storage import StaticFilesStorage
+
+from .compression import BROTLI, GZIP, compress, get_encodings
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.json', '.svg', '.html', '.txt', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+)
+MIN_SIZE = 256
+LEVELS = {GZIP: 9, BROTLI: 11}
+SUFFIXES = {GZIP: '.gz', BROTLI: '.br'}
+
+
+class CompressedStaticFilesStorage(StaticFilesStorage):
+    """
+    Static files storage which writes precompressed .gz and .br
+    siblings of text files and fonts after collectstatic.
+    Siblings are served by nginx with gzip_static and brotli_static.
+    Files smaller than MIN_SIZE or not getting smaller are skipped.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        for name in paths:
+            if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(name) as file:
+                content = file.read()
+            if len(content) < MIN_SIZE:
+                continue
+            for encoding in get_encodings():
+                compressed_name = self.compress_file(name, content, encoding)
+                if compressed_name:
+                    yield name, compressed_name, True
+
+    def compress_file(self, name, content, encoding):
+        compressed_name = name + SUFFIXES[encoding]
+        compressed = compress(content, encoding, LEVELS[encoding])
+        path = self.path(compressed_name)
+        if len(compressed) >= len(content):
+            if os.path.exists(path):
+                os.remove(path)
+            return None
+        with open(path, 'wb') as file:
+            file.write(compressed)
+        return compressed_name
@@ -0,0 +1,14 @@
+import os
+
+# SERVER_MODE=wsgi: sync workers, foodgram/wsgi.py.
+# SERVER_MODE=asgi: uvicorn workers, foodgram/asgi.py with async read views.
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
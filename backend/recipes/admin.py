@@ -1,10 +1,42 @@
 from django.contrib import admin
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import Aggregate, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
+from api.admin import RecipeSoftDeleteAdminMixin
 from foodgram.settings import EMPTY_VALUE_ADMIN_PANEL
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredientAmount,
                      ShoppingCart, Tag)
 
+NAMES_DELIMITER = ', '
+
+
+class NamesAgg(StringAgg):
+    """
+    STRING_AGG of names, GROUP_CONCAT on SQLite (development).
+    """
+    def __init__(self, expression):
+        super().__init__(expression, NAMES_DELIMITER)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return Aggregate.as_sql(
+            self, compiler, connection,
+            function='GROUP_CONCAT', ordering='', **extra_context
+        )
+
+
+def recipe_subquery(queryset, aggregate):
+    """
+    Function returns subquery with the aggregate
+    over rows of the queryset related to the recipe.
+    """
+    return Subquery(
+        queryset.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(value=aggregate).values('value')
+    )
+
 
 class RecipeIngredientAdmin(admin.StackedInline):
     model = RecipeIngredientAmount
@@ -16,15 +48,20 @@ class RecipeIngredientAmountAdmin(admin.ModelAdmin):
     list_display = ('ingredient', 'recipe', 'amount')
     list_display_links = ('ingredient', 'recipe')
     list_editable = ('amount',)
-    search_fields = ('ingredients', 'recipe')
+    list_select_related = ('ingredient', 'recipe')
+    search_fields = ('ingredient__name', 'recipe__name')
+    autocomplete_fields = ('ingredient', 'recipe')
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'recipe')
-    list_filter = ('id', 'user')
-    search_fields = ('user',)
+    list_display = ('id', 'user', 'recipe', 'created_at')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
 
@@ -32,50 +69,74 @@ class FavoriteAdmin(admin.ModelAdmin):
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'measurement_unit')
     search_fields = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(RecipeSoftDeleteAdminMixin, admin.ModelAdmin):
+    """
+    Admin panel for Recipe model.
+    Names of ingredients and tags and the number of favorites
+    are annotated, so the list page takes a fixed number of queries.
+    Deleted recipes are purged in background, see api/admin.py.
+    """
     list_display = (
         'id', 'name', 'author', 'get_ingredients',
         'get_tags', 'get_count_recipe_in_favorites',
 
     )
-    list_filter = ('name', 'author', 'tags')
+    list_filter = ('tags',)
     list_display_links = ('name',)
+    list_select_related = ('author',)
     search_fields = (
         'name', 'cooking_time', 'author__username',
         'ingredients__name'
     )
+    autocomplete_fields = ('author', 'tags')
     inlines = (RecipeIngredientAdmin,)
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            ingredients_names=recipe_subquery(
+                RecipeIngredientAmount.objects.all(),
+                NamesAgg('ingredient__name')
+            ),
+            tags_names=recipe_subquery(
+                Recipe.tags.through.objects.all(), NamesAgg('tag__name')
+            ),
+            favorites_count=Coalesce(
+                recipe_subquery(Favorite.objects.all(), Count('pk')), 0,
+                output_field=IntegerField()
+            )
+        )
+
     @admin.display(description='Игредиенты')
     def get_ingredients(self, obj):
-        ingredients = [
-            ingredient.name for ingredient in obj.ingredients.all()
-        ]
-        return ', '.join(ingredients)
+        return obj.ingredients_names
 
-    @admin.display(description='Количество данного рецепта в избранном')
+    @admin.display(
+        description='Количество данного рецепта в избранном',
+        ordering='favorites_count'
+    )
     def get_count_recipe_in_favorites(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
     @admin.display(description='Тэги')
     def get_tags(self, obj):
-        tags = [
-            tag.name for tag in obj.tags.all()
-        ]
-        return ', '.join(tags)
+        return obj.tags_names
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_display = ('id', 'user', 'recipe', 'created_at')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
 
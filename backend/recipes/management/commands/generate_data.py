@@ -0,0 +1,283 @@
+import random
+from array import array
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from recipes.models import (Favorite, Ingredient, Recipe,
+                            RecipeIngredientAmount, ShoppingCart, Tag)
+from recipes.pantry import rebuild_pantry_index
+from recipes.similarity import rebuild_index
+from users.models import CustomUser, Subscription
+
+DEFAULT_PASSWORD = 'foodgram-bench'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+    ('Выпечка', '#56CCF2', 'bakery'),
+)
+FIRST_NAMES = (
+    'Анна', 'Мария', 'Ольга', 'Елена', 'Ирина', 'Иван',
+    'Пётр', 'Сергей', 'Алексей', 'Дмитрий', 'Никита', 'Павел',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов',
+    'Лебедев', 'Козлов', 'Новиков', 'Морозов', 'Волков',
+)
+DISH_ADJECTIVES = (
+    'Домашний', 'Быстрый', 'Летний', 'Острый', 'Нежный',
+    'Сытный', 'Праздничный', 'Бабушкин', 'Лёгкий', 'Пряный',
+)
+DISH_NOUNS = (
+    'суп', 'салат', 'пирог', 'плов', 'омлет', 'рагу',
+    'гуляш', 'борщ', 'кекс', 'паштет', 'соус', 'запеканка',
+)
+TEXT_SENTENCES = (
+    'Нарезать все ингредиенты небольшими кубиками.',
+    'Разогреть сковороду и добавить немного масла.',
+    'Тушить на медленном огне до готовности.',
+    'Посолить и поперчить по вкусу.',
+    'Выложить в форму и отправить в духовку.',
+    'Подавать горячим, посыпав зеленью.',
+    'Перемешать и дать настояться десять минут.',
+    'Взбить венчиком до однородной массы.',
+)
+IMAGE_PATH = 'recipes/images/generated.jpg'
+
+
+def chunked(iterable, size):
+    """
+    Function splits iterable into lists of the given size.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def spread(total, buckets, rng):
+    """
+    Function spreads total amount of objects over buckets.
+    Amounts are skewed so that a few buckets get much more
+    than others (popular users, prolific authors).
+    """
+    if not buckets:
+        return []
+    weights = [rng.paretovariate(1.5) for _ in range(buckets)]
+    weights_sum = sum(weights)
+    return [int(total * weight / weights_sum) for weight in weights]
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Generates a seeded synthetic dataset: users, recipes with
+    ingredients and tags, favorites, shopping carts and subscriptions.
+    All objects are inserted with bulk_create in batches.
+    Ingredients have to be loaded beforehand with csv_upload.
+    """
+    help = 'Generates synthetic users, recipes, favorites and carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=100000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--skip-indexes', action='store_true',
+            help='Do not rebuild similar recipes and pantry indexes.'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError(
+                'Ингредиенты не загружены, выполните csv_upload.'
+            )
+        tag_ids = self.create_tags()
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(options['recipes'], user_ids)
+        self.create_recipe_relations(
+            recipe_ids, ingredient_ids, tag_ids,
+            options['min_ingredients'], options['max_ingredients']
+        )
+        self.create_user_recipe_links(
+            Favorite, options['favorites'], user_ids, recipe_ids
+        )
+        self.create_user_recipe_links(
+            ShoppingCart, options['carts'], user_ids, recipe_ids
+        )
+        self.create_subscriptions(options['subscriptions'], user_ids)
+        if not options['skip_indexes']:
+            self.rebuild_indexes()
+
+    def log(self, message):
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def bulk_insert(self, model, objects):
+        """
+        Method inserts objects in batches, one transaction per batch.
+        Returns number of inserted objects.
+        """
+        created = 0
+        for batch in chunked(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            created += len(batch)
+        return created
+
+    def new_ids(self, model, last_pk):
+        return array('q', model.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True).iterator(
+            chunk_size=self.batch_size)
+        )
+
+    def create_tags(self):
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in DEFAULT_TAGS
+            )
+        return list(Tag.objects.values_list('pk', flat=True))
+
+    def create_users(self, amount):
+        last_pk = CustomUser.objects.aggregate(Max('pk'))['pk__max'] or 0
+        password = make_password(DEFAULT_PASSWORD)
+        users = (
+            CustomUser(
+                username=f'user{last_pk + number}',
+                email=f'user{last_pk + number}@foodgram.test',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for number in range(1, amount + 1)
+        )
+        created = self.bulk_insert(CustomUser, users)
+        self.log(f'Пользователей создано: {created}')
+        return self.new_ids(CustomUser, last_pk)
+
+    def create_recipes(self, amount, user_ids):
+        if not user_ids:
+            return array('q')
+        last_pk = Recipe.objects.aggregate(Max('pk'))['pk__max'] or 0
+        per_author = spread(amount, len(user_ids), self.rng)
+        authors = (
+            author_id
+            for author_id, count in zip(user_ids, per_author)
+            for _ in range(count)
+        )
+        recipes = (
+            Recipe(
+                author_id=author_id,
+                name=(f'{self.rng.choice(DISH_ADJECTIVES)} '
+                      f'{self.rng.choice(DISH_NOUNS)}'),
+                image=IMAGE_PATH,
+                text=' '.join(self.rng.sample(
+                    TEXT_SENTENCES, self.rng.randint(2, len(TEXT_SENTENCES))
+                )),
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for author_id in authors
+        )
+        created = self.bulk_insert(Recipe, recipes)
+        self.log(f'Рецептов создано: {created}')
+        return self.new_ids(Recipe, last_pk)
+
+    def create_recipe_relations(self, recipe_ids, ingredient_ids, tag_ids,
+                                min_ingredients, max_ingredients):
+        max_ingredients = min(max_ingredients, len(ingredient_ids))
+        min_ingredients = min(min_ingredients, max_ingredients)
+        amounts = (
+            RecipeIngredientAmount(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(
+                ingredient_ids,
+                self.rng.randint(min_ingredients, max_ingredients)
+            )
+        )
+        created = self.bulk_insert(RecipeIngredientAmount, amounts)
+        self.log(f'Ингредиентов в рецептах создано: {created}')
+
+        recipe_tag = Recipe.tags.through
+        tags = (
+            recipe_tag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+            )
+        )
+        created = self.bulk_insert(recipe_tag, tags)
+        self.log(f'Тэгов у рецептов создано: {created}')
+
+    def create_user_recipe_links(self, model, amount, user_ids, recipe_ids):
+        """
+        Method creates Favorite or ShoppingCart objects.
+        Every user gets unique recipes, popular recipes are
+        picked more often than others.
+        """
+        if not recipe_ids:
+            return
+        per_user = spread(amount, len(user_ids), self.rng)
+        recipes_count = len(recipe_ids)
+        links = (
+            model(user_id=user_id, recipe_id=recipe_ids[index])
+            for user_id, count in zip(user_ids, per_user)
+            for index in self.rng.sample(
+                range(recipes_count), min(count, recipes_count)
+            )
+        )
+        created = self.bulk_insert(model, links)
+        self.log(f'{model._meta.verbose_name} создано: {created}')
+
+    def rebuild_indexes(self):
+        """
+        Method rebuilds indexes of similar recipes and pantry search:
+        recipes inserted in bulk are not indexed on save.
+        """
+        indexed = saved = 0
+        for indexed in rebuild_index(self.batch_size):
+            pass
+        self.log(f'Рецептов в индексе похожих: {indexed}')
+        for saved in rebuild_pantry_index():
+            pass
+        self.log(f'Ингредиентов в индексе поиска по продуктам: {saved}')
+
+    def create_subscriptions(self, amount, user_ids):
+        users_count = len(user_ids)
+        if users_count < 2:
+            return
+        per_user = spread(amount, users_count, self.rng)
+        subscriptions = (
+            Subscription(user_id=user_id, author_id=user_ids[index])
+            for position, (user_id, count) in enumerate(
+                zip(user_ids, per_user)
+            )
+            for index in self.rng.sample(
+                range(users_count), min(count + 1, users_count)
+            )[:count]
+            if index != position
+        )
+        created = self.bulk_insert(Subscription, subscriptions)
+        self.log(f'Подписок создано: {created}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from recipes.pantry import rebuild_pantry_index
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Rebuilds posting lists of the pantry search (recipes/pantry.py).
+    Has to be run after recipes were loaded bypassing the API.
+    Recipes saved and deleted through the API are indexed by
+    background tasks (recipes/tasks.py).
+    """
+    help = 'Rebuilds posting lists of the pantry search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        saved = 0
+        for saved in rebuild_pantry_index(options['batch_size']):
+            self.stdout.write(f'Сохранено ингредиентов: {saved}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс поиска по продуктам построен: {saved}'
+        ))
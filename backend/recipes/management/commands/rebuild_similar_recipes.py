@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Rebuilds the similar recipes index (recipes/similarity.py).
+    Has to be run after recipes were loaded bypassing the API
+    and after SIMILAR_RECIPES_BANDS or SIMILAR_RECIPES_ROWS change.
+    Recipes saved through the API are indexed by background tasks
+    (recipes/tasks.py).
+    """
+    help = 'Rebuilds the similar recipes index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = 0
+        for indexed in rebuild_index(options['batch_size']):
+            self.stdout.write(f'Проиндексировано рецептов: {indexed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс похожих рецептов построен: {indexed}'
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import update_trending
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Adds favorites and shopping carts added since the previous run
+    to trending scores of recipes (recipes/trending.py).
+    Should be run periodically, e.g. by cron every few minutes.
+    --rebuild recounts scores from all events, e.g. after
+    TRENDING_HALF_LIFE_HOURS was changed.
+    """
+    help = 'Updates trending scores of recipes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rebuild', action='store_true')
+
+    def handle(self, *args, **options):
+        events, recipes, removed = update_trending(
+            options['batch_size'], options['rebuild']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено событий: {events}, рецептов: {recipes}, '
+            f'удалено из рейтинга: {removed}'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.13 on 2026-10-19 03:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipesignature_recipesignatureband'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPosting',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='posting', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('recipes', models.BinaryField(verbose_name='Идентификаторы рецептов')),
+                ('ingredient_counts', models.BinaryField(verbose_name='Количество ингредиентов в рецептах')),
+            ],
+            options={
+                'verbose_name': 'Рецепты ингредиента',
+                'verbose_name_plural': 'Рецепты ингредиентов',
+                'db_table': 'ingredient_posting',
+            },
+        ),
+    ]
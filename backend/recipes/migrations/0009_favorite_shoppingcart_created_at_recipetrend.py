@@ -0,0 +1,59 @@
+# Generated by Django 4.1.13 on 2026-10-19 05:04
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Favorites and shopping carts added before the migration get the Unix
+# epoch: the first update_trending run mustn't count them as new events.
+ADDED_BEFORE_MIGRATION = datetime.datetime(
+    1970, 1, 1, tzinfo=datetime.timezone.utc
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeTrend',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('score', models.FloatField(db_index=True, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+                'db_table': 'recipe_trend',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('epoch', models.DateTimeField(verbose_name='Начало отсчета рейтингов')),
+                ('processed_until', models.DateTimeField(null=True, verbose_name='События учтены до')),
+            ],
+            options={
+                'verbose_name': 'Состояние рейтингов',
+                'verbose_name_plural': 'Состояние рейтингов',
+                'db_table': 'trending_state',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE_MIGRATION, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE_MIGRATION, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+    ]
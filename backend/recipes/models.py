@@ -115,8 +115,18 @@ class RecipeIngredientAmount(models.Model):
         return str(self.amount)
 
 
+class RecipeManager(models.Manager):
+    """Manager hides deleted recipes, see api/deletion.py."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
-    """Recipe model."""
+    """
+    Recipe model.
+    Deleted recipes are hidden by the default manager until they are
+    purged in background, all_objects returns them too.
+    """
     author = models.ForeignKey(
         CustomUser,
         related_name='recipe',
@@ -153,6 +163,15 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
     class Meta:
         db_table = 'recipe'
@@ -189,6 +208,11 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Понравившийся рецепт'
     )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         db_table = 'favorite'
@@ -216,6 +240,11 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Рецепты для покупок'
     )
+    created_at = models.DateTimeField(
+        'Дата добавления',
+        auto_now_add=True,
+        db_index=True
+    )
 
     class Meta:
         db_table = 'shopping_cart'
@@ -223,3 +252,131 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил(-а) в покупки рецепт: {self.recipe}'
+
+
+class RecipeSignature(models.Model):
+    """
+    Similar recipes index: ingredients of a recipe.
+    Is built by recipes/similarity.py.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        related_name='signature',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    ingredients = models.BinaryField(
+        'Идентификаторы ингредиентов'
+    )
+
+    class Meta:
+        db_table = 'recipe_signature'
+        verbose_name = 'Сигнатура рецепта'
+        verbose_name_plural = 'Сигнатуры рецептов'
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class RecipeSignatureBand(models.Model):
+    """
+    Similar recipes index: LSH bucket of a recipe.
+    Recipes with the same bucket are candidates to be similar.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='signature_bands',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    bucket = models.BigIntegerField(
+        'Корзина LSH',
+        db_index=True
+    )
+
+    class Meta:
+        db_table = 'recipe_signature_band'
+        verbose_name = 'Корзина LSH рецепта'
+        verbose_name_plural = 'Корзины LSH рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.bucket}'
+
+
+class IngredientPosting(models.Model):
+    """
+    Pantry search index: recipes with the ingredient.
+    Sorted recipe ids and numbers of ingredients of these recipes
+    are packed into arrays, see recipes/pantry.py.
+    """
+    ingredient = models.OneToOneField(
+        Ingredient,
+        primary_key=True,
+        related_name='posting',
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    recipes = models.BinaryField(
+        'Идентификаторы рецептов'
+    )
+    ingredient_counts = models.BinaryField(
+        'Количество ингредиентов в рецептах'
+    )
+
+    class Meta:
+        db_table = 'ingredient_posting'
+        verbose_name = 'Рецепты ингредиента'
+        verbose_name_plural = 'Рецепты ингредиентов'
+
+    def __str__(self):
+        return str(self.ingredient_id)
+
+
+class RecipeTrend(models.Model):
+    """
+    Trending recipes: score of recent favorites and shopping carts
+    of a recipe, decayed exponentially with time.
+    Is updated by recipes/trending.py.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        related_name='trend',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        'Рейтинг',
+        db_index=True
+    )
+
+    class Meta:
+        db_table = 'recipe_trend'
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.score}'
+
+
+class TrendingState(models.Model):
+    """
+    State of trending scores (single row): scores are relative
+    to epoch, events added up to processed_until are counted.
+    """
+    epoch = models.DateTimeField(
+        'Начало отсчета рейтингов'
+    )
+    processed_until = models.DateTimeField(
+        'События учтены до',
+        null=True
+    )
+
+    class Meta:
+        db_table = 'trending_state'
+        verbose_name = 'Состояние рейтингов'
+        verbose_name_plural = 'Состояние рейтингов'
+
+    def __str__(self):
+        return f'{self.epoch}: {self.processed_until}'
@@ -0,0 +1,261 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import IngredientPosting, RecipeIngredientAmount
+
+# Recipe ids and numbers of ingredients of recipes in posting lists.
+RECIPE_ID_TYPE = 'q'
+INGREDIENT_COUNT_TYPE = 'H'
+ORDERINGS = ('coverage', 'missing')
+
+PantryMatch = namedtuple('PantryMatch', ('recipe_id', 'matched', 'missing'))
+
+
+def unpack_posting(posting):
+    """
+    Function returns sorted recipe ids of the posting list
+    and numbers of ingredients of these recipes.
+    """
+    recipe_ids = array(RECIPE_ID_TYPE)
+    recipe_ids.frombytes(bytes(posting.recipes))
+    counts = array(INGREDIENT_COUNT_TYPE)
+    counts.frombytes(bytes(posting.ingredient_counts))
+    return recipe_ids, counts
+
+
+def pack_posting(posting, recipe_ids, counts):
+    posting.recipes = recipe_ids.tobytes()
+    posting.ingredient_counts = counts.tobytes()
+
+
+def place_recipe(recipe_ids, counts, recipe_id, count):
+    """
+    Function inserts the recipe into posting list arrays keeping them
+    sorted or updates its number of ingredients; count 0 removes it.
+    Returns False if nothing has changed.
+    """
+    position = bisect_left(recipe_ids, recipe_id)
+    found = position < len(recipe_ids) and recipe_ids[position] == recipe_id
+    if not count:
+        if not found:
+            return False
+        del recipe_ids[position]
+        del counts[position]
+    elif found:
+        counts[position] = count
+    else:
+        recipe_ids.insert(position, recipe_id)
+        counts.insert(position, count)
+    return True
+
+
+def create_postings(ingredient_ids):
+    """
+    Function creates missing posting lists of the ingredients,
+    concurrent writers don't conflict.
+    """
+    IngredientPosting.objects.bulk_create(
+        [
+            IngredientPosting(
+                ingredient_id=ingredient_id,
+                recipes=b'',
+                ingredient_counts=b''
+            )
+            for ingredient_id in ingredient_ids
+        ],
+        ignore_conflicts=True
+    )
+
+
+def update_pantry_index(recipe_id, previous_ingredient_ids=()):
+    """
+    Function updates posting lists after ingredients of the recipe
+    have changed: the recipe is removed from lists of ingredients it
+    doesn't have anymore (all of them if it has been deleted or marked
+    deleted) and is added to (or has its number of ingredients
+    updated in) the rest.
+    Posting lists are locked, so concurrent writes don't lose updates.
+    """
+    current = set(RecipeIngredientAmount.objects.filter(
+        recipe_id=recipe_id, recipe__deleted_at__isnull=True
+    ).values_list('ingredient_id', flat=True))
+    affected = sorted(current | set(previous_ingredient_ids))
+    if not affected:
+        return
+    with transaction.atomic():
+        create_postings(current)
+        postings = IngredientPosting.objects.select_for_update().filter(
+            ingredient_id__in=affected
+        ).order_by('pk')
+        for posting in postings:
+            recipe_ids, counts = unpack_posting(posting)
+            count = len(current) if posting.ingredient_id in current else 0
+            if place_recipe(recipe_ids, counts, recipe_id, count):
+                pack_posting(posting, recipe_ids, counts)
+                posting.save(update_fields=('recipes', 'ingredient_counts'))
+
+
+def add_to_pantry_index(recipe_ingredients):
+    """
+    Function adds new recipes ({recipe id: set of ingredient ids})
+    to posting lists, every affected list is updated once.
+    Is used by bulk imports.
+    """
+    recipes_by_ingredient = {}
+    for recipe_id, ingredient_ids in recipe_ingredients.items():
+        for ingredient_id in ingredient_ids:
+            recipes_by_ingredient.setdefault(ingredient_id, []).append(
+                recipe_id
+            )
+    if not recipes_by_ingredient:
+        return
+    with transaction.atomic():
+        create_postings(recipes_by_ingredient)
+        postings = list(IngredientPosting.objects.select_for_update().filter(
+            ingredient_id__in=recipes_by_ingredient
+        ).order_by('pk'))
+        for posting in postings:
+            recipe_ids, counts = unpack_posting(posting)
+            for recipe_id in recipes_by_ingredient[posting.ingredient_id]:
+                place_recipe(
+                    recipe_ids, counts, recipe_id,
+                    len(recipe_ingredients[recipe_id])
+                )
+            pack_posting(posting, recipe_ids, counts)
+        IngredientPosting.objects.bulk_update(
+            postings, ('recipes', 'ingredient_counts'), batch_size=100
+        )
+
+
+def get_ingredient_counts(chunk_size):
+    """
+    Function returns array of numbers of ingredients indexed
+    by recipe id (2 bytes per recipe instead of a dict).
+    """
+    last_recipe_id = RecipeIngredientAmount.objects.aggregate(
+        Max('recipe_id')
+    )['recipe_id__max'] or 0
+    counts = array(INGREDIENT_COUNT_TYPE, bytes(
+        array(INGREDIENT_COUNT_TYPE).itemsize * (last_recipe_id + 1)
+    ))
+    recipe_ids = RecipeIngredientAmount.objects.values_list(
+        'recipe_id', flat=True
+    ).iterator(chunk_size=chunk_size)
+    for recipe_id in recipe_ids:
+        counts[recipe_id] += 1
+    return counts
+
+
+def rebuild_pantry_index(batch_size=1000):
+    """
+    Function rebuilds all posting lists from ingredients of recipes,
+    batch_size lists at a time. Rows are read in two passes with
+    server-side cursors, so memory doesn't grow with the number of
+    recipes except for 2 bytes per recipe.
+    Old lists are replaced in one transaction: searches use them until
+    the new ones are saved, concurrent index updates wait for it,
+    a failed rebuild leaves them as they were.
+    Yields number of saved posting lists after every batch.
+    """
+    chunk_size = batch_size * 100
+    ingredient_counts = get_ingredient_counts(chunk_size)
+    with transaction.atomic():
+        IngredientPosting.objects.all().delete()
+        rows = RecipeIngredientAmount.objects.order_by(
+            'ingredient_id', 'recipe_id'
+        ).values_list('ingredient_id', 'recipe_id').iterator(
+            chunk_size=chunk_size
+        )
+        postings = []
+        saved = 0
+        for ingredient_id, group in groupby(rows, key=lambda row: row[0]):
+            recipe_ids = array(RECIPE_ID_TYPE, (row[1] for row in group))
+            posting = IngredientPosting(ingredient_id=ingredient_id)
+            pack_posting(posting, recipe_ids, array(
+                INGREDIENT_COUNT_TYPE,
+                (ingredient_counts[recipe_id] for recipe_id in recipe_ids)
+            ))
+            postings.append(posting)
+            if len(postings) >= batch_size:
+                IngredientPosting.objects.bulk_create(postings)
+                saved += len(postings)
+                postings = []
+                yield saved
+        IngredientPosting.objects.bulk_create(postings)
+    yield saved + len(postings)
+
+
+class PantryResults:
+    """
+    Recipes ranked for a set of ingredients. Is a sequence of
+    PantryMatch, so it can be paginated like a queryset: only
+    the first offset + limit matches of a page are ordered.
+    Ordering:
+        - coverage: the largest share of the recipe ingredients
+          the user has, then the fewest missing ingredients;
+        - missing: the fewest missing ingredients, then the most
+          matched ones.
+    Newer recipes go first among equal ones.
+    """
+    def __init__(self, matched, ingredient_counts, ordering):
+        self.matched = matched
+        self.ingredient_counts = ingredient_counts
+        self.key = getattr(self, f'by_{ordering}')
+
+    def by_coverage(self, recipe_id):
+        matched = self.matched[recipe_id]
+        total = self.ingredient_counts[recipe_id]
+        return -matched / total, total - matched, -recipe_id
+
+    def by_missing(self, recipe_id):
+        matched = self.matched[recipe_id]
+        return (
+            self.ingredient_counts[recipe_id] - matched, -matched, -recipe_id
+        )
+
+    def __len__(self):
+        return len(self.matched)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('PantryResults supports only slices.')
+        start, stop, _ = index.indices(len(self))
+        recipe_ids = heapq.nsmallest(stop, self.matched, key=self.key)
+        return [
+            PantryMatch(
+                recipe_id,
+                self.matched[recipe_id],
+                self.ingredient_counts[recipe_id] - self.matched[recipe_id]
+            )
+            for recipe_id in recipe_ids[start:stop]
+        ]
+
+
+def search_pantry(ingredient_ids, ordering='coverage', max_missing=None):
+    """
+    Function returns PantryResults: recipes with at least one of the
+    ingredients. Posting lists of the ingredients are fetched in one
+    query and merged: a recipe matches as many ingredients as there
+    are lists it's in. Recipes with more than max_missing missing
+    ingredients are dropped.
+    """
+    matched = Counter()
+    ingredient_counts = {}
+    for posting in IngredientPosting.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ):
+        recipe_ids, counts = unpack_posting(posting)
+        matched.update(recipe_ids)
+        ingredient_counts.update(zip(recipe_ids, counts))
+    if max_missing is not None:
+        matched = Counter({
+            recipe_id: count for recipe_id, count in matched.items()
+            if ingredient_counts[recipe_id] - count <= max_missing
+        })
+    return PantryResults(matched, ingredient_counts, ordering)
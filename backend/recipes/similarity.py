@@ -0,0 +1,180 @@
+import hashlib
+import random
+import struct
+from array import array
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import (Recipe, RecipeIngredientAmount, RecipeSignature,
+                     RecipeSignatureBand)
+
+# Parameters of the hash functions h(x) = (a * x + b) mod MERSENNE_PRIME.
+# The seed is fixed: signatures have to be the same in every process.
+MERSENNE_PRIME = (1 << 61) - 1
+HASH_SEED = 20221201
+
+
+def get_hash_functions(count):
+    rng = random.Random(HASH_SEED)
+    return [
+        (rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME))
+        for _ in range(count)
+    ]
+
+
+HASH_FUNCTIONS = get_hash_functions(
+    settings.SIMILAR_RECIPES_BANDS * settings.SIMILAR_RECIPES_ROWS
+)
+
+
+def pack_ingredients(ingredient_ids):
+    """
+    Function returns sorted unique ingredient ids as bytes
+    (RecipeSignature.ingredients).
+    """
+    return array('q', sorted(set(ingredient_ids))).tobytes()
+
+
+def unpack_ingredients(data):
+    ingredient_ids = array('q')
+    ingredient_ids.frombytes(bytes(data))
+    return ingredient_ids
+
+
+def jaccard(first, second):
+    """
+    Function returns Jaccard similarity of two sets.
+    """
+    if not first and not second:
+        return 0.0
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
+
+
+def get_minhash(ingredient_ids):
+    """
+    Function returns MinHash signature of the ingredient ids:
+    minimum of every hash function over the set.
+    """
+    return [
+        min((a * value + b) % MERSENNE_PRIME for value in ingredient_ids)
+        for a, b in HASH_FUNCTIONS
+    ]
+
+
+def get_buckets(ingredient_ids):
+    """
+    Function returns LSH buckets of the ingredient ids: signature is
+    split into SIMILAR_RECIPES_BANDS bands of SIMILAR_RECIPES_ROWS rows,
+    every band is hashed into a 64-bit bucket together with its number.
+    Recipes with Jaccard similarity s share a bucket with probability
+    1 - (1 - s ** rows) ** bands.
+    """
+    if not ingredient_ids:
+        return []
+    rows = settings.SIMILAR_RECIPES_ROWS
+    signature = get_minhash(ingredient_ids)
+    buckets = []
+    for band in range(settings.SIMILAR_RECIPES_BANDS):
+        values = signature[band * rows:(band + 1) * rows]
+        digest = hashlib.blake2b(
+            struct.pack(f'<{rows + 1}q', band, *values), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, 'little', signed=True))
+    return buckets
+
+
+def get_recipe_ingredients(recipe_ids):
+    """
+    Function returns {recipe id: set of ingredient ids}.
+    """
+    ingredients = {recipe_id: set() for recipe_id in recipe_ids}
+    queryset = RecipeIngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id')
+    for recipe_id, ingredient_id in queryset:
+        ingredients[recipe_id].add(ingredient_id)
+    return ingredients
+
+
+def index_recipes(recipe_ids):
+    """
+    Function (re)builds signatures and LSH buckets of the recipes.
+    """
+    ingredients = get_recipe_ingredients(recipe_ids)
+    signatures = []
+    bands = []
+    for recipe_id, ingredient_ids in ingredients.items():
+        signatures.append(RecipeSignature(
+            recipe_id=recipe_id,
+            ingredients=pack_ingredients(ingredient_ids)
+        ))
+        bands.extend(
+            RecipeSignatureBand(recipe_id=recipe_id, bucket=bucket)
+            for bucket in get_buckets(ingredient_ids)
+        )
+    with transaction.atomic():
+        RecipeSignatureBand.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.bulk_create(signatures)
+        RecipeSignatureBand.objects.bulk_create(bands)
+    return len(signatures)
+
+
+def remove_recipes(recipe_ids):
+    """
+    Function removes signatures and LSH buckets of deleted recipes.
+    """
+    with transaction.atomic():
+        RecipeSignatureBand.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSignature.objects.filter(recipe_id__in=recipe_ids).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Function rebuilds the whole index in batches of recipes.
+    Yields number of indexed recipes after every batch.
+    """
+    RecipeSignatureBand.objects.all().delete()
+    RecipeSignature.objects.all().delete()
+    recipe_ids = list(
+        Recipe.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    indexed = 0
+    for start in range(0, len(recipe_ids), batch_size):
+        indexed += index_recipes(recipe_ids[start:start + batch_size])
+        yield indexed
+
+
+def get_similar_recipes(recipe_id, limit):
+    """
+    Function returns [(recipe id, similarity)] of up to limit recipes
+    most similar to the recipe by ingredients, the most similar first.
+    Candidates are recipes sharing an LSH bucket with the recipe
+    (at most SIMILAR_RECIPES_CANDIDATES with the most shared buckets),
+    they are ranked by exact Jaccard similarity of ingredients.
+    One query, the number of recipes doesn't matter.
+    """
+    candidates = RecipeSignatureBand.objects.filter(
+        bucket__in=RecipeSignatureBand.objects.filter(
+            recipe_id=recipe_id
+        ).values('bucket')
+    ).exclude(recipe_id=recipe_id).values('recipe_id').annotate(
+        shared=Count('pk')
+    ).order_by('-shared', 'recipe_id').values('recipe_id')[
+        :settings.SIMILAR_RECIPES_CANDIDATES
+    ]
+    signatures = dict(RecipeSignature.objects.filter(
+        Q(recipe_id=recipe_id) | Q(recipe_id__in=candidates)
+    ).values_list('recipe_id', 'ingredients'))
+    if recipe_id not in signatures:
+        return []
+    target = set(unpack_ingredients(signatures.pop(recipe_id)))
+    scores = [
+        (candidate_id, jaccard(target, set(unpack_ingredients(data))))
+        for candidate_id, data in signatures.items()
+    ]
+    scores.sort(key=lambda score: (-score[1], score[0]))
+    return [score for score in scores[:limit] if score[1] > 0]
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+
+from tasks.queue import enqueue, task
+from .models import Recipe, RecipeSignature
+from .pantry import update_pantry_index
+from .similarity import index_recipes, unpack_ingredients
+from .trending import update_trending
+
+
+def get_indexed_ingredient_ids(recipe_id):
+    """
+    Function returns ingredients of the recipe as they were
+    when the recipe was indexed last time (its signature).
+    """
+    signature = RecipeSignature.objects.filter(recipe_id=recipe_id).first()
+    if signature is None:
+        return []
+    return list(unpack_ingredients(signature.ingredients))
+
+
+@task()
+def index_recipe(recipe_id):
+    """
+    Task updates posting lists of the pantry search and the similar
+    recipes index after the recipe has been saved. The recipe is
+    removed from lists of ingredients it had when it was indexed last
+    time, so one task can do the work of several merged saves.
+    The recipe row is locked: tasks of the same recipe don't interleave.
+    """
+    with transaction.atomic():
+        if not Recipe.objects.select_for_update().filter(
+            pk=recipe_id
+        ).values_list('pk', flat=True):
+            return
+        update_pantry_index(recipe_id, get_indexed_ingredient_ids(recipe_id))
+        index_recipes([recipe_id])
+
+
+def enqueue_index_recipe(recipe_id):
+    """
+    Function schedules indexing of the saved recipe after commit.
+    """
+    enqueue(
+        index_recipe, dedup_key=f'index-recipe:{recipe_id}',
+        recipe_id=recipe_id
+    )
+
+
+@task()
+def remove_recipe_from_pantry(recipe_id, ingredient_ids):
+    """
+    Task removes the deleted recipe from posting lists
+    of the pantry search.
+    """
+    update_pantry_index(recipe_id, ingredient_ids)
+
+
+@task()
+def update_trending_scores():
+    """
+    Task adds new favorites and shopping carts to trending scores
+    as update_trending command does.
+    """
+    update_trending()
+
+
+def enqueue_update_trending():
+    """
+    Function schedules update of trending scores after commit.
+    Events newer than TRENDING_EVENTS_LAG are skipped by update_trending,
+    so the task waits for them, events added within the delay
+    are counted by one run.
+    """
+    enqueue(
+        update_trending_scores, dedup_key='update-trending',
+        delay=settings.TRENDING_EVENTS_LAG + 1
+    )
@@ -0,0 +1,122 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeTrend, ShoppingCart, TrendingState
+
+# Scores are stored relative to the epoch: an event adds
+# weight * e^(rate * (event time - epoch)), so scores of recipes without
+# new events never have to be decayed, the ranking stays the same.
+# The epoch is moved forward before exponents get close to float overflow.
+MAX_EXPONENT = 100
+
+
+def get_decay_rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def get_growth(epoch, moment, rate):
+    return math.exp(rate * (moment - epoch).total_seconds())
+
+
+def get_events():
+    """
+    Function returns models of events and their weights.
+    """
+    return (
+        (Favorite, settings.TRENDING_FAVORITE_WEIGHT),
+        (ShoppingCart, settings.TRENDING_SHOPPING_CART_WEIGHT),
+    )
+
+
+def get_state(now):
+    """
+    Function returns the state locked till the end of the transaction,
+    so concurrent runs don't count events twice.
+    """
+    TrendingState.objects.get_or_create(pk=1, defaults={'epoch': now})
+    return TrendingState.objects.select_for_update().get(pk=1)
+
+
+def rebase(state, epoch, rate):
+    """
+    Function moves the epoch of scores forward, one query.
+    """
+    factor = 1 / get_growth(state.epoch, epoch, rate)
+    RecipeTrend.objects.update(score=F('score') * factor)
+    state.epoch = epoch
+
+
+def collect_scores(state, until, rate, batch_size):
+    """
+    Function returns scores of events added after the previous run
+    up to until by recipe and the number of events.
+    """
+    scores = defaultdict(float)
+    events = 0
+    for model, weight in get_events():
+        queryset = model.objects.filter(created_at__lte=until)
+        if state.processed_until is not None:
+            queryset = queryset.filter(created_at__gt=state.processed_until)
+        rows = queryset.values_list('recipe_id', 'created_at')
+        for recipe_id, created_at in rows.iterator(batch_size):
+            scores[recipe_id] += weight * get_growth(
+                state.epoch, created_at, rate
+            )
+            events += 1
+    return scores, events
+
+
+def save_scores(scores, batch_size):
+    """
+    Function adds scores to the ranking batch_size recipes per query,
+    deleted recipes are skipped.
+    """
+    recipe_ids = sorted(scores)
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = set(Recipe.objects.filter(
+            pk__in=recipe_ids[start:start + batch_size]
+        ).values_list('pk', flat=True))
+        trends = RecipeTrend.objects.in_bulk(batch)
+        for trend in trends.values():
+            trend.score += scores[trend.pk]
+        RecipeTrend.objects.bulk_update(trends.values(), ('score',))
+        RecipeTrend.objects.bulk_create([
+            RecipeTrend(recipe_id=recipe_id, score=scores[recipe_id])
+            for recipe_id in batch if recipe_id not in trends
+        ])
+
+
+def update_trending(batch_size=1000, rebuild=False):
+    """
+    Function adds favorites and shopping carts added since the previous
+    run to trending scores of recipes (RecipeTrend), recipes with
+    too low score are removed. rebuild=True recounts scores
+    from all events.
+    Returns number of events, updated and removed recipes.
+    """
+    until = timezone.now() - timedelta(seconds=settings.TRENDING_EVENTS_LAG)
+    rate = get_decay_rate()
+    with transaction.atomic():
+        state = get_state(until)
+        if rebuild:
+            RecipeTrend.objects.all().delete()
+            state.epoch = until
+            state.processed_until = None
+        elif rate * (until - state.epoch).total_seconds() > MAX_EXPONENT:
+            rebase(state, until, rate)
+        scores, events = collect_scores(state, until, rate, batch_size)
+        save_scores(scores, batch_size)
+        removed, _ = RecipeTrend.objects.filter(
+            score__lt=settings.TRENDING_MIN_SCORE * get_growth(
+                state.epoch, until, rate
+            )
+        ).delete()
+        state.processed_until = until
+        state.save()
+    return events, len(scores), removed
@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from foodgram.settings import EMPTY_VALUE_ADMIN_PANEL
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'locked_by',
+        'created_at'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('created_at',)
+    show_full_result_count = False
+    empty_value_display = EMPTY_VALUE_ADMIN_PANEL
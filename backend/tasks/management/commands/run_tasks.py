@@ -0,0 +1,48 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.queue import registry, run_workers
+
+
+class Command(BaseCommand):
+    """
+    Managment Command.
+    Runs background tasks (tasks/queue.py) with --concurrency threads
+    until SIGTERM or SIGINT; the running tasks are finished first.
+    With --burst exits when there are no available tasks.
+    """
+    help = 'Runs background tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.TASK_QUEUE_CONCURRENCY
+        )
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=settings.TASK_QUEUE_POLL_INTERVAL
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit when there are no available tasks.'
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda *args: stop.set())
+        self.stdout.write(
+            f'Воркеров: {options["concurrency"]}, '
+            f'задачи: {", ".join(sorted(registry))}'
+        )
+        stats = run_workers(
+            options['concurrency'], options['poll_interval'],
+            options['burst'], stop
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {stats["succeeded"]}, '
+            f'с ошибкой: {stats["failed"]}'
+        ))
@@ -0,0 +1,93 @@
+from django.db import models
+from django.db.models import Q, UniqueConstraint
+from django.utils import timezone
+
+TASK_STATUS_PENDING = 'pending'
+TASK_STATUS_RUNNING = 'running'
+TASK_STATUS_FAILED = 'failed'
+
+TASK_STATUS_CHOICES = (
+    (TASK_STATUS_PENDING, 'Ожидает'),
+    (TASK_STATUS_RUNNING, 'Выполняется'),
+    (TASK_STATUS_FAILED, 'Ошибка'),
+)
+
+
+class Task(models.Model):
+    """
+    Task model: a call of a registered function (tasks/queue.py)
+    which is run by the worker (run_tasks command).
+    Finished tasks are deleted, failed ones are kept.
+    Only one pending task can have the same dedup_key.
+    """
+    name = models.CharField(
+        'Задача',
+        max_length=200
+    )
+    kwargs = models.JSONField(
+        'Аргументы',
+        default=dict
+    )
+    dedup_key = models.CharField(
+        'Ключ дедупликации',
+        max_length=200,
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=15,
+        choices=TASK_STATUS_CHOICES,
+        default=TASK_STATUS_PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попытки',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=1
+    )
+    run_at = models.DateTimeField(
+        'Запустить после',
+        default=timezone.now
+    )
+    locked_at = models.DateTimeField(
+        'Взята в работу',
+        null=True,
+        blank=True
+    )
+    locked_by = models.CharField(
+        'Воркер',
+        max_length=100,
+        blank=True
+    )
+    last_error = models.TextField(
+        'Последняя ошибка',
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True
+    )
+
+    class Meta:
+        db_table = 'task'
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('run_at',)
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at'), name='task_status_run_at_idx'
+            )
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=('dedup_key',),
+                condition=Q(status=TASK_STATUS_PENDING),
+                name='unique_pending_task_dedup_key'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
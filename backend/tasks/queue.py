@@ -0,0 +1,232 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import (IntegrityError, close_old_connections, connection,
+                       transaction)
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import (TASK_STATUS_FAILED, TASK_STATUS_PENDING,
+                     TASK_STATUS_RUNNING, Task)
+
+logger = logging.getLogger(__name__)
+
+# Registered tasks: name -> function.
+registry = {}
+
+
+def task(name=None, max_attempts=None):
+    """
+    Decorator registers the function as a task. Tasks are declared
+    in tasks.py modules of the apps and take JSON serializable
+    keyword arguments only.
+    """
+    def decorator(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def store_task(func, dedup_key, delay, kwargs):
+    """
+    Function saves the task. If a pending task with the same dedup_key
+    exists, nothing is saved: the pending task will do the same work.
+    """
+    Task.objects.bulk_create(
+        [Task(
+            name=func.task_name,
+            kwargs=kwargs,
+            dedup_key=dedup_key,
+            max_attempts=(
+                func.max_attempts or settings.TASK_QUEUE_MAX_ATTEMPTS
+            ),
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )],
+        ignore_conflicts=True
+    )
+
+
+def run_eager(func, kwargs):
+    try:
+        func(**kwargs)
+    except Exception:
+        logger.exception('Task %s failed.', func.task_name)
+
+
+def enqueue(func, dedup_key=None, delay=0, **kwargs):
+    """
+    Function schedules the task when the current transaction is
+    committed (at once outside of transactions): a rolled back write
+    leaves no task and the worker sees the committed data.
+    Tasks with the same dedup_key are merged while pending,
+    delay (seconds) postpones the task, so bursts of writes
+    are merged into one run.
+    With TASK_QUEUE_EAGER the task is run in the process instead.
+    """
+    if settings.TASK_QUEUE_EAGER:
+        transaction.on_commit(partial(run_eager, func, kwargs))
+        return
+    transaction.on_commit(partial(store_task, func, dedup_key, delay, kwargs))
+
+
+def get_available_tasks(now):
+    return Task.objects.filter(
+        Q(status=TASK_STATUS_PENDING, run_at__lte=now)
+        | Q(
+            status=TASK_STATUS_RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.TASK_QUEUE_LEASE)
+        )
+    ).order_by('run_at', 'pk')
+
+
+def claim_tasks(worker, limit=1):
+    """
+    Function marks up to limit available tasks as running by the worker
+    and returns them. On PostgreSQL tasks are selected with
+    SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait for
+    each other and never take the same task. Databases without
+    SKIP LOCKED (SQLite) are polled: a task is claimed by
+    a conditional UPDATE, a worker which lost the race updates nothing.
+    """
+    now = timezone.now()
+    claim = {
+        'status': TASK_STATUS_RUNNING,
+        'locked_at': now,
+        'locked_by': worker,
+        'attempts': F('attempts') + 1,
+    }
+    available = get_available_tasks(now)
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            task_ids = list(available.select_for_update(
+                skip_locked=True
+            ).values_list('pk', flat=True)[:limit])
+            Task.objects.filter(pk__in=task_ids).update(**claim)
+    else:
+        task_ids = [
+            task_id
+            for task_id in available.values_list('pk', flat=True)[:limit]
+            if available.filter(pk=task_id).update(**claim)
+        ]
+    return list(Task.objects.filter(pk__in=task_ids, locked_by=worker))
+
+
+def retry_delay(attempts):
+    return min(
+        settings.TASK_QUEUE_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.TASK_QUEUE_MAX_BACKOFF
+    )
+
+
+def fail_task(task, worker, error):
+    """
+    Function schedules the next attempt of the failed task
+    with exponential backoff or marks it failed after max_attempts.
+    """
+    queryset = Task.objects.filter(pk=task.pk, locked_by=worker)
+    if task.attempts >= task.max_attempts:
+        queryset.update(status=TASK_STATUS_FAILED, last_error=error)
+        return
+    try:
+        with transaction.atomic():
+            queryset.update(
+                status=TASK_STATUS_PENDING,
+                run_at=timezone.now() + timedelta(
+                    seconds=retry_delay(task.attempts)
+                ),
+                locked_at=None,
+                locked_by='',
+                last_error=error
+            )
+    except IntegrityError:
+        # A newer task with the same dedup_key is pending.
+        queryset.delete()
+
+
+def run_task(task, worker):
+    """
+    Function runs the claimed task: finished task is deleted,
+    failed one is retried. Returns True if the task has succeeded.
+    """
+    func = registry.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {task.name} не зарегистрирована.')
+        func(**task.kwargs)
+    except Exception:
+        logger.exception('Task %s (%s) failed.', task.name, task.pk)
+        fail_task(task, worker, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=task.pk, locked_by=worker).delete()
+    return True
+
+
+def get_worker_name(number):
+    return f'{socket.gethostname()}:{os.getpid()}:{number}'
+
+
+def work(worker, stop, poll_interval, burst=False, stats=None):
+    """
+    Function runs tasks one by one until stop is set. Waits
+    poll_interval seconds when there are no available tasks;
+    in burst mode returns instead.
+    stats (dict) counts succeeded and failed tasks.
+    """
+    stats = {'succeeded': 0, 'failed': 0} if stats is None else stats
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            tasks = claim_tasks(worker)
+            if not tasks:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for claimed in tasks:
+                key = 'succeeded' if run_task(claimed, worker) else 'failed'
+                stats[key] += 1
+    finally:
+        connection.close()
+    return stats
+
+
+def run_workers(concurrency, poll_interval, burst=False, stop=None):
+    """
+    Function runs concurrency worker threads, each with its own
+    database connection, until stop is set (or until there are
+    no available tasks in burst mode). Returns number of succeeded
+    and failed tasks.
+    """
+    stop = stop or threading.Event()
+    stats = [{'succeeded': 0, 'failed': 0} for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(get_worker_name(number), stop, poll_interval, burst),
+            kwargs={'stats': stats[number]},
+            name=f'task-worker-{number}',
+        )
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(poll_interval)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {
+        key: sum(thread_stats[key] for thread_stats in stats)
+        for key in ('succeeded', 'failed')
+    }
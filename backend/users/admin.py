@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from api.admin import UserSoftDeleteAdminMixin
 from foodgram.settings import EMPTY_VALUE_ADMIN_PANEL
 
 from .models import CustomUser, Subscription
@@ -9,13 +10,19 @@ from .models import CustomUser, Subscription
 class SubscriptionAdmin(admin.ModelAdmin):
     """Admin panel for Subscription model."""
     list_display = ('id', 'user', 'author', 'subscribe_date')
+    list_select_related = ('user', 'author')
     search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
 
 
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
-    """Admin panel for CustomUser model."""
+class CustomUserAdmin(UserSoftDeleteAdminMixin, admin.ModelAdmin):
+    """
+    Admin panel for CustomUser model.
+    Deleted users are purged in background, see api/admin.py.
+    """
     list_display = (
         'id', 'username', 'email', 'first_name',
         'last_name', 'password', 'role',
@@ -27,9 +34,7 @@ class CustomUserAdmin(admin.ModelAdmin):
         'last_name', 'password', 'role',
         'is_superuser', 'is_active', 'is_staff'
     )
-    list_filter = (
-        'email', 'first_name',
-        'role', 'date_joined'
-    )
+    list_filter = ('role', 'date_joined')
     search_fields = ('username', 'email', 'first_name')
+    show_full_result_count = False
     empty_value_display = EMPTY_VALUE_ADMIN_PANEL
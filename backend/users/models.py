@@ -1,4 +1,4 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 from django.db.models import CheckConstraint, F, Q, UniqueConstraint
 from django.db.models.deletion import CASCADE
@@ -12,8 +12,18 @@ USER_ROLE_CHOICES = (
 )
 
 
+class CustomUserManager(UserManager):
+    """Manager hides deleted users, see api/deletion.py."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class CustomUser(AbstractUser):
-    """CustomUser model."""
+    """
+    CustomUser model.
+    Deleted users are hidden by the default manager until they are
+    purged in background, all_objects returns them too.
+    """
     username = models.CharField(
         'username',
         max_length=150,
@@ -38,6 +48,15 @@ class CustomUser(AbstractUser):
         choices=USER_ROLE_CHOICES,
         default=USER_ROLE_USER
     )
+    deleted_at = models.DateTimeField(
+        'Дата удаления',
+        null=True,
+        blank=True,
+        editable=False
+    )
+
+    objects = CustomUserManager()
+    all_objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'password']